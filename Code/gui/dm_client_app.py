@@ -12,16 +12,21 @@ from DMBotNetwork import Client
 from root_path import ROOT_PATH
 from systems.discord_rpc import DiscordRPC
 from systems.loc import Localization as loc
+from systems.texture_system import ContentIndex, HotReload
 
 from .fonts_setup import FontManager
+from .texture_bridge import TextureBridge
 from .windows.admin import admin_menu_setup
+from .windows.debug import debug_menu_setup
 from .windows.user import user_menu_setup
 
 
 class DMClientApp:
     _dpg_async = DearPyGuiAsync()
+    debug: bool = False
 
-    def __init__(self):
+    def __init__(self, debug: bool = False):
+        DMClientApp.debug = debug
         dpg.create_context()
         FontManager.load_fonts()
 
@@ -203,6 +208,7 @@ class DMClientApp:
     @classmethod
     async def setup_start_windows(cls) -> None:
         await cls.download_content_from_server()
+        await asyncio.to_thread(ContentIndex.refresh)
         loc.load_translations(
             Path(
                 ROOT_PATH
@@ -231,6 +237,13 @@ class DMClientApp:
 
         await user_menu_setup()
 
+        if cls.debug:
+            await debug_menu_setup()
+            # Правки художников подхватываются без перезапуска клиента
+            # Текстуры DearPyGui меняются только из цикла GUI, там же работает _tick анимаций
+            HotReload.subscribe(TextureBridge.invalidate, asyncio.get_running_loop())
+            HotReload.start(rebuild=True)
+
     @classmethod
     async def download_content_from_server(cls) -> None:
         server_content_path: Path = (
@@ -281,4 +294,5 @@ class DMClientApp:
 
     @classmethod
     def stop(cls):
+        HotReload.stop()
         dpg.stop_dearpygui()
@@ -0,0 +1,318 @@
+import bisect
+import time
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+import dearpygui.dearpygui as dpg
+import dpg_tools
+import numpy as np
+from DMBotTools import Color
+from PIL import Image
+from systems.texture_system import CacheKey, FrameStack, FrameStrip, HotReload, MemoryCache, TextureSystem
+
+
+class AnimationPlayer:
+    """Класс AnimationPlayer переключает текстуру элемента dpg.add_image по общим часам TextureBridge.
+
+    Кадры загружаются в реестр текстур один раз, проигрывание только меняет texture_tag элемента.
+    """
+    __slots__ = ['item', 'texture_ids', 'offsets', 'total', 'started', 'current']
+
+    def __init__(self, item: Union[int, str], texture_ids: Sequence[Union[int, str]], durations: Sequence[int], started: float) -> None:
+        self.item: Union[int, str] = item
+        self.texture_ids: List[Union[int, str]] = list(texture_ids)
+        self.offsets: List[int] = []  # Время окончания каждого кадра от начала цикла, мс
+
+        total = 0
+        for duration in durations:
+            total += max(1, duration)
+            self.offsets.append(total)
+
+        self.total: int = total
+        self.started: float = started
+        self.current: int = -1
+
+    def frame_at(self, now: float) -> int:
+        """Возвращает номер кадра на момент времени.
+
+        Args:
+            now (float): Время по time.monotonic().
+
+        Returns:
+            int: Номер кадра.
+        """
+        elapsed = int((now - self.started) * 1000) % self.total
+        return bisect.bisect_right(self.offsets, elapsed)
+
+
+class TextureBridge:
+    """Статический класс TextureBridge загружает результаты TextureSystem в реестр текстур DearPyGui.
+
+    Кадры переводятся в float32 RGBA одним векторным проходом, без списков Python.
+    Буферы остаются у моста: dpg.add_raw_texture читает их без копирования.
+    Идентификаторы текстур кешируются по ключу кеша текстур и переиспользуются до release.
+    """
+    __slots__ = []
+    REGISTRY_TAG: str = "texture_bridge_registry"
+    TICK_INTERVAL: float = 1 / 60
+    _textures: Dict[Hashable, Tuple[Any, List[Union[int, str]], List[np.ndarray], List[int]]] = {}
+    _players: Dict[Union[int, str], AnimationPlayer] = {}
+    _clock_task = None
+
+    @staticmethod
+    def _registry() -> str:
+        """Возвращает реестр текстур моста, создавая его при первом обращении.
+
+        Returns:
+            str: Тег реестра.
+        """
+        if not dpg.does_item_exist(TextureBridge.REGISTRY_TAG):
+            dpg.add_texture_registry(tag=TextureBridge.REGISTRY_TAG)
+
+        return TextureBridge.REGISTRY_TAG
+
+    @staticmethod
+    def to_buffer(frame: Union[Image.Image, np.ndarray]) -> np.ndarray:
+        """Переводит кадр в плоский буфер float32 RGBA со значениями 0..1.
+
+        Args:
+            frame (Union[Image.Image, np.ndarray]): Кадр RGBA или массив (H, W, 4) uint8.
+
+        Returns:
+            np.ndarray: Буфер длиной H * W * 4.
+        """
+        if isinstance(frame, Image.Image):
+            frame = np.asarray(frame if frame.mode == "RGBA" else frame.convert("RGBA"))
+
+        buffer = np.empty(frame.size, dtype=np.float32)
+        np.multiply(frame.reshape(-1), np.float32(1 / 255), out=buffer)
+        return buffer
+
+    @staticmethod
+    def _frame_arrays(value: Union[Image.Image, Sequence[Image.Image]]) -> Tuple[List[Union[Image.Image, np.ndarray]], List[int]]:
+        """Возвращает уникальные кадры в виде, который быстрее всего переводится в буфер, и их временную шкалу.
+
+        Кадры FrameStrip берутся как массивы прямо из отображения файла, без создания изображений,
+        повторяющиеся кадры загружаются один раз. Кадры FrameStack - представления его буфера.
+
+        Args:
+            value (Union[Image.Image, Sequence[Image.Image]]): Изображение или последовательность кадров.
+
+        Returns:
+            Tuple[List[Union[Image.Image, np.ndarray]], List[int]]: Уникальные кадры и номер уникального кадра для каждого кадра.
+        """
+        if isinstance(value, Image.Image):
+            return [value], [0]
+
+        if isinstance(value, FrameStrip):
+            return [value.unique_array(i) for i in range(value.unique_count)], list(value.timeline)
+
+        if isinstance(value, FrameStack):
+            return [value.frame_array(i) for i in range(len(value))], list(range(len(value)))
+
+        return list(value), list(range(len(value)))
+
+    @staticmethod
+    def _durations(value: Union[Image.Image, Sequence[Image.Image]], frame_count: int, fps: int) -> List[int]:
+        """Возвращает длительности кадров в миллисекундах.
+
+        Args:
+            value (Union[Image.Image, Sequence[Image.Image]]): Изображение или последовательность кадров.
+            frame_count (int): Число кадров.
+            fps (int): Частота кадров, если длительности не записаны в самих кадрах.
+
+        Returns:
+            List[int]: Длительности кадров.
+        """
+        durations = getattr(value, 'durations', None)
+        if durations is not None and len(durations) == frame_count:
+            return list(durations)
+
+        return [1000 // fps] * frame_count
+
+    @staticmethod
+    def upload(key: Hashable, value: Union[Image.Image, Sequence[Image.Image]], version: Any = None, fps: int = TextureSystem.DEFAULT_FPS) -> List[Union[int, str]]:
+        """Загружает изображение или кадры в реестр текстур.
+
+        Если под ключом уже загружены кадры той же версии, возвращаются их идентификаторы.
+        Загруженные кадры другой версии удаляются и заменяются.
+
+        Args:
+            key (Hashable): Ключ кеша текстур, например MemoryCache.make_key.
+            value (Union[Image.Image, Sequence[Image.Image]]): Изображение или последовательность кадров.
+            version (Any, optional): Версия источника. По умолчанию None.
+            fps (int, optional): Частота кадров, если длительности не записаны в кадрах. По умолчанию DEFAULT_FPS.
+
+        Returns:
+            List[Union[int, str]]: Идентификаторы текстур по кадрам.
+        """
+        entry = TextureBridge._textures.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        if entry is not None:
+            TextureBridge.release(key)
+
+        frames, timeline = TextureBridge._frame_arrays(value)
+        registry = TextureBridge._registry()
+
+        if isinstance(value, FrameStack):
+            # Весь стек переводится в float32 одной операцией, буферы кадров - строки результата
+            buffers = list(TextureBridge.to_buffer(value.array).reshape(len(value), -1))
+        else:
+            buffers = [TextureBridge.to_buffer(frame) for frame in frames]
+
+        unique_ids: List[Union[int, str]] = []
+        for frame, buffer in zip(frames, buffers):
+            height, width = (frame.height, frame.width) if isinstance(frame, Image.Image) else frame.shape[:2]
+            unique_ids.append(dpg.add_raw_texture(width, height, default_value=buffer, format=dpg.mvFormat_Float_rgba, parent=registry))
+
+        texture_ids = [unique_ids[index] for index in timeline]
+        TextureBridge._textures[key] = (version, texture_ids, buffers, TextureBridge._durations(value, len(texture_ids), fps))
+        return texture_ids
+
+    @staticmethod
+    def get_state(path: str, state: str, color: Optional[Color] = None, fps: int = TextureSystem.DEFAULT_FPS) -> List[Union[int, str]]:
+        """Возвращает текстуры состояния, загружая его через TextureSystem при необходимости.
+
+        Args:
+            path (str): Путь к директории с текстурами.
+            state (str): Имя состояния.
+            color (Optional[Color], optional): Цвет для маски. По умолчанию None.
+            fps (int, optional): Частота кадров анимации. По умолчанию DEFAULT_FPS.
+
+        Returns:
+            List[Union[int, str]]: Идентификаторы текстур по кадрам.
+        """
+        _, _, num_frames, is_mask = TextureSystem.get_state_info(path, state)
+        is_gif = num_frames > 1
+        color = color if is_mask else None
+
+        key = MemoryCache.make_key(path, state, color, "gif" if is_gif else "png")
+        version = (fps, *(CacheKey.fingerprint(source) for source in (f"{path}/{state}.png", f"{path}/info.yml")))
+
+        entry = TextureBridge._textures.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        if is_gif:
+            value = TextureSystem.get_gif_recolor(path, state, color, fps) if color else TextureSystem.get_gif(path, state, fps)
+
+        else:
+            value = TextureSystem.get_image_recolor(path, state, color) if color else TextureSystem.get_image(path, state)
+
+        return TextureBridge.upload(key, value, version, fps)
+
+    @staticmethod
+    def durations(key: Hashable) -> List[int]:
+        """Возвращает длительности загруженных кадров.
+
+        Args:
+            key (Hashable): Ключ кеша текстур.
+
+        Raises:
+            KeyError: Если под ключом ничего не загружено.
+
+        Returns:
+            List[int]: Длительности кадров в миллисекундах.
+        """
+        return TextureBridge._textures[key][3]
+
+    @staticmethod
+    def release(key: Hashable) -> None:
+        """Удаляет текстуры ключа из реестра. Проигрыватели этих текстур останавливаются.
+
+        Args:
+            key (Hashable): Ключ кеша текстур.
+        """
+        entry = TextureBridge._textures.pop(key, None)
+        if entry is None:
+            return
+
+        texture_ids = set(entry[1])
+        for item, player in list(TextureBridge._players.items()):
+            if texture_ids.intersection(player.texture_ids):
+                del TextureBridge._players[item]
+
+        for texture_id in texture_ids:
+            if dpg.does_item_exist(texture_id):
+                dpg.delete_item(texture_id)
+
+    @staticmethod
+    def invalidate(sources: List[str], paths: List[str]) -> None:
+        """Удаляет текстуры, зависящие от измененных исходников. Подписчик HotReload.
+
+        Вызывается только из цикла GUI, см. HotReload.subscribe. Следующий get_state загрузит состояние заново.
+
+        Args:
+            sources (List[str]): Абсолютные пути измененных исходников.
+            paths (List[str]): Абсолютные пути удаленных скомпилированных файлов.
+        """
+        for key in list(TextureBridge._textures):
+            if HotReload.affects(key, sources, paths):
+                TextureBridge.release(key)
+
+    @staticmethod
+    def clear() -> None:
+        """Удаляет все загруженные текстуры."""
+        for key in list(TextureBridge._textures):
+            TextureBridge.release(key)
+
+    @staticmethod
+    def play(item: Union[int, str], key: Hashable) -> None:
+        """Проигрывает загруженные кадры на элементе dpg.add_image.
+
+        Все проигрыватели идут по одним часам, поэтому одинаковые анимации остаются синхронными.
+
+        Args:
+            item (Union[int, str]): Элемент изображения.
+            key (Hashable): Ключ загруженных кадров.
+
+        Raises:
+            KeyError: Если под ключом ничего не загружено.
+        """
+        _, texture_ids, _, durations = TextureBridge._textures[key]
+        if len(texture_ids) < 2:
+            TextureBridge.stop(item)
+            dpg.configure_item(item, texture_tag=texture_ids[0])
+            return
+
+        TextureBridge._players[item] = AnimationPlayer(item, texture_ids, durations, TextureBridge._clock_start())
+        TextureBridge._tick()
+
+        if TextureBridge._clock_task is None or TextureBridge._clock_task.done():
+            TextureBridge._clock_task = dpg_tools.add_timer(TextureBridge.TICK_INTERVAL, TextureBridge._tick)
+
+    @staticmethod
+    def stop(item: Union[int, str]) -> None:
+        """Останавливает проигрывание на элементе, оставляя текущий кадр.
+
+        Args:
+            item (Union[int, str]): Элемент изображения.
+        """
+        TextureBridge._players.pop(item, None)
+
+    @staticmethod
+    def _clock_start() -> float:
+        """Возвращает начало общих часов.
+
+        Returns:
+            float: Время по time.monotonic().
+        """
+        for player in TextureBridge._players.values():
+            return player.started
+
+        return time.monotonic()
+
+    @staticmethod
+    def _tick() -> None:
+        """Переключает кадры всех проигрывателей. Текстура меняется, только если сменился кадр."""
+        now = time.monotonic()
+        for item, player in list(TextureBridge._players.items()):
+            if not dpg.does_item_exist(item):
+                del TextureBridge._players[item]
+                continue
+
+            index = player.frame_at(now)
+            if index != player.current:
+                player.current = index
+                dpg.configure_item(item, texture_tag=player.texture_ids[index])
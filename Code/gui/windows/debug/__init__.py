@@ -0,0 +1 @@
+from .main import debug_menu_setup
@@ -0,0 +1,18 @@
+import dearpygui.dearpygui as dpg
+from systems.loc import Localization as loc
+
+from .texture_stats import texture_stats
+
+
+async def debug_menu_setup():
+    dpg.add_menu(
+        label=loc.get_string("debug_menu"),
+        tag="debug_menu_bar",
+        parent="main_bar",
+    )
+
+    dpg.add_menu_item(
+        label=loc.get_string("texture_stats_label"),
+        parent="debug_menu_bar",
+        callback=texture_stats,
+    )
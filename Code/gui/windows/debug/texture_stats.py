@@ -0,0 +1,74 @@
+from typing import Any, Dict
+
+import dearpygui.dearpygui as dpg
+import dpg_tools
+from systems.loc import Localization as loc
+from systems.texture_system import TextureMetrics, TextureSystem
+
+REFRESH_INTERVAL = 1.0
+
+_refresh_task = None
+
+
+def format_stats(stats: Dict[str, Any]) -> str:
+    """Переводит статистику TextureSystem в читаемый текст.
+
+    Args:
+        stats (Dict[str, Any]): Результат TextureSystem.stats().
+
+    Returns:
+        str: Текст для окна.
+    """
+    lines = ["[counters]"]
+    lines += [f"{name}: {value}" for name, value in sorted(stats['counters'].items())]
+
+    lines.append("[stages]")
+    for name, stage in sorted(stats['stages'].items()):
+        lines.append(f"{name}: n={stage['count']} mean={stage['mean_ms']:.2f}ms max={stage['max_ms']:.2f}ms total={stage['total_ms']:.1f}ms")
+
+    for cache in ('memory_cache', 'prefix_cache', 'compiled_cache'):
+        lines.append(f"[{cache}]")
+        lines += [f"{name}: {value}" for name, value in stats[cache].items()]
+
+    return "\n".join(lines)
+
+
+def _refresh() -> None:
+    if dpg.does_item_exist("texture_stats_text"):
+        dpg.set_value("texture_stats_text", format_stats(TextureSystem.stats()))
+
+
+def _reset() -> None:
+    TextureMetrics.reset()
+    _refresh()
+
+
+def _auto_refresh() -> None:
+    if dpg.does_item_exist("texture_stats_auto") and dpg.get_value("texture_stats_auto"):
+        _refresh()
+
+
+def texture_stats():
+    global _refresh_task
+
+    if dpg.does_item_exist("texture_stats_window"):
+        dpg.focus_item("texture_stats_window")
+        return
+
+    with dpg.window(
+        label=loc.get_string("texture_stats_label"),
+        tag="texture_stats_window",
+        width=500,
+        height=400,
+        on_close=lambda: dpg.delete_item("texture_stats_window"),
+    ):
+        with dpg.group(horizontal=True):
+            dpg.add_button(label=loc.get_string("texture_stats_refresh"), callback=_refresh)
+            dpg.add_button(label=loc.get_string("texture_stats_reset"), callback=_reset)
+            dpg.add_checkbox(label=loc.get_string("texture_stats_auto_refresh"), tag="texture_stats_auto")
+
+        dpg.add_text("", tag="texture_stats_text")
+
+    _refresh()
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = dpg_tools.add_timer(REFRESH_INTERVAL, _auto_refresh)
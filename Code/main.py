@@ -20,13 +20,13 @@ def init_classes() -> None:
     Client.register_methods_from_class([ChatClientModule])
 
 
-def main() -> None:
+def main(debug: bool = False) -> None:
     loc.load_translations(Path(ROOT_PATH / "Content" / "Client" / "loc" / "rus"))
     init_classes()
     DiscordRPC()
 
     Client()
-    DMClientApp()
+    DMClientApp(debug=debug)
     DMClientApp.run()
 
 
@@ -50,4 +50,4 @@ if __name__ == "__main__":
         handlers=[handler],
     )
 
-    main()
+    main(args.debug)
@@ -1,3 +1,16 @@
+from .atlas import TextureAtlas
+from .cache_key import CacheKey
+from .compile_lock import CompileLock
+from .compiled_cache import CompiledCache
+from .compositor import Compositor
+from .content_index import ContentIndex
+from .frame_stack import FrameStack
+from .frame_strip import FrameStrip
+from .hot_reload import HotReload
+from .memory_cache import MemoryCache
+from .metadata_index import MetadataIndex
+from .metrics import TextureMetrics
+from .prefix_cache import PrefixCache
 from .texture_system import TextureSystem
 
-__all__ = ['TextureSystem']
+__all__ = ['CacheKey', 'CompileLock', 'CompiledCache', 'Compositor', 'ContentIndex', 'FrameStack', 'FrameStrip', 'HotReload', 'MemoryCache', 'MetadataIndex', 'PrefixCache', 'TextureAtlas', 'TextureMetrics', 'TextureSystem']
@@ -0,0 +1,219 @@
+import json
+import os
+import posixpath
+from typing import Any, Dict, List, Tuple, Union
+
+from PIL import Image
+
+from .metadata_index import MetadataIndex
+from .texture_system import TextureSystem
+
+
+class TextureAtlas:
+    """Класс TextureAtlas - атлас, в который упакованы все кадры всех состояний директории текстур или пакета контента.
+
+    Атлас собирается заранее методом build и хранится как несколько страниц PNG и индекс atlas.json
+    с прямоугольниками кадров. GUI загружает несколько больших текстур вместо тысяч маленьких.
+    """
+    __slots__ = ['path', 'pages', 'states', '_images']
+    INDEX_NAME: str = "atlas.json"
+    VERSION: int = 1
+
+    def __init__(self, path: str, pages: List[Tuple[int, int]], states: Dict[str, Dict[str, Any]]) -> None:
+        self.path: str = path
+        self.pages: List[Tuple[int, int]] = pages
+        self.states: Dict[str, Dict[str, Any]] = states
+        self._images: Dict[int, Image.Image] = {}
+
+    @staticmethod
+    def _pack(sizes: List[Tuple[int, int]], max_size: int, padding: int) -> Tuple[List[Tuple[int, int, int]], List[Tuple[int, int]]]:
+        """Раскладывает прямоугольники по страницам полками.
+
+        Args:
+            sizes (List[Tuple[int, int]]): Размеры прямоугольников.
+            max_size (int): Максимальная сторона страницы.
+            padding (int): Отступ между прямоугольниками.
+
+        Returns:
+            Tuple[List[Tuple[int, int, int]], List[Tuple[int, int]]]: Страница и позиция каждого прямоугольника, размеры страниц.
+        """
+        order = sorted(range(len(sizes)), key=lambda index: (-sizes[index][1], -sizes[index][0]))
+        placements: List[Tuple[int, int, int]] = [(0, 0, 0)] * len(sizes)
+        pages: List[Tuple[int, int]] = []
+
+        page = -1
+        x = y = shelf_height = 0
+        for index in order:
+            width, height = sizes[index]
+            if width > max_size or height > max_size:
+                # Кадр больше страницы получает собственную страницу, текущая страница продолжает заполняться
+                pages.append((width, height))
+                placements[index] = (len(pages) - 1, 0, 0)
+                continue
+
+            if page != -1 and x + width > max_size:
+                x = 0
+                y += shelf_height + padding
+                shelf_height = 0
+
+            if page == -1 or y + height > max_size:
+                pages.append((0, 0))
+                page = len(pages) - 1
+                x = y = shelf_height = 0
+
+            placements[index] = (page, x, y)
+            pages[page] = (max(pages[page][0], x + width), max(pages[page][1], y + height))
+            x += width + padding
+            shelf_height = max(shelf_height, height)
+
+        return placements, pages
+
+    @staticmethod
+    def build(source: Union[str, os.PathLike], output_dir: Union[str, os.PathLike], max_size: int = 2048, padding: int = 1) -> "TextureAtlas":
+        """Упаковывает все кадры всех состояний в атлас.
+
+        Идентификатор состояния - путь директории текстур относительно source и имя состояния,
+        например "mobs/cat/walk". Для одной директории текстур это просто имя состояния.
+
+        Args:
+            source (Union[str, os.PathLike]): Директория текстур или корень пакета контента.
+            output_dir (Union[str, os.PathLike]): Куда записать страницы и индекс.
+            max_size (int, optional): Максимальная сторона страницы. По умолчанию 2048.
+            padding (int, optional): Отступ между кадрами. По умолчанию 1.
+
+        Returns:
+            TextureAtlas: Собранный атлас.
+        """
+        source = os.fspath(source)
+        output_dir = os.fspath(output_dir)
+
+        frames: List[Image.Image] = []
+        owners: List[Tuple[str, int]] = []
+        states: Dict[str, Dict[str, Any]] = {}
+        for texture_dir in MetadataIndex.find_texture_dirs(source):
+            relative = os.path.relpath(texture_dir, source).replace(os.sep, "/")
+            for texture in MetadataIndex.get_textures(texture_dir):
+                state = texture['name']
+                state_id = state if relative == "." else posixpath.join(relative, state)
+                frame_width, frame_height, num_frames, is_mask = TextureSystem.get_state_info(texture_dir, state)
+                sheet = TextureSystem.get_image(texture_dir, state)
+                state_frames = TextureSystem._slice_image(sheet, frame_width, frame_height, num_frames)
+
+                states[state_id] = {'size': [frame_width, frame_height], 'is_mask': is_mask, 'frames': [None] * len(state_frames)}
+                for index, frame in enumerate(state_frames):
+                    frames.append(frame)
+                    owners.append((state_id, index))
+
+        placements, pages = TextureAtlas._pack([frame.size for frame in frames], max_size, padding)
+
+        for (state_id, index), frame, (page, x, y) in zip(owners, frames, placements):
+            states[state_id]['frames'][index] = [page, x, y, frame.width, frame.height]
+
+        os.makedirs(output_dir, exist_ok=True)
+        images = [Image.new("RGBA", size) for size in pages]
+        for frame, (page, x, y) in zip(frames, placements):
+            images[page].paste(frame, (x, y))
+
+        for page, image in enumerate(images):
+            image.save(os.path.join(output_dir, f"atlas_{page}.png"))
+
+        with open(os.path.join(output_dir, TextureAtlas.INDEX_NAME), 'w', encoding='utf-8') as file:
+            json.dump({'version': TextureAtlas.VERSION, 'pages': [list(size) for size in pages], 'states': states}, file, separators=(',', ':'))
+
+        atlas = TextureAtlas(output_dir, pages, states)
+        atlas._images = dict(enumerate(images))
+        return atlas
+
+    @staticmethod
+    def load(path: Union[str, os.PathLike]) -> "TextureAtlas":
+        """Загружает индекс атласа. Страницы читаются при первом обращении.
+
+        Args:
+            path (Union[str, os.PathLike]): Директория атласа.
+
+        Raises:
+            ValueError: Если версия индекса не поддерживается.
+
+        Returns:
+            TextureAtlas: Атлас.
+        """
+        path = os.fspath(path)
+        with open(os.path.join(path, TextureAtlas.INDEX_NAME), 'r', encoding='utf-8') as file:
+            index = json.load(file)
+
+        if index.get('version') != TextureAtlas.VERSION:
+            raise ValueError(f"Unsupported atlas version '{index.get('version')}' in '{path}'")
+
+        return TextureAtlas(path, [tuple(size) for size in index['pages']], index['states'])
+
+    def get_page(self, page: int) -> Image.Image:
+        """Возвращает изображение страницы атласа.
+
+        Args:
+            page (int): Номер страницы.
+
+        Returns:
+            Image.Image: Страница атласа в RGBA.
+        """
+        image = self._images.get(page)
+        if image is None:
+            with Image.open(os.path.join(self.path, f"atlas_{page}.png")) as file:
+                image = file.convert("RGBA")
+
+            self._images[page] = image
+
+        return image
+
+    def get_rect(self, state: str, frame: int = 0) -> Tuple[int, int, int, int, int]:
+        """Возвращает прямоугольник кадра в пикселях.
+
+        Args:
+            state (str): Идентификатор состояния.
+            frame (int, optional): Номер кадра. По умолчанию 0.
+
+        Raises:
+            KeyError: Если состояния нет в атласе.
+
+        Returns:
+            Tuple[int, int, int, int, int]: Страница, x, y, ширина и высота.
+        """
+        page, x, y, width, height = self.states[state]['frames'][frame]
+        return page, x, y, width, height
+
+    def get_uv(self, state: str, frame: int = 0) -> Tuple[int, Tuple[float, float, float, float]]:
+        """Возвращает UV-прямоугольник кадра.
+
+        Args:
+            state (str): Идентификатор состояния.
+            frame (int, optional): Номер кадра. По умолчанию 0.
+
+        Returns:
+            Tuple[int, Tuple[float, float, float, float]]: Страница и (u0, v0, u1, v1).
+        """
+        page, x, y, width, height = self.get_rect(state, frame)
+        page_width, page_height = self.pages[page]
+        return page, (x / page_width, y / page_height, (x + width) / page_width, (y + height) / page_height)
+
+    def get_frame(self, state: str, frame: int = 0) -> Image.Image:
+        """Вырезает кадр из атласа.
+
+        Args:
+            state (str): Идентификатор состояния.
+            frame (int, optional): Номер кадра. По умолчанию 0.
+
+        Returns:
+            Image.Image: Кадр в RGBA.
+        """
+        page, x, y, width, height = self.get_rect(state, frame)
+        return self.get_page(page).crop((x, y, x + width, y + height))
+
+    def frame_count(self, state: str) -> int:
+        """Возвращает число кадров состояния.
+
+        Args:
+            state (str): Идентификатор состояния.
+
+        Returns:
+            int: Число кадров.
+        """
+        return len(self.states[state]['frames'])
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+from pathlib import PurePath
+from typing import Any, Dict, List, Optional, Tuple
+
+from DMBotTools import Color
+
+from .metadata_index import MetadataIndex
+
+
+class CacheKey:
+    """Статический класс CacheKey строит детерминированные ключи кеша для описаний слоев.
+
+    Ключ зависит только от канонической записи слоя и отпечатков исходных файлов,
+    поэтому он одинаков между запусками и версиями Python и меняется при правке исходников.
+    """
+    __slots__ = []
+
+    @staticmethod
+    def canonical(value: Any) -> Any:
+        """Приводит значение к каноническому виду, пригодному для JSON.
+
+        Color и кортежи становятся списками, пути - нормализованными абсолютными строками,
+        ключи словарей - строками.
+
+        Args:
+            value (Any): Значение из описания слоя.
+
+        Returns:
+            Any: Каноническое значение.
+
+        Raises:
+            TypeError: Если тип значения не поддерживается.
+        """
+        if isinstance(value, (Color, tuple, list)):
+            return [CacheKey.canonical(item) for item in value]
+
+        if isinstance(value, dict):
+            return {str(key): CacheKey.canonical(item) for key, item in value.items()}
+
+        if isinstance(value, PurePath):
+            return os.path.abspath(value)
+
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+
+        raise TypeError(f"Can't build cache key from value of type '{type(value).__name__}'")
+
+    @staticmethod
+    def fingerprint(path: str) -> Optional[Tuple[int, int]]:
+        """Возвращает отпечаток файла.
+
+        Args:
+            path (str): Путь к файлу.
+
+        Returns:
+            Optional[Tuple[int, int]]: mtime в наносекундах и размер, либо None, если файла нет.
+        """
+        try:
+            stat = os.stat(path)
+
+        except FileNotFoundError:
+            return None
+
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def layer_sources(layer: Dict[str, Any]) -> List[str]:
+        """Возвращает исходные файлы, от которых зависит слой.
+
+        Args:
+            layer (Dict[str, Any]): Описание слоя.
+
+        Returns:
+            List[str]: Абсолютные пути к листу состояния и info.yml, либо пустой список.
+        """
+        if 'path' not in layer or 'state' not in layer:
+            return []
+
+        path = os.path.abspath(layer['path'])
+        return [os.path.join(path, f"{layer['state']}.png"), os.path.join(path, "info.yml")]
+
+    @staticmethod
+    def layer_spec(layer: Dict[str, Any]) -> Dict[str, Any]:
+        """Возвращает каноническую запись слоя вместе с отпечатками исходников.
+
+        Цвет не влияет на слои без маски, поэтому для них он отбрасывается.
+
+        Args:
+            layer (Dict[str, Any]): Описание слоя.
+
+        Returns:
+            Dict[str, Any]: Каноническая запись слоя.
+        """
+        spec = CacheKey.canonical(layer)
+        if 'path' in layer and 'state' in layer:
+            spec['path'] = os.path.abspath(layer['path'])
+            try:
+                sprite = MetadataIndex.get_sprite(layer['path'], layer['state'])
+
+            except FileNotFoundError:
+                sprite = None
+
+            if sprite is not None and not sprite['is_mask']:
+                spec.pop('color', None)
+
+            spec['sources'] = [CacheKey.canonical(CacheKey.fingerprint(source)) for source in CacheKey.layer_sources(layer)]
+
+        return spec
+
+    @staticmethod
+    def digest(value: Any) -> str:
+        """Возвращает хеш канонической JSON-записи значения.
+
+        Args:
+            value (Any): Каноническое значение.
+
+        Returns:
+            str: Хеш в виде строки.
+        """
+        encoded = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def layers_key(layers: List[Dict[str, Any]]) -> str:
+        """Возвращает ключ кеша для списка слоев.
+
+        Args:
+            layers (List[Dict[str, Any]]): Список слоев.
+
+        Returns:
+            str: Хеш в виде строки.
+        """
+        return CacheKey.digest([CacheKey.layer_spec(layer) for layer in layers])
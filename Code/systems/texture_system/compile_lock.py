@@ -0,0 +1,242 @@
+import contextlib
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from .memory_cache import MemoryCache
+from .metrics import TextureMetrics
+
+
+class CompileLock:
+    """Статический класс CompileLock защищает запись скомпилированных файлов.
+
+    Файл пишется во временный файл рядом с целевым и переименовывается атомарно,
+    поэтому читатели видят либо старый файл, либо полностью записанный новый.
+    На время компиляции берется рекомендательная блокировка по пути результата: блокировка потока
+    внутри процесса и файл .lock между процессами. Остальные производители того же файла ждут её снятия.
+
+    В файле блокировки записан pid владельца, пока компиляция идет, его mtime продлевается.
+    Блокировка упавшего процесса снимается сразу, как только видно, что процесса нет,
+    а блокировка без живого pid - когда её не продлевали дольше STALE_AFTER.
+    """
+    __slots__ = []
+    LOCK_SUFFIX: str = ".lock"
+    TMP_SUFFIX: str = ".tmp"
+    POLL_INTERVAL: float = 0.05
+    STALE_AFTER: float = 120.0
+    HEARTBEAT_INTERVAL: float = 10.0
+    _locks: Dict[str, List[Any]] = {}
+    _locks_lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def _acquire_thread(path: str) -> None:
+        """Берет блокировку потоков для пути. Блокировка существует, пока её кто-то держит или ждет.
+
+        Args:
+            path (str): Абсолютный путь результата.
+        """
+        with CompileLock._locks_lock:
+            entry = CompileLock._locks.get(path)
+            if entry is None:
+                entry = CompileLock._locks[path] = [threading.Lock(), 0]
+
+            entry[1] += 1
+
+        entry[0].acquire()
+
+    @staticmethod
+    def _release_thread(path: str) -> None:
+        """Отпускает блокировку потоков для пути и забывает её, если больше никто не ждет.
+
+        Args:
+            path (str): Абсолютный путь результата.
+        """
+        with CompileLock._locks_lock:
+            entry = CompileLock._locks[path]
+            entry[0].release()
+            entry[1] -= 1
+            if entry[1] == 0:
+                del CompileLock._locks[path]
+
+    @staticmethod
+    def _pid_alive(pid: int) -> bool:
+        """Проверяет, работает ли процесс.
+
+        Args:
+            pid (int): Идентификатор процесса.
+
+        Returns:
+            bool: False, только если процесса точно нет.
+        """
+        if pid == os.getpid():
+            return True
+
+        if os.name == "nt":
+            import ctypes
+
+            kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+            handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+            if not handle:
+                return ctypes.get_last_error() == 5  # ERROR_ACCESS_DENIED: процесс есть, но чужой
+
+            try:
+                code = ctypes.c_ulong()
+                if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+                    return True
+
+                return code.value == 259  # STILL_ACTIVE
+
+            finally:
+                kernel32.CloseHandle(handle)
+
+        try:
+            os.kill(pid, 0)
+
+        except ProcessLookupError:
+            return False
+
+        except OSError:  # Например, PermissionError: процесс есть, но принадлежит другому пользователю
+            return True
+
+        return True
+
+    @staticmethod
+    def _owner(lock_path: str) -> Optional[int]:
+        """Читает pid владельца из файла блокировки.
+
+        Args:
+            lock_path (str): Путь к файлу блокировки.
+
+        Raises:
+            FileNotFoundError: Если блокировку уже сняли.
+
+        Returns:
+            Optional[int]: pid или None, если он еще не записан или поврежден.
+        """
+        with open(lock_path, 'r', encoding='utf-8') as file:
+            content = file.read().strip()
+
+        return int(content) if content.isdigit() and int(content) > 0 else None
+
+    @staticmethod
+    def _is_stale(lock_path: str) -> bool:
+        """Проверяет, брошена ли блокировка.
+
+        Args:
+            lock_path (str): Путь к файлу блокировки.
+
+        Raises:
+            FileNotFoundError: Если блокировку уже сняли.
+
+        Returns:
+            bool: True, если процесса-владельца нет или блокировку не продлевали дольше STALE_AFTER.
+        """
+        pid = CompileLock._owner(lock_path)
+        if pid is not None and not CompileLock._pid_alive(pid):
+            return True
+
+        return time.time() - os.path.getmtime(lock_path) > CompileLock.STALE_AFTER
+
+    @staticmethod
+    def _acquire_file(lock_path: str) -> None:
+        """Создает файл блокировки, дожидаясь, пока его снимет другой процесс.
+
+        Брошенная блокировка (см. _is_stale) удаляется.
+
+        Args:
+            lock_path (str): Путь к файлу блокировки.
+        """
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+
+            except FileExistsError:
+                try:
+                    if CompileLock._is_stale(lock_path):
+                        os.remove(lock_path)
+                        continue
+
+                except FileNotFoundError:  # Блокировку сняли между проверками
+                    continue
+
+                time.sleep(CompileLock.POLL_INTERVAL)
+                continue
+
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            return
+
+    @staticmethod
+    def _heartbeat(lock_path: str, stop: threading.Event) -> None:
+        """Продлевает mtime файла блокировки, пока компиляция не закончится.
+
+        Args:
+            lock_path (str): Путь к файлу блокировки.
+            stop (threading.Event): Событие окончания компиляции.
+        """
+        while not stop.wait(CompileLock.HEARTBEAT_INTERVAL):
+            with contextlib.suppress(OSError):
+                os.utime(lock_path)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def hold(path: str) -> Iterator[None]:
+        """Держит блокировку компиляции файла.
+
+        Args:
+            path (str): Путь к скомпилированному файлу.
+        """
+        path = os.path.abspath(path)
+        lock_path = path + CompileLock.LOCK_SUFFIX
+        with TextureMetrics.stage("lock_wait"):
+            CompileLock._acquire_thread(path)
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with TextureMetrics.stage("lock_wait"):
+                CompileLock._acquire_file(lock_path)
+
+            stop = threading.Event()
+            heartbeat = threading.Thread(target=CompileLock._heartbeat, args=(lock_path, stop), name="CompileLockHeartbeat", daemon=True)
+            heartbeat.start()
+            try:
+                yield
+
+            finally:
+                stop.set()
+                heartbeat.join()
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(lock_path)
+
+        finally:
+            CompileLock._release_thread(path)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def atomic_path(path: str) -> Iterator[str]:
+        """Дает путь временного файла, который после успешной записи заменяет целевой.
+
+        При ошибке временный файл удаляется, целевой остается нетронутым.
+        Старый файл убирается из кеша в памяти перед заменой, чтобы кеш не отдавал отображение замененного файла.
+
+        Args:
+            path (str): Путь к скомпилированному файлу.
+
+        Yields:
+            str: Путь временного файла в той же директории.
+        """
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}{CompileLock.TMP_SUFFIX}"
+        try:
+            with TextureMetrics.stage("encode"):
+                yield tmp_path
+
+            TextureMetrics.count("bytes_written", os.path.getsize(tmp_path))
+            MemoryCache.discard_file(path)
+            os.replace(tmp_path, path)
+
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+
+            raise
@@ -0,0 +1,469 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+from .compile_lock import CompileLock
+from .memory_cache import MemoryCache
+
+
+class CompiledCache:
+    """Статический класс CompiledCache ведет учет всех скомпилированных файлов TextureSystem.
+
+    Сведения о файлах хранятся в одном индексе (index.json). Общий объем ограничен квотой,
+    при её превышении файлы удаляются по политике LRU или LFU.
+    Счетчики обращений меняются только в памяти и попадают на диск вместе с другими изменениями, при gc или при выходе.
+    Индексом пользуются несколько процессов (клиенты, texture_cache.py precompile), поэтому при сохранении
+    записи на диске сливаются с записями процесса под блокировкой файла индекса.
+    """
+    __slots__ = []
+    DEFAULT_QUOTA: int = 1024 * 1024 * 1024
+    POLICIES = ("lru", "lfu")
+    SAVE_EVERY: int = 256
+    IGNORED_SUFFIXES = (".tmp", ".lock", ".journal", ".json")
+
+    _index_path: Path = Path(__file__).parents[3] / "Content" / "Compiled" / "index.json"
+    _quota: int = DEFAULT_QUOTA
+    _policy: str = "lru"
+    _entries: Optional[Dict[str, Dict[str, Any]]] = None
+    _total: int = 0
+    _changes: int = 0
+    _accessed: bool = False
+    _removed: Set[str] = set()
+    _lock: threading.RLock = threading.RLock()
+
+    @classmethod
+    def configure(cls, index_path: Union[str, Path, None] = None, quota: Optional[int] = None, policy: Optional[str] = None) -> None:
+        """Настраивает расположение индекса, квоту и политику вытеснения.
+
+        Args:
+            index_path (Union[str, Path, None], optional): Путь к файлу индекса. По умолчанию не меняется.
+            quota (Optional[int], optional): Квота на диске в байтах. По умолчанию не меняется.
+            policy (Optional[str], optional): "lru" или "lfu". По умолчанию не меняется.
+
+        Raises:
+            ValueError: Если указана неизвестная политика.
+        """
+        if policy is not None and policy not in cls.POLICIES:
+            raise ValueError(f"Unknown eviction policy '{policy}', expected one of {cls.POLICIES}")
+
+        with cls._lock:
+            if index_path is not None and Path(index_path) != cls._index_path:
+                if cls._entries is not None:
+                    cls.save()
+
+                cls._index_path = Path(index_path)
+                cls._entries = None
+
+            if quota is not None:
+                cls._quota = quota
+
+            if policy is not None:
+                cls._policy = policy
+
+    @classmethod
+    def _read_entries(cls) -> Dict[str, Dict[str, Any]]:
+        """Читает записи из index.json.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Записи индекса по абсолютному пути файла. Пустой словарь, если файла нет или он поврежден.
+        """
+        if not cls._index_path.exists():
+            return {}
+
+        try:
+            with cls._index_path.open('r', encoding='utf-8') as file:
+                return json.load(file).get('files', {})
+
+        except (OSError, ValueError) as err:
+            logging.warning(f"Compiled cache index '{cls._index_path}' is unreadable, starting empty: {err}")
+            return {}
+
+    @classmethod
+    def _load(cls) -> Dict[str, Dict[str, Any]]:
+        """Возвращает записи индекса, читая index.json при первом обращении. Вызывается под блокировкой.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Записи индекса по абсолютному пути файла.
+        """
+        if cls._entries is not None:
+            return cls._entries
+
+        entries = cls._read_entries()
+        cls._entries = entries
+        cls._total = sum(entry['size'] for entry in entries.values())
+        cls._changes = 0
+        cls._accessed = False
+        cls._removed = set()
+        return entries
+
+    @classmethod
+    def _merge_disk(cls) -> None:
+        """Сливает записи, сохраненные другими процессами, с записями процесса. Вызывается под блокировкой.
+
+        Файлы, которые процесс удалил с последнего сохранения, не возвращаются. Из двух записей одного файла
+        остается более поздняя компиляция, счетчики обращений берутся наибольшие.
+        """
+        entries = cls._entries
+        for path, theirs in cls._read_entries().items():
+            if path in cls._removed:
+                continue
+
+            ours = entries.get(path)
+            if ours is None:
+                if os.path.exists(path):
+                    entries[path] = theirs
+                    cls._total += theirs['size']
+
+                continue
+
+            last_access = max(ours['last_access'], theirs['last_access'])
+            hits = max(ours['hits'], theirs['hits'])
+            if theirs['created'] > ours['created']:
+                cls._total += theirs['size'] - ours['size']
+                entries[path] = ours = theirs
+
+            ours['last_access'] = last_access
+            ours['hits'] = hits
+
+    @classmethod
+    def _changed(cls) -> None:
+        """Отмечает изменение индекса и периодически сохраняет его. Вызывается под блокировкой."""
+        cls._changes += 1
+        if cls._changes >= cls.SAVE_EVERY:
+            cls.save()
+
+    @classmethod
+    def save(cls) -> None:
+        """Записывает индекс на диск, если в нем есть несохраненные изменения или обращения.
+
+        Перед записью под блокировкой файла индекса подхватываются записи других процессов, см. _merge_disk.
+        """
+        with cls._lock:
+            if cls._entries is None or (cls._changes == 0 and not cls._accessed):
+                return
+
+            cls._index_path.parent.mkdir(parents=True, exist_ok=True)
+            with CompileLock.hold(str(cls._index_path)):
+                cls._merge_disk()
+                tmp_path = cls._index_path.with_name(f"{cls._index_path.name}.{os.getpid()}.tmp")
+                with tmp_path.open('w', encoding='utf-8') as file:
+                    json.dump({'files': cls._entries}, file)
+
+                os.replace(tmp_path, cls._index_path)
+
+            cls._changes = 0
+            cls._accessed = False
+            cls._removed = set()
+
+    @staticmethod
+    def _fingerprint(path: str) -> Optional[List[int]]:
+        """Возвращает отпечаток исходного файла в виде, пригодном для JSON.
+
+        Args:
+            path (str): Путь к файлу.
+
+        Returns:
+            Optional[List[int]]: mtime в наносекундах и размер, либо None, если файла нет.
+        """
+        try:
+            stat = os.stat(path)
+
+        except OSError:
+            return None
+
+        return [stat.st_mtime_ns, stat.st_size]
+
+    @classmethod
+    def register(cls, path: Union[str, Path], sources: Optional[Iterable[str]] = None, recipe: Optional[Dict[str, Any]] = None) -> None:
+        """Учитывает только что записанный скомпилированный файл и при необходимости освобождает место.
+
+        Args:
+            path (Union[str, Path]): Путь к скомпилированному файлу.
+            sources (Optional[Iterable[str]], optional): Исходные файлы, от которых зависит результат. Их отпечатки
+                записываются в индекс, см. changed_sources. По умолчанию None.
+            recipe (Optional[Dict[str, Any]], optional): JSON-описание того, как пересобрать файл, см. TextureSystem.rebuild. По умолчанию None.
+        """
+        path = os.path.abspath(path)
+        size = os.path.getsize(path)
+        now = time.time()
+        deps = {os.path.abspath(source): cls._fingerprint(source) for source in sources or ()}
+
+        with cls._lock:
+            entries = cls._load()
+            old = entries.get(path)
+            if old is not None:
+                cls._total -= old['size']
+
+            entries[path] = {'size': size, 'created': now, 'last_access': now, 'hits': 0}
+            cls._removed.discard(path)
+            if deps:
+                entries[path]['deps'] = deps
+
+            if recipe is not None:
+                entries[path]['recipe'] = recipe
+
+            cls._total += size
+            cls._changed()
+
+            if cls._total > cls._quota:
+                cls._evict(cls._quota, keep=path)
+
+    @classmethod
+    def tracked(cls, path: Union[str, Path]) -> bool:
+        """Проверяет, учтен ли файл в индексе.
+
+        Args:
+            path (Union[str, Path]): Путь к скомпилированному файлу.
+
+        Returns:
+            bool: True, если файл есть в индексе и не отброшен, см. discard.
+        """
+        with cls._lock:
+            entry = cls._load().get(os.path.abspath(path))
+            return entry is not None and not entry.get('discarded')
+
+    @classmethod
+    def touch(cls, path: Union[str, Path], adopt: bool = False) -> None:
+        """Отмечает обращение к скомпилированному файлу. Индекс при этом не записывается.
+
+        Args:
+            path (Union[str, Path]): Путь к скомпилированному файлу.
+            adopt (bool, optional): Поставить на учет существующий файл, если его нет в индексе. По умолчанию False.
+        """
+        path = os.path.abspath(path)
+        with cls._lock:
+            entry = cls._load().get(path)
+            if entry is None:
+                if adopt and os.path.exists(path):
+                    cls.register(path)
+
+                return
+
+            entry['last_access'] = time.time()
+            entry['hits'] += 1
+            cls._accessed = True
+
+    @staticmethod
+    def _remove_file(path: str) -> bool:
+        """Убирает файл из кеша в памяти и удаляет его с диска.
+
+        Args:
+            path (str): Абсолютный путь к скомпилированному файлу.
+
+        Returns:
+            bool: True, если файла больше нет. False, если удалить не удалось, например файл открыт другим процессом на Windows.
+        """
+        MemoryCache.discard_file(path)
+        try:
+            os.remove(path)
+
+        except FileNotFoundError:
+            pass
+
+        except OSError as err:
+            logging.debug(f"Can't remove compiled file '{path}': {err}")
+            return False
+
+        return True
+
+    @classmethod
+    def discard(cls, path: Union[str, Path]) -> bool:
+        """Удаляет скомпилированный файл с диска и из индекса.
+
+        Если файл удалить не удалось, запись остается в индексе с отметкой discarded и удаляется при следующем gc.
+
+        Args:
+            path (Union[str, Path]): Путь к скомпилированному файлу.
+
+        Returns:
+            bool: True, если файл удален.
+        """
+        path = os.path.abspath(path)
+        with cls._lock:
+            entries = cls._load()
+            if not cls._remove_file(path):
+                if path in entries:
+                    entries[path]['discarded'] = True
+                    cls._changed()
+
+                return False
+
+            entry = entries.pop(path, None)
+            if entry is not None:
+                cls._total -= entry['size']
+                cls._removed.add(path)
+                cls._changed()
+
+            return True
+
+    @classmethod
+    def changed_sources(cls) -> List[str]:
+        """Ищет исходные файлы, изменившиеся после компиляции зависящих от них файлов.
+
+        Каждый исходник проверяется одним os.stat, сколько бы файлов от него ни зависело.
+
+        Returns:
+            List[str]: Отсортированные абсолютные пути измененных или удаленных исходников.
+        """
+        with cls._lock:
+            recorded: Dict[str, List[Optional[List[int]]]] = {}
+            for entry in cls._load().values():
+                if entry.get('discarded'):
+                    continue
+
+                for source, fingerprint in entry.get('deps', {}).items():
+                    recorded.setdefault(source, []).append(fingerprint)
+
+        changed = []
+        for source, fingerprints in recorded.items():
+            current = cls._fingerprint(source)
+            if any(fingerprint != current for fingerprint in fingerprints):
+                changed.append(source)
+
+        return sorted(changed)
+
+    @classmethod
+    def invalidate_sources(cls, sources: Iterable[str]) -> List[Dict[str, Any]]:
+        """Удаляет скомпилированные файлы, зависящие от исходников.
+
+        Args:
+            sources (Iterable[str]): Пути исходных файлов.
+
+        Returns:
+            List[Dict[str, Any]]: Удаленные файлы: путь (path) и описание пересборки (recipe) или None.
+        """
+        sources = {os.path.abspath(source) for source in sources}
+        removed: List[Dict[str, Any]] = []
+        with cls._lock:
+            for path, entry in list(cls._load().items()):
+                if entry.get('discarded') or sources.isdisjoint(entry.get('deps', ())):
+                    continue
+
+                cls.discard(path)
+                removed.append({'path': path, 'recipe': entry.get('recipe')})
+
+        return removed
+
+    @classmethod
+    def _evict(cls, quota: int, keep: Optional[str] = None) -> Dict[str, int]:
+        """Удаляет файлы по политике вытеснения, пока общий объем превышает квоту. Вызывается под блокировкой.
+
+        Args:
+            quota (int): Целевой объем в байтах.
+            keep (Optional[str], optional): Путь, который нельзя удалять. По умолчанию None.
+
+        Returns:
+            Dict[str, int]: Число удаленных файлов и освобожденный объем.
+        """
+        entries = cls._load()
+        if cls._policy == "lfu":
+            order = sorted(entries, key=lambda item: (entries[item]['hits'], entries[item]['last_access']))
+        else:
+            order = sorted(entries, key=lambda item: entries[item]['last_access'])
+
+        removed = 0
+        freed = 0
+        for path in order:
+            if cls._total <= quota:
+                break
+
+            if path == keep:
+                continue
+
+            if not cls._remove_file(path):
+                continue
+
+            size = entries.pop(path)['size']
+            cls._total -= size
+            cls._removed.add(path)
+            removed += 1
+            freed += size
+
+        if removed:
+            cls._changed()
+
+        return {'removed': removed, 'freed': freed}
+
+    @classmethod
+    def scan(cls, root_path: Union[str, Path]) -> int:
+        """Ставит на учет скомпилированные файлы, созданные до появления индекса.
+
+        Ищет *_compiled_* рядом с исходниками и все файлы в Content/Compiled.
+
+        Args:
+            root_path (Union[str, Path]): Корень клиента.
+
+        Returns:
+            int: Число найденных новых файлов.
+        """
+        content_path = Path(root_path) / "Content"
+        compiled_path = content_path / "Compiled"
+        found: List[Path] = [item for item in compiled_path.glob("*") if item.is_file() and item != cls._index_path]
+        found.extend(content_path.rglob("*_compiled_*"))
+        # Временные файлы и блокировки незаконченной записи, журнал precompile, индексы
+        found = [item for item in found if not item.name.endswith(cls.IGNORED_SUFFIXES)]
+
+        added = 0
+        with cls._lock:
+            entries = cls._load()
+            for item in found:
+                if os.path.abspath(item) not in entries:
+                    cls.register(item)
+                    added += 1
+
+        return added
+
+    @classmethod
+    def gc(cls, quota: Optional[int] = None) -> Dict[str, int]:
+        """Убирает из индекса пропавшие файлы, повторно удаляет отброшенные (см. discard) и освобождает место до квоты.
+
+        Args:
+            quota (Optional[int], optional): Целевой объем в байтах. По умолчанию текущая квота.
+
+        Returns:
+            Dict[str, int]: Число удаленных файлов, освобожденный объем, число потерянных записей
+            и число отброшенных файлов, которые все еще не удалось удалить.
+        """
+        with cls._lock:
+            entries = cls._load()
+            discarded = [path for path, entry in entries.items() if entry.get('discarded')]
+            pending = sum(not cls.discard(path) for path in discarded)
+            missing = [path for path in entries if not os.path.exists(path)]
+            for path in missing:
+                cls._total -= entries.pop(path)['size']
+                cls._removed.add(path)
+
+            if missing:
+                cls._changed()
+
+            result = cls._evict(cls._quota if quota is None else quota)
+            result['missing'] = len(missing)
+            result['pending'] = pending
+            cls.save()
+            return result
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """Возвращает статистику скомпилированного кеша.
+
+        Returns:
+            Dict[str, Any]: Число файлов, общий объем, квота, политика и суммарное число обращений.
+        """
+        with cls._lock:
+            entries = cls._load()
+            return {
+                'entries': len(entries),
+                'bytes': cls._total,
+                'quota': cls._quota,
+                'policy': cls._policy,
+                'hits': sum(entry['hits'] for entry in entries.values()),
+                'index': str(cls._index_path),
+            }
+
+
+atexit.register(CompiledCache.save)
@@ -0,0 +1,162 @@
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from .metrics import TextureMetrics
+
+
+class Compositor:
+    """Статический класс Compositor собирает кадры из слоев за один проход.
+
+    На каждый выходной кадр выделяется один холст, все слои накладываются на него на месте.
+    Первый слой копируется как есть, остальные накладываются по своей альфе, как в TextureSystem.merge_images.
+    Накладывается только непрозрачная рамка кадра, поэтому цена слоя зависит от закрытой им площади, а не от размера холста.
+    """
+    __slots__ = []
+    MAX_BBOXES: int = 4096
+    _bboxes: "OrderedDict[Hashable, Optional[Tuple[int, int, int, int]]]" = OrderedDict()
+    _lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def alpha_bbox(frame: Image.Image) -> Optional[Tuple[int, int, int, int]]:
+        """Возвращает рамку непрозрачной части кадра.
+
+        Args:
+            frame (Image.Image): Кадр RGBA.
+
+        Returns:
+            Optional[Tuple[int, int, int, int]]: Рамка или None, если кадр полностью прозрачный.
+        """
+        return frame.getchannel("A").getbbox()
+
+    @staticmethod
+    def cached_bbox(key: Optional[Hashable], frame: Image.Image) -> Optional[Tuple[int, int, int, int]]:
+        """Возвращает рамку непрозрачной части кадра, запоминая её по ключу.
+
+        Args:
+            key (Optional[Hashable]): Ключ кадра, должен меняться вместе с его содержимым. None - не запоминать.
+            frame (Image.Image): Кадр RGBA.
+
+        Returns:
+            Optional[Tuple[int, int, int, int]]: Рамка или None, если кадр полностью прозрачный.
+        """
+        if key is None:
+            return Compositor.alpha_bbox(frame)
+
+        with Compositor._lock:
+            if key in Compositor._bboxes:
+                Compositor._bboxes.move_to_end(key)
+                return Compositor._bboxes[key]
+
+        bbox = Compositor.alpha_bbox(frame)
+        with Compositor._lock:
+            Compositor._bboxes[key] = bbox
+            while len(Compositor._bboxes) > Compositor.MAX_BBOXES:
+                Compositor._bboxes.popitem(last=False)
+
+        return bbox
+
+    @staticmethod
+    def clear() -> None:
+        """Очищает запомненные рамки."""
+        with Compositor._lock:
+            Compositor._bboxes.clear()
+
+    @staticmethod
+    def loop_length(lengths: Sequence[int], cap: int) -> int:
+        """Возвращает длину общего цикла анимаций.
+
+        Это наименьшее общее кратное длин, чтобы каждый слой прошел целое число своих циклов.
+        Если оно больше cap, берется самая длинная анимация, а остальные зацикливаются внутри неё.
+
+        Args:
+            lengths (Sequence[int]): Число кадров каждого слоя.
+            cap (int): Наибольшая допустимая длина цикла.
+
+        Returns:
+            int: Число кадров цикла.
+        """
+        length = math.lcm(*lengths) if lengths else 1
+        return length if length <= cap else max(lengths)
+
+    @staticmethod
+    def loop_indices(lengths: Sequence[int], frame_count: int) -> List[Tuple[int, ...]]:
+        """Возвращает номера кадров каждого слоя для каждого выходного кадра при зацикливании слоев.
+
+        Args:
+            lengths (Sequence[int]): Число кадров каждого слоя.
+            frame_count (int): Число выходных кадров.
+
+        Returns:
+            List[Tuple[int, ...]]: Номера кадров слоев для каждого выходного кадра.
+        """
+        return [tuple(i % length for length in lengths) for i in range(frame_count)]
+
+    @staticmethod
+    def composite_unique(
+        layers: Sequence[Sequence[Image.Image]],
+        size: Tuple[int, int],
+        indices: Sequence[Tuple[int, ...]],
+        offsets: Optional[Sequence[Tuple[int, int]]] = None,
+        keys: Optional[Sequence[Optional[Hashable]]] = None
+    ) -> Tuple[List[Image.Image], List[int]]:
+        """Собирает только различающиеся кадры.
+
+        Выходные кадры с одинаковым набором кадров слоев собираются один раз.
+
+        Args:
+            layers (Sequence[Sequence[Image.Image]]): Кадры каждого слоя снизу вверх.
+            size (Tuple[int, int]): Размер холста.
+            indices (Sequence[Tuple[int, ...]]): Номера кадров слоев для каждого выходного кадра.
+            offsets (Optional[Sequence[Tuple[int, int]]], optional): Смещение каждого слоя на холсте. По умолчанию все (0, 0).
+            keys (Optional[Sequence[Optional[Hashable]]], optional): Ключи слоев для запоминания рамок кадров между вызовами. По умолчанию None.
+
+        Returns:
+            Tuple[List[Image.Image], List[int]]: Уникальные кадры и номер уникального кадра для каждого выходного кадра.
+        """
+        with TextureMetrics.stage("composite"):
+            return Compositor._composite_unique(layers, size, indices, offsets, keys)
+
+    @staticmethod
+    def _composite_unique(
+        layers: Sequence[Sequence[Image.Image]],
+        size: Tuple[int, int],
+        indices: Sequence[Tuple[int, ...]],
+        offsets: Optional[Sequence[Tuple[int, int]]],
+        keys: Optional[Sequence[Optional[Hashable]]]
+    ) -> Tuple[List[Image.Image], List[int]]:
+        """Реализация composite_unique без замера времени."""
+        combos: Dict[Tuple[int, ...], int] = {}
+        timeline = [combos.setdefault(tuple(combo), len(combos)) for combo in indices]
+        canvases = [Image.new("RGBA", size) for _ in range(len(combos))]
+
+        for layer_index, frames in enumerate(layers):
+            offset_x, offset_y = offsets[layer_index] if offsets else (0, 0)
+            layer_key = keys[layer_index] if keys else None
+            regions: Dict[int, Optional[Tuple[Tuple[int, int, int, int], Image.Image]]] = {}
+
+            for combo, canvas_index in combos.items():
+                frame_index = combo[layer_index]
+                canvas = canvases[canvas_index]
+                frame = frames[frame_index]
+
+                if layer_index == 0:
+                    # Нижний слой копируется целиком, включая цвет прозрачных пикселей
+                    canvas.paste(frame, (offset_x, offset_y))
+                    continue
+
+                if frame_index not in regions:
+                    bbox = Compositor.cached_bbox((layer_key, frame_index) if layer_key is not None else None, frame)
+                    # Вне рамки альфа равна нулю, поэтому наложение одной рамки дает тот же результат
+                    regions[frame_index] = (bbox, frame.crop(bbox)) if bbox is not None else None
+
+                if regions[frame_index] is None:
+                    continue
+
+                bbox, region = regions[frame_index]
+                canvas.paste(region, (offset_x + bbox[0], offset_y + bbox[1]), region)
+
+        return canvases, timeline
@@ -0,0 +1,282 @@
+import json
+import logging
+import os
+import posixpath
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import yaml
+
+from .metadata_index import MetadataIndex
+
+
+class ContentIndex:
+    """Статический класс ContentIndex - индекс состояний текстур всего контента.
+
+    Индекс строится одним обходом корня контента (Content/ вместе с Content/Servers/<name>) и отображает
+    идентификатор состояния - путь директории текстур относительно корня и имя состояния через "/",
+    например "Servers/main/mobs/walk" - на директорию, лист и описание из info.yml.
+
+    Индекс сохраняется на диск. При обновлении перечитываются только info.yml, у которых изменились mtime или размер,
+    поэтому запуск не разбирает заново тысячи YAML файлов. Новые директории появляются в индексе после refresh.
+    """
+    __slots__ = []
+    VERSION: int = 1
+
+    _root: Path = Path(__file__).parents[3] / "Content"
+    _index_path: Path = _root / "Compiled" / "content_index.json"
+    _dirs: Optional[Dict[str, Dict[str, Any]]] = None
+    _states: Dict[str, Tuple[str, str]] = {}
+    _names: Dict[str, List[str]] = {}
+    _lock: threading.RLock = threading.RLock()
+
+    @classmethod
+    def configure(cls, root: Union[str, Path, None] = None, index_path: Union[str, Path, None] = None) -> None:
+        """Настраивает корень контента и путь к файлу индекса. Загруженный индекс сбрасывается.
+
+        Args:
+            root (Union[str, Path, None], optional): Корень контента. По умолчанию не меняется.
+            index_path (Union[str, Path, None], optional): Путь к файлу индекса. По умолчанию не меняется.
+        """
+        with cls._lock:
+            if root is not None:
+                cls._root = Path(root)
+
+            if index_path is not None:
+                cls._index_path = Path(index_path)
+
+            cls._dirs = None
+            cls._states = {}
+            cls._names = {}
+
+    @staticmethod
+    def _signature(info_path: str) -> Optional[List[int]]:
+        """Возвращает отпечаток info.yml.
+
+        Args:
+            info_path (str): Путь к info.yml.
+
+        Returns:
+            Optional[List[int]]: mtime в наносекундах и размер файла или None, если файла нет.
+        """
+        try:
+            stat = os.stat(info_path)
+
+        except OSError:
+            return None
+
+        return [stat.st_mtime_ns, stat.st_size]
+
+    @classmethod
+    def _read_dir(cls, relative: str, signature: List[int]) -> Dict[str, Any]:
+        """Разбирает info.yml директории текстур.
+
+        Args:
+            relative (str): Путь директории относительно корня в виде posix.
+            signature (List[int]): Отпечаток info.yml.
+
+        Returns:
+            Dict[str, Any]: Запись директории: отпечаток и описания состояний по имени.
+        """
+        path = str(cls._root / relative) if relative != "." else str(cls._root)
+        states: Dict[str, Dict[str, Any]] = {}
+        try:
+            for sprite in MetadataIndex.get_textures(path):
+                states.setdefault(sprite['name'], sprite)
+
+        except (OSError, yaml.YAMLError, KeyError, TypeError) as err:
+            logging.warning(f"Texture info '{path}/info.yml' is unreadable, skipping: {err}")
+
+        return {'signature': signature, 'states': states}
+
+    @classmethod
+    def _rebuild_lookup(cls) -> None:
+        """Пересобирает словари поиска по загруженным директориям. Вызывается под блокировкой."""
+        states: Dict[str, Tuple[str, str]] = {}
+        names: Dict[str, List[str]] = {}
+        for relative in sorted(cls._dirs or {}):
+            for state in cls._dirs[relative]['states']:  # type: ignore
+                state_id = state if relative == "." else posixpath.join(relative, state)
+                states[state_id] = (relative, state)
+                names.setdefault(state, []).append(state_id)
+
+        cls._states = states
+        cls._names = names
+
+    @classmethod
+    def _read_index(cls) -> bool:
+        """Читает сохраненный индекс. Вызывается под блокировкой.
+
+        Returns:
+            bool: True, если индекс прочитан и построен для текущего корня.
+        """
+        if not cls._index_path.exists():
+            return False
+
+        try:
+            with cls._index_path.open('r', encoding='utf-8') as file:
+                data = json.load(file)
+
+            if data.get('version') != cls.VERSION or data.get('root') != str(cls._root):
+                return False
+
+            cls._dirs = data['dirs']
+
+        except (OSError, ValueError, KeyError, AttributeError) as err:
+            logging.warning(f"Content index '{cls._index_path}' is unreadable, rebuilding: {err}")
+            return False
+
+        cls._rebuild_lookup()
+        return True
+
+    @classmethod
+    def _load(cls) -> Dict[str, Dict[str, Any]]:
+        """Возвращает директории индекса, читая файл индекса или строя индекс при первом обращении.
+
+        Вызывается под блокировкой.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Записи директорий по относительному пути.
+        """
+        if cls._dirs is None and not cls._read_index():
+            cls._dirs = {}
+            cls._walk()
+
+        return cls._dirs  # type: ignore
+
+    @classmethod
+    def _walk(cls) -> Dict[str, int]:
+        """Обходит корень контента и обновляет загруженные директории. Вызывается под блокировкой.
+
+        Returns:
+            Dict[str, int]: Число директорий всего, перечитанных и удаленных.
+        """
+        old = cls._dirs or {}
+        dirs: Dict[str, Dict[str, Any]] = {}
+        parsed = 0
+        if cls._root.is_dir():
+            for texture_dir in MetadataIndex.find_texture_dirs(str(cls._root)):
+                relative = Path(os.path.relpath(texture_dir, cls._root)).as_posix()
+                signature = cls._signature(os.path.join(texture_dir, "info.yml"))
+                if signature is None:
+                    continue
+
+                entry = old.get(relative)
+                if entry is None or entry['signature'] != signature:
+                    entry = cls._read_dir(relative, signature)
+                    parsed += 1
+
+                dirs[relative] = entry
+
+        removed = len(set(old) - set(dirs))
+        cls._dirs = dirs
+        cls._rebuild_lookup()
+        if parsed or removed or not cls._index_path.exists():
+            cls.save()
+
+        return {'dirs': len(dirs), 'parsed': parsed, 'removed': removed}
+
+    @classmethod
+    def refresh(cls) -> Dict[str, int]:
+        """Обходит корень контента и обновляет индекс.
+
+        Перечитываются только новые и измененные info.yml, пропавшие директории удаляются из индекса.
+
+        Returns:
+            Dict[str, int]: Число директорий всего, перечитанных и удаленных.
+        """
+        with cls._lock:
+            if cls._dirs is None and not cls._read_index():
+                cls._dirs = {}
+
+            return cls._walk()
+
+    @classmethod
+    def save(cls) -> None:
+        """Записывает индекс на диск."""
+        with cls._lock:
+            if cls._dirs is None:
+                return
+
+            cls._index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cls._index_path.with_name(f"{cls._index_path.name}.{os.getpid()}.tmp")
+            with tmp_path.open('w', encoding='utf-8') as file:
+                json.dump({'version': cls.VERSION, 'root': str(cls._root), 'dirs': cls._dirs}, file)
+
+            os.replace(tmp_path, cls._index_path)
+
+    @classmethod
+    def get(cls, state_id: str) -> Optional[Dict[str, Any]]:
+        """Возвращает сведения о состоянии по идентификатору.
+
+        Если info.yml директории изменился с момента индексации, директория перечитывается.
+
+        Args:
+            state_id (str): Идентификатор состояния, например "Servers/main/mobs/walk".
+
+        Returns:
+            Optional[Dict[str, Any]]: Директория текстур (path), имя состояния (state), путь к листу (sheet)
+            и описание из info.yml (info), либо None, если состояния нет. Изменять описание нельзя.
+        """
+        with cls._lock:
+            cls._load()
+            found = cls._states.get(state_id)
+            if found is None:
+                return None
+
+            relative, state = found
+            path = str(cls._root) if relative == "." else str(cls._root / relative)
+            signature = cls._signature(os.path.join(path, "info.yml"))
+            if signature != cls._dirs[relative]['signature']:  # type: ignore
+                if signature is None:
+                    del cls._dirs[relative]  # type: ignore
+
+                else:
+                    cls._dirs[relative] = cls._read_dir(relative, signature)  # type: ignore
+
+                cls._rebuild_lookup()
+                cls.save()
+                if state_id not in cls._states:
+                    return None
+
+            return {
+                'path': path,
+                'state': state,
+                'sheet': os.path.join(path, f"{state}.png"),
+                'info': cls._dirs[relative]['states'][state],  # type: ignore
+            }
+
+    @classmethod
+    def find(cls, state: str, pack: Optional[str] = None) -> List[str]:
+        """Ищет идентификаторы состояний по имени.
+
+        Args:
+            state (str): Имя состояния.
+            pack (Optional[str], optional): Имя серверного пакета контента (Content/Servers/<pack>). По умолчанию все пакеты и клиент.
+
+        Returns:
+            List[str]: Отсортированные идентификаторы.
+        """
+        with cls._lock:
+            cls._load()
+            found = cls._names.get(state, [])
+            if pack is not None:
+                prefix = posixpath.join("Servers", pack) + "/"
+                found = [state_id for state_id in found if state_id.startswith(prefix)]
+
+            return list(found)
+
+    @classmethod
+    def states(cls, prefix: str = "") -> List[str]:
+        """Возвращает идентификаторы всех состояний.
+
+        Args:
+            prefix (str, optional): Оставить только идентификаторы с этим началом, например "Servers/main/". По умолчанию все.
+
+        Returns:
+            List[str]: Отсортированные идентификаторы.
+        """
+        with cls._lock:
+            cls._load()
+            return sorted(state_id for state_id in cls._states if state_id.startswith(prefix))
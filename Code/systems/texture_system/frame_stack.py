@@ -0,0 +1,132 @@
+from typing import Iterator, List, Sequence, Tuple, Union, overload
+
+import numpy as np
+from PIL import Image
+
+from .frame_strip import FrameStrip
+
+
+class FrameStack(Sequence[Image.Image]):
+    """Класс FrameStack - кадры анимации в одном непрерывном буфере формы (кадры, H, W, 4) uint8.
+
+    Буфер целиком передается в векторные операции (перекраска, перевод в float32 для DearPyGui) без обхода по кадрам.
+    Как последовательность отдает кадры изображениями только для чтения поверх буфера, без копирования.
+    PIL сам копирует такой кадр при первой попытке его изменить.
+    """
+    __slots__ = ['array', 'durations']
+
+    def __init__(self, array: np.ndarray, durations: Union[int, Sequence[int]]) -> None:
+        """Создает стек поверх массива кадров.
+
+        Args:
+            array (np.ndarray): Массив формы (кадры, H, W, 4). Приводится к непрерывному uint8 без копирования, если он уже такой.
+            durations (Union[int, Sequence[int]]): Длительность кадра в миллисекундах, общая или для каждого кадра.
+
+        Raises:
+            ValueError: Если форма массива или число длительностей не подходят.
+        """
+        if array.ndim != 4 or array.shape[3] != 4 or array.shape[0] == 0:
+            raise ValueError(f"Frame stack needs a (frames, H, W, 4) array, got {array.shape}")
+
+        self.array: np.ndarray = np.ascontiguousarray(array, dtype=np.uint8)
+        self.durations: List[int] = [durations] * len(array) if isinstance(durations, int) else list(durations)
+        if len(self.durations) != len(array):
+            raise ValueError("Frame and duration counts differ")
+
+    @classmethod
+    def from_frames(cls, frames: Sequence[Union[Image.Image, np.ndarray]], durations: Union[int, Sequence[int], None] = None) -> "FrameStack":
+        """Собирает стек из кадров одного размера, копируя каждый кадр прямо в общий буфер.
+
+        Args:
+            frames (Sequence[Union[Image.Image, np.ndarray]]): Изображения, массивы (H, W, 4) uint8, FrameStrip или FrameStack.
+            durations (Union[int, Sequence[int], None], optional): Длительности кадров. По умолчанию берутся из кадров
+                (FrameStrip, FrameStack), иначе 100 мс.
+
+        Raises:
+            ValueError: Если кадров нет или они разного размера.
+
+        Returns:
+            FrameStack: Новый стек.
+        """
+        if durations is None:
+            durations = getattr(frames, 'durations', 100)
+
+        if isinstance(frames, FrameStack):
+            return cls(frames.array.copy(), durations)
+
+        if not len(frames):
+            raise ValueError("Can't build a frame stack without frames")
+
+        arrays = [frames.array(index) for index in range(len(frames))] if isinstance(frames, FrameStrip) else frames
+        first = arrays[0]
+        height, width = (first.height, first.width) if isinstance(first, Image.Image) else first.shape[:2]
+
+        array = np.empty((len(arrays), height, width, 4), dtype=np.uint8)
+        for index, frame in enumerate(arrays):
+            if isinstance(frame, Image.Image):
+                frame = np.asarray(frame if frame.mode == "RGBA" else frame.convert("RGBA"))
+
+            if frame.shape != (height, width, 4):
+                raise ValueError("All frames of a frame stack must have the same size")
+
+            array[index] = frame
+
+        return cls(array, durations)
+
+    @property
+    def width(self) -> int:
+        """Ширина кадра."""
+        return self.array.shape[2]
+
+    @property
+    def height(self) -> int:
+        """Высота кадра."""
+        return self.array.shape[1]
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Размер кадра."""
+        return self.width, self.height
+
+    @property
+    def nbytes(self) -> int:
+        """Объем буфера в байтах."""
+        return self.array.nbytes
+
+    def __len__(self) -> int:
+        return self.array.shape[0]
+
+    def frame_array(self, index: int) -> np.ndarray:
+        """Возвращает кадр как представление буфера формы (H, W, 4) без копирования.
+
+        Args:
+            index (int): Номер кадра.
+
+        Returns:
+            np.ndarray: Кадр.
+        """
+        return self.array[index]
+
+    @overload
+    def __getitem__(self, index: int) -> Image.Image: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Image.Image]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Image.Image, List[Image.Image]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        return Image.frombuffer("RGBA", self.size, self.array[index], "raw", "RGBA", 0, 1)
+
+    def __iter__(self) -> Iterator[Image.Image]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_images(self) -> List[Image.Image]:
+        """Переводит кадры в список независимых изменяемых изображений.
+
+        Returns:
+            List[Image.Image]: Копии кадров.
+        """
+        return [self[index].copy() for index in range(len(self))]
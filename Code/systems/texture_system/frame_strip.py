@@ -0,0 +1,320 @@
+import mmap
+import struct
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union, overload
+
+import numpy as np
+from PIL import Image
+
+
+class FrameStrip(Sequence[Image.Image]):
+    """Класс FrameStrip - кадры анимации в формате несжатой полосы RGBA.
+
+    Файл состоит из заголовка (сигнатура, версия, размер кадра, число кадров), числа уникальных кадров,
+    длительностей кадров в миллисекундах, временной шкалы (номер уникального кадра для каждого кадра)
+    и подряд идущих уникальных кадров RGBA. Одинаковые кадры хранятся один раз.
+    Файл отображается в память через mmap, кадры отдаются как изображения только для чтения
+    поверх отображения, без копирования. PIL сам копирует такой кадр при первой попытке его изменить.
+
+    Открытая полоса владеет отображением. Вызывающему коду кеш отдает представления (view): их закрытие
+    не трогает отображение владельца. Владелец закрывается сборщиком мусора, когда на него не остается ссылок.
+    """
+    __slots__ = ['path', 'width', 'height', 'durations', 'timeline', 'unique_count', '_file', '_map', '_data_offset', '_owner']
+    MAGIC: bytes = b"DMFS"
+    VERSION: int = 2
+    EXTENSION: str = ".frames"
+    _HEADER = struct.Struct("<4sHHIII")
+    _COUNT = struct.Struct("<I")
+    _ALIGN: int = 16
+
+    def __init__(self, path: str) -> None:
+        """Открывает файл полосы кадров.
+
+        Args:
+            path (str): Путь к файлу.
+
+        Raises:
+            ValueError: Если файл поврежден или записан другой версией формата.
+        """
+        self.path: str = path
+        self._owner: Optional[FrameStrip] = None
+        self._file = open(path, 'rb')
+        try:
+            self._map: Optional[mmap.mmap] = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        except ValueError:  # Пустой файл нельзя отобразить в память
+            self._file.close()
+            raise ValueError(f"Frame strip '{path}' is empty")
+
+        try:
+            self._parse_header()
+
+        except ValueError:
+            self.close()
+            raise
+
+    def view(self) -> "FrameStrip":
+        """Создает представление поверх того же отображения без повторного открытия файла.
+
+        Представление держит владельца живым. Его close освобождает только само представление.
+
+        Raises:
+            ValueError: Если файл уже закрыт.
+
+        Returns:
+            FrameStrip: Новое представление.
+        """
+        if self._map is None or self._map.closed:
+            raise ValueError(f"Frame strip '{self.path}' is closed")
+
+        view = FrameStrip.__new__(FrameStrip)
+        view.path = self.path
+        view.width = self.width
+        view.height = self.height
+        view.unique_count = self.unique_count
+        view.durations = list(self.durations)
+        view.timeline = list(self.timeline)
+        view._data_offset = self._data_offset
+        view._file = None
+        view._map = self._map
+        view._owner = self._owner if self._owner is not None else self
+        return view
+
+    def _parse_header(self) -> None:
+        """Читает заголовок и проверяет размер файла.
+
+        Raises:
+            ValueError: Если файл поврежден или записан другой версией формата.
+        """
+        buffer = self._map
+        if len(buffer) < self._HEADER.size:
+            raise ValueError(f"Frame strip '{self.path}' is truncated")
+
+        magic, version, _, width, height, frame_count = self._HEADER.unpack_from(buffer, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError(f"'{self.path}' is not a frame strip of version {self.VERSION}")
+
+        durations_offset = self._HEADER.size + self._COUNT.size
+        timeline_offset = durations_offset + 4 * frame_count
+        self._data_offset: int = FrameStrip._aligned(timeline_offset + 4 * frame_count)
+        if len(buffer) < self._data_offset:
+            raise ValueError(f"Frame strip '{self.path}' is truncated")
+
+        unique_count, = self._COUNT.unpack_from(buffer, self._HEADER.size)
+        if len(buffer) != self._data_offset + unique_count * width * height * 4:
+            raise ValueError(f"Frame strip '{self.path}' is truncated")
+
+        self.width: int = width
+        self.height: int = height
+        self.unique_count: int = unique_count
+        self.durations: List[int] = list(struct.unpack_from(f"<{frame_count}I", buffer, durations_offset))
+        self.timeline: List[int] = list(struct.unpack_from(f"<{frame_count}I", buffer, timeline_offset))
+        if any(index >= unique_count for index in self.timeline):
+            raise ValueError(f"Frame strip '{self.path}' has a broken timeline")
+
+    @staticmethod
+    def _aligned(offset: int) -> int:
+        """Выравнивает смещение начала кадров.
+
+        Args:
+            offset (int): Смещение.
+
+        Returns:
+            int: Смещение, кратное _ALIGN.
+        """
+        return -(-offset // FrameStrip._ALIGN) * FrameStrip._ALIGN
+
+    @staticmethod
+    def write(path: str, frames: Sequence[Union[Image.Image, np.ndarray]], durations: Union[int, Sequence[int]], timeline: Optional[Sequence[int]] = None) -> None:
+        """Записывает кадры в файл полосы кадров.
+
+        Одинаковые кадры записываются один раз, повторы ссылаются на них через временную шкалу.
+
+        Args:
+            path (str): Путь к файлу.
+            frames (Sequence[Union[Image.Image, np.ndarray]]): Кадры одного размера, изображения RGBA или массивы (H, W, 4) uint8.
+            durations (Union[int, Sequence[int]]): Длительность кадра в миллисекундах, общая или для каждого кадра шкалы.
+            timeline (Optional[Sequence[int]], optional): Номер кадра из frames для каждого кадра анимации. По умолчанию кадры идут по порядку.
+
+        Raises:
+            ValueError: Если кадров нет, они разного размера или шкала ссылается на несуществующий кадр.
+        """
+        if not frames:
+            raise ValueError("Can't write a frame strip without frames")
+
+        if timeline is None:
+            timeline = range(len(frames))
+
+        if isinstance(durations, int):
+            durations = [durations] * len(timeline)
+
+        if len(durations) != len(timeline):
+            raise ValueError("Frame and duration counts differ")
+
+        if not all(0 <= index < len(frames) for index in timeline):
+            raise ValueError("Timeline refers to a missing frame")
+
+        first = frames[0]
+        height, width = (first.height, first.width) if isinstance(first, Image.Image) else first.shape[:2]
+
+        unique: Dict[bytes, int] = {}
+        remap: List[int] = []
+        for frame in frames:
+            if isinstance(frame, Image.Image):
+                if frame.size != (width, height):
+                    raise ValueError("All frames of a frame strip must have the same size")
+
+                data = frame.convert("RGBA").tobytes() if frame.mode != "RGBA" else frame.tobytes()
+
+            else:
+                if frame.shape != (height, width, 4):
+                    raise ValueError("All frames of a frame strip must have the same size")
+
+                data = np.ascontiguousarray(frame, dtype=np.uint8).tobytes()
+
+            remap.append(unique.setdefault(data, len(unique)))
+
+        timeline = [remap[index] for index in timeline]
+        header = FrameStrip._HEADER.pack(FrameStrip.MAGIC, FrameStrip.VERSION, 0, width, height, len(timeline))
+        header += FrameStrip._COUNT.pack(len(unique))
+        header += struct.pack(f"<{len(durations)}I", *durations)
+        header += struct.pack(f"<{len(timeline)}I", *timeline)
+        header += b"\0" * (FrameStrip._aligned(len(header)) - len(header))
+
+        with open(path, 'wb') as file:
+            file.write(header)
+            for data in unique:  # Словарь хранит порядок добавления, он совпадает с номерами в шкале
+                file.write(data)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Размер кадра."""
+        return self.width, self.height
+
+    @property
+    def frame_bytes(self) -> int:
+        """Размер одного кадра в байтах."""
+        return self.width * self.height * 4
+
+    @property
+    def nbytes(self) -> int:
+        """Объем данных уникальных кадров в байтах."""
+        return self.frame_bytes * self.unique_count
+
+    def __len__(self) -> int:
+        return len(self.durations)
+
+    def _unique_buffer(self, unique_index: int) -> memoryview:
+        """Возвращает буфер уникального кадра внутри отображения без копирования.
+
+        Args:
+            unique_index (int): Номер уникального кадра.
+
+        Raises:
+            ValueError: Если файл уже закрыт.
+
+        Returns:
+            memoryview: Буфер кадра.
+        """
+        if self._map is None or self._map.closed:
+            raise ValueError(f"Frame strip '{self.path}' is closed")
+
+        start = self._data_offset + unique_index * self.frame_bytes
+        return memoryview(self._map)[start:start + self.frame_bytes]
+
+    def _frame_buffer(self, index: int) -> memoryview:
+        """Возвращает буфер кадра внутри отображения без копирования.
+
+        Args:
+            index (int): Номер кадра.
+
+        Raises:
+            IndexError: Если номер кадра вне диапазона.
+            ValueError: Если файл уже закрыт.
+
+        Returns:
+            memoryview: Буфер кадра.
+        """
+        length = len(self.durations)
+        if index < 0:
+            index += length
+
+        if not 0 <= index < length:
+            raise IndexError("Frame index out of range")
+
+        return self._unique_buffer(self.timeline[index])
+
+    def array(self, index: int) -> np.ndarray:
+        """Возвращает кадр как массив (H, W, 4) только для чтения без копирования.
+
+        Args:
+            index (int): Номер кадра.
+
+        Returns:
+            np.ndarray: Кадр.
+        """
+        return np.frombuffer(self._frame_buffer(index), dtype=np.uint8).reshape(self.height, self.width, 4)
+
+    def unique_array(self, unique_index: int) -> np.ndarray:
+        """Возвращает уникальный кадр как массив (H, W, 4) только для чтения без копирования.
+
+        Args:
+            unique_index (int): Номер уникального кадра, см. timeline.
+
+        Raises:
+            IndexError: Если номер вне диапазона.
+
+        Returns:
+            np.ndarray: Кадр.
+        """
+        if not 0 <= unique_index < self.unique_count:
+            raise IndexError("Unique frame index out of range")
+
+        return np.frombuffer(self._unique_buffer(unique_index), dtype=np.uint8).reshape(self.height, self.width, 4)
+
+    @overload
+    def __getitem__(self, index: int) -> Image.Image: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Image.Image]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Image.Image, List[Image.Image]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        return Image.frombuffer("RGBA", self.size, self._frame_buffer(index), "raw", "RGBA", 0, 1)
+
+    def __iter__(self) -> Iterator[Image.Image]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self) -> None:
+        """Закрывает отображение и файл. Кадры, полученные ранее, становятся недействительными.
+
+        Представление (см. view) только отпускает отображение владельца.
+        """
+        if self._file is None:
+            self._map = None
+            self._owner = None
+            return
+
+        if self._map is not None:
+            try:
+                self._map.close()
+
+            except BufferError:  # На отображение еще ссылаются кадры, его закроет сборщик мусора
+                pass
+
+            self._map = None
+
+        self._file.close()
+
+    def __enter__(self) -> "FrameStrip":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        file = getattr(self, '_file', None)
+        if file is not None and not file.closed:
+            self.close()
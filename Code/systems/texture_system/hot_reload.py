@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from .compiled_cache import CompiledCache
+from .content_index import ContentIndex
+from .memory_cache import MemoryCache
+from .metadata_index import MetadataIndex
+from .prefix_cache import PrefixCache
+from .texture_system import TextureSystem
+
+Listener = Callable[[List[str], List[str]], None]
+
+
+class HotReload:
+    """Статический класс HotReload следит за исходниками текстур и сбрасывает только зависящие от них результаты.
+
+    CompiledCache хранит для каждого скомпилированного файла отпечатки его исходников (листов и info.yml).
+    Наблюдатель периодически сравнивает их с файлами на диске. Для измененных исходников удаляются зависимые
+    перекраски, анимации, масштабы и объединения, записи MemoryCache и PrefixCache и индексы метаданных.
+    Подписчики, например TextureBridge, получают список измененных исходников и удаленных файлов.
+    Подписчику с циклом событий уведомление передается в этот цикл, а не вызывается из потока наблюдателя.
+    По желанию удаленные файлы пересобираются в фоне.
+    """
+    __slots__ = []
+    DEFAULT_INTERVAL: float = 1.0
+
+    _listeners: List[Tuple[Listener, Optional[asyncio.AbstractEventLoop]]] = []
+    _thread: Optional[threading.Thread] = None
+    _stop: threading.Event = threading.Event()
+    _lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def affects(key: Hashable, sources: Iterable[str], paths: Iterable[str] = ()) -> bool:
+        """Проверяет, зависит ли запись кеша в памяти от исходников или удаленных файлов.
+
+        Args:
+            key (Hashable): Ключ, см. MemoryCache.make_key.
+            sources (Iterable[str]): Абсолютные пути измененных исходников.
+            paths (Iterable[str], optional): Абсолютные пути удаленных скомпилированных файлов. По умолчанию нет.
+
+        Returns:
+            bool: True, если запись устарела.
+        """
+        if not isinstance(key, tuple) or len(key) < 2 or not isinstance(key[0], str):
+            return False
+
+        base = os.path.abspath(key[0])
+        if key[1] is None:  # Объединение слоев, ключ - путь к файлу результата
+            return base in paths
+
+        return os.path.join(base, f"{key[1]}.png") in sources or os.path.join(base, "info.yml") in sources
+
+    @classmethod
+    def subscribe(cls, listener: Listener, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Подписывает функцию на сброс.
+
+        Args:
+            listener (Listener): Функция, принимающая измененные исходники и удаленные файлы.
+            loop (Optional[asyncio.AbstractEventLoop], optional): Цикл событий, в котором вызывается функция, например цикл GUI.
+                По умолчанию функция вызывается из потока наблюдателя.
+        """
+        with cls._lock:
+            if all(subscribed != listener for subscribed, _ in cls._listeners):
+                cls._listeners.append((listener, loop))
+
+    @classmethod
+    def unsubscribe(cls, listener: Listener) -> None:
+        """Отписывает функцию от сброса.
+
+        Args:
+            listener (Listener): Подписанная функция.
+        """
+        with cls._lock:
+            cls._listeners = [(subscribed, loop) for subscribed, loop in cls._listeners if subscribed != listener]
+
+    @staticmethod
+    def _notify(listener: Listener, sources: List[str], paths: List[str]) -> None:
+        """Вызывает подписчика, записывая его ошибку в лог.
+
+        Args:
+            listener (Listener): Подписанная функция.
+            sources (List[str]): Измененные исходники.
+            paths (List[str]): Удаленные скомпилированные файлы.
+        """
+        try:
+            listener(sources, paths)
+
+        except Exception as err:
+            logging.error(f"Texture reload listener failed: {err}")
+
+    @classmethod
+    def invalidate(cls, sources: Iterable[str], rebuild: bool = False) -> List[str]:
+        """Сбрасывает всё, что зависит от исходников.
+
+        Args:
+            sources (Iterable[str]): Пути измененных исходников.
+            rebuild (bool, optional): Пересобрать удаленные файлы в пуле TextureSystem. По умолчанию False.
+
+        Returns:
+            List[str]: Пути удаленных скомпилированных файлов.
+        """
+        sources: Set[str] = {os.path.abspath(source) for source in sources}
+        if not sources:
+            return []
+
+        for source in sources:
+            if os.path.basename(source) == "info.yml":
+                MetadataIndex.invalidate(os.path.dirname(source))
+
+        # Отображения FrameStrip закрываются раньше удаления их файлов
+        MemoryCache.discard_if(lambda key: cls.affects(key, sources))
+        removed = CompiledCache.invalidate_sources(sources)
+        paths = {entry['path'] for entry in removed}
+        MemoryCache.discard_if(lambda key: cls.affects(key, sources, paths))
+        PrefixCache.discard_sources(sources)
+        CompiledCache.save()
+        logging.debug(f"Texture sources changed: {sorted(sources)}, invalidated {len(removed)} compiled files")
+
+        with cls._lock:
+            listeners = list(cls._listeners)
+
+        for listener, loop in listeners:
+            if loop is None:
+                cls._notify(listener, sorted(sources), sorted(paths))
+                continue
+
+            try:
+                loop.call_soon_threadsafe(cls._notify, listener, sorted(sources), sorted(paths))
+
+            except RuntimeError:  # Цикл уже закрыт
+                logging.debug(f"Texture reload listener {listener} lost its event loop")
+
+        if rebuild:
+            recipes = [entry['recipe'] for entry in removed if entry['recipe'] is not None]
+            for recipe in recipes:
+                TextureSystem._get_executor().submit(cls._rebuild, recipe)
+
+        return sorted(paths)
+
+    @staticmethod
+    def _rebuild(recipe: Dict[str, Any]) -> None:
+        """Пересобирает файл, записывая ошибку в лог. Исходник мог быть удален.
+
+        Args:
+            recipe (Dict[str, Any]): Описание пересборки.
+        """
+        try:
+            TextureSystem.rebuild(recipe)
+
+        except Exception as err:
+            logging.warning(f"Can't rebuild compiled texture {recipe}: {err}")
+
+    @classmethod
+    def poll(cls, rebuild: bool = False) -> List[str]:
+        """Один проход наблюдателя: ищет измененные исходники и сбрасывает зависимые результаты.
+
+        Args:
+            rebuild (bool, optional): Пересобрать удаленные файлы в фоне. По умолчанию False.
+
+        Returns:
+            List[str]: Пути измененных исходников.
+        """
+        changed = CompiledCache.changed_sources()
+        if changed:
+            cls.invalidate(changed, rebuild)
+            ContentIndex.refresh()
+
+        return changed
+
+    @classmethod
+    def start(cls, interval: float = DEFAULT_INTERVAL, rebuild: bool = False) -> None:
+        """Запускает наблюдатель в фоновом потоке. Повторный запуск ничего не делает.
+
+        Args:
+            interval (float, optional): Период опроса в секундах. По умолчанию DEFAULT_INTERVAL.
+            rebuild (bool, optional): Пересобирать удаленные файлы в фоне. По умолчанию False.
+        """
+        with cls._lock:
+            if cls._thread is not None and cls._thread.is_alive():
+                return
+
+            cls._stop.clear()
+            cls._thread = threading.Thread(target=cls._run, args=(interval, rebuild), name="TextureHotReload", daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def stop(cls) -> None:
+        """Останавливает наблюдатель и ждет завершения потока."""
+        cls._stop.set()
+        thread = cls._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+        cls._thread = None
+
+    @classmethod
+    def _run(cls, interval: float, rebuild: bool) -> None:
+        """Цикл наблюдателя.
+
+        Args:
+            interval (float): Период опроса в секундах.
+            rebuild (bool): Пересобирать удаленные файлы.
+        """
+        while not cls._stop.wait(interval):
+            try:
+                cls.poll(rebuild)
+
+            except Exception as err:
+                logging.error(f"Texture hot reload failed: {err}")
@@ -0,0 +1,196 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from PIL import Image
+
+
+class MemoryCache:
+    """Статический класс MemoryCache - общий для процесса LRU-кеш декодированных изображений и списков кадров.
+
+    Размер кеша ограничен бюджетом в байтах. При переполнении вытесняются давно не использованные записи.
+    """
+    __slots__ = []
+    DEFAULT_BUDGET: int = 256 * 1024 * 1024
+
+    _budget: int = DEFAULT_BUDGET
+    _used: int = 0
+    _hits: int = 0
+    _misses: int = 0
+    _entries: "OrderedDict[Hashable, Tuple[Any, int, Any]]" = OrderedDict()
+    _lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def make_key(path: str, state: Optional[str], color: Optional[Iterable[int]], kind: str) -> Tuple[str, Optional[str], Optional[Tuple[int, ...]], str]:
+        """Собирает ключ кеша.
+
+        Args:
+            path (str): Путь к директории с текстурами или к скомпилированному файлу.
+            state (Optional[str]): Имя состояния.
+            color (Optional[Iterable[int]]): Цвет в формате RGBA или None.
+            kind (str): Вид записи, например "png" или "gif".
+
+        Returns:
+            Tuple[str, Optional[str], Optional[Tuple[int, ...]], str]: Ключ кеша.
+        """
+        return os.fspath(path), state, tuple(color) if color is not None else None, kind
+
+    @staticmethod
+    def sizeof(value: Any) -> int:
+        """Оценивает объем памяти, занимаемый изображением или списком кадров.
+
+        Args:
+            value (Any): Изображение, список изображений или объект с атрибутом nbytes (FrameStrip, FrameStack, массив).
+
+        Returns:
+            int: Размер в байтах.
+        """
+        if isinstance(value, Image.Image):
+            width, height = value.size
+            return width * height * len(value.getbands())
+
+        nbytes = getattr(value, 'nbytes', None)
+        if nbytes is not None:
+            return nbytes
+
+        return sum(MemoryCache.sizeof(item) for item in value)
+
+    @classmethod
+    def get(cls, key: Hashable, version: Any = None) -> Optional[Any]:
+        """Возвращает запись из кеша и отмечает её как недавно использованную.
+
+        Args:
+            key (Hashable): Ключ кеша.
+            version (Any, optional): Ожидаемая версия записи. Запись другой версии устарела, она удаляется и считается промахом. По умолчанию None.
+
+        Returns:
+            Optional[Any]: Сохраненное значение или None. Значение разделяется между вызовами, изменять его нельзя.
+        """
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is None or entry[2] != version:
+                if entry is not None:
+                    del cls._entries[key]
+                    cls._used -= entry[1]
+
+                cls._misses += 1
+                return None
+
+            cls._entries.move_to_end(key)
+            cls._hits += 1
+            return entry[0]
+
+    @classmethod
+    def put(cls, key: Hashable, value: Any, version: Any = None) -> None:
+        """Сохраняет запись в кеш, вытесняя старые записи при превышении бюджета.
+
+        Args:
+            key (Hashable): Ключ кеша.
+            value (Any): Изображение или список кадров.
+            version (Any, optional): Версия записи, например отпечаток исходников. По умолчанию None.
+        """
+        size = cls.sizeof(value)
+        with cls._lock:
+            old = cls._entries.pop(key, None)
+            if old is not None:
+                cls._used -= old[1]
+
+            if size > cls._budget:
+                return
+
+            cls._entries[key] = (value, size, version)
+            cls._used += size
+            cls._evict()
+
+    @classmethod
+    def _evict(cls) -> None:
+        """Вытесняет записи, пока занятый объем превышает бюджет. Вызывается под блокировкой."""
+        while cls._used > cls._budget and cls._entries:
+            _, (_, size, _) = cls._entries.popitem(last=False)
+            cls._used -= size
+
+    @classmethod
+    def set_budget(cls, budget: int) -> None:
+        """Задает бюджет кеша в байтах.
+
+        Args:
+            budget (int): Максимальный объем декодированных данных.
+        """
+        with cls._lock:
+            cls._budget = budget
+            cls._evict()
+
+    @classmethod
+    def discard(cls, key: Hashable) -> None:
+        """Удаляет запись из кеша, если она есть.
+
+        Args:
+            key (Hashable): Ключ кеша.
+        """
+        with cls._lock:
+            entry = cls._entries.pop(key, None)
+            if entry is not None:
+                cls._used -= entry[1]
+
+    @classmethod
+    def discard_if(cls, predicate: Callable[[Hashable], bool]) -> int:
+        """Удаляет записи, ключи которых удовлетворяют условию.
+
+        Args:
+            predicate (Callable[[Hashable], bool]): Условие на ключ.
+
+        Returns:
+            int: Число удаленных записей.
+        """
+        with cls._lock:
+            stale = [key for key in cls._entries if predicate(key)]
+            for key in stale:
+                cls._used -= cls._entries.pop(key)[1]
+
+            return len(stale)
+
+    @classmethod
+    def discard_file(cls, path: str) -> int:
+        """Удаляет записи, отображающие файл с диска (FrameStrip), перед его заменой или удалением.
+
+        Уже выданные представления не закрываются, отображение закроет сборщик мусора.
+
+        Args:
+            path (str): Путь к файлу.
+
+        Returns:
+            int: Число удаленных записей.
+        """
+        path = os.path.abspath(path)
+        with cls._lock:
+            stale = [key for key, (value, _, _) in cls._entries.items() if isinstance(getattr(value, 'path', None), str) and os.path.abspath(value.path) == path]
+            for key in stale:
+                cls._used -= cls._entries.pop(key)[1]
+
+            return len(stale)
+
+    @classmethod
+    def clear(cls) -> None:
+        """Очищает кеш и сбрасывает счетчики."""
+        with cls._lock:
+            cls._entries.clear()
+            cls._used = 0
+            cls._hits = 0
+            cls._misses = 0
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """Возвращает статистику кеша.
+
+        Returns:
+            Dict[str, int]: Попадания, промахи, число записей, занятый объем и бюджет.
+        """
+        with cls._lock:
+            return {
+                'hits': cls._hits,
+                'misses': cls._misses,
+                'entries': len(cls._entries),
+                'bytes': cls._used,
+                'budget': cls._budget,
+            }
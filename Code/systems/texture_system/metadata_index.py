@@ -0,0 +1,120 @@
+import copy
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from .metrics import TextureMetrics
+
+
+class MetadataIndex:
+    """Статический класс MetadataIndex хранит разобранные info.yml директорий текстур.
+
+    Каждый info.yml читается один раз и раскладывается в словарь по имени состояния.
+    Запись считается устаревшей, если у файла изменились mtime или размер.
+    """
+    __slots__ = []
+    _entries: Dict[str, Tuple[Tuple[int, int], List[Dict[str, Any]], Dict[str, Dict[str, Any]]]] = {}
+    _lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def _signature(info_path: str) -> Tuple[int, int]:
+        """Возвращает отпечаток файла для проверки актуальности записи.
+
+        Args:
+            info_path (str): Путь к info.yml.
+
+        Returns:
+            Tuple[int, int]: mtime в наносекундах и размер файла.
+        """
+        stat = os.stat(info_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    @classmethod
+    def _get_entry(cls, path: str) -> Tuple[Tuple[int, int], List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """Возвращает актуальную запись индекса, при необходимости перечитывая info.yml.
+
+        Args:
+            path (str): Путь к директории с текстурами.
+
+        Returns:
+            Tuple[Tuple[int, int], List[Dict[str, Any]], Dict[str, Dict[str, Any]]]: Отпечаток файла, список текстур и словарь состояний.
+        """
+        info_path = f"{path}/info.yml"
+        signature = cls._signature(info_path)
+
+        entry = cls._entries.get(info_path)
+        if entry is not None and entry[0] == signature:
+            return entry
+
+        with cls._lock:
+            entry = cls._entries.get(info_path)
+            if entry is not None and entry[0] == signature:
+                return entry
+
+            with TextureMetrics.stage("yaml_parse"), open(info_path, 'r') as file:
+                info = yaml.safe_load(file) or {}
+
+            textures = info.get('Texture', [])
+            states: Dict[str, Dict[str, Any]] = {}
+            for sprite in textures:
+                states.setdefault(sprite['name'], sprite)  # При дубликатах побеждает первое состояние, как и раньше
+
+            entry = (signature, textures, states)
+            cls._entries[info_path] = entry
+            return entry
+
+    @classmethod
+    def get_textures(cls, path: str) -> List[Dict[str, Any]]:
+        """Возвращает список текстур из info.yml директории.
+
+        Args:
+            path (str): Путь к директории с текстурами.
+
+        Returns:
+            List[Dict[str, Any]]: Копия списка текстур.
+        """
+        return copy.deepcopy(cls._get_entry(path)[1])
+
+    @classmethod
+    def get_sprite(cls, path: str, state: str) -> Optional[Dict[str, Any]]:
+        """Возвращает описание состояния из info.yml.
+
+        Args:
+            path (str): Путь к директории с текстурами.
+            state (str): Имя состояния.
+
+        Returns:
+            Optional[Dict[str, Any]]: Описание состояния или None, если его нет. Изменять словарь нельзя.
+        """
+        return cls._get_entry(path)[2].get(state)
+
+    @staticmethod
+    def find_texture_dirs(root: str) -> List[str]:
+        """Ищет директории текстур (с info.yml).
+
+        Args:
+            root (str): Директория текстур или корень пакета контента.
+
+        Returns:
+            List[str]: Отсортированный список директорий текстур.
+        """
+        if os.path.exists(os.path.join(root, "info.yml")):
+            return [root]
+
+        return sorted(dirpath for dirpath, _, filenames in os.walk(root) if "info.yml" in filenames)
+
+    @classmethod
+    def invalidate(cls, path: Optional[str] = None) -> None:
+        """Сбрасывает запись индекса для директории или весь индекс.
+
+        Args:
+            path (Optional[str], optional): Путь к директории с текстурами. По умолчанию None - сбросить всё.
+        """
+        with cls._lock:
+            if path is None:
+                cls._entries.clear()
+
+            else:
+                cls._entries.pop(f"{path}/info.yml", None)
@@ -0,0 +1,103 @@
+import bisect
+import contextlib
+import threading
+import time
+from typing import Any, Dict, Iterator, List
+
+
+class TextureMetrics:
+    """Статический класс TextureMetrics собирает счетчики и гистограммы времени этапов TextureSystem.
+
+    Этапы: разбор info.yml, декодирование, перекраска, нарезка, сборка слоев, кодирование и запись.
+    Счетчики: попадания и промахи кешей, прочитанные и записанные байты.
+    """
+    __slots__ = []
+    BUCKETS_MS: List[float] = [0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000]
+
+    enabled: bool = True
+    _counters: Dict[str, int] = {}
+    _stages: Dict[str, Dict[str, Any]] = {}
+    _lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def count(name: str, value: int = 1) -> None:
+        """Увеличивает счетчик.
+
+        Args:
+            name (str): Имя счетчика.
+            value (int, optional): Приращение. По умолчанию 1.
+        """
+        if not TextureMetrics.enabled:
+            return
+
+        with TextureMetrics._lock:
+            TextureMetrics._counters[name] = TextureMetrics._counters.get(name, 0) + value
+
+    @staticmethod
+    def record(name: str, seconds: float) -> None:
+        """Учитывает длительность этапа.
+
+        Args:
+            name (str): Имя этапа.
+            seconds (float): Длительность в секундах.
+        """
+        if not TextureMetrics.enabled:
+            return
+
+        elapsed_ms = seconds * 1000
+        with TextureMetrics._lock:
+            stage = TextureMetrics._stages.get(name)
+            if stage is None:
+                stage = TextureMetrics._stages[name] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'buckets': [0] * (len(TextureMetrics.BUCKETS_MS) + 1)}
+
+            stage['count'] += 1
+            stage['total_ms'] += elapsed_ms
+            stage['max_ms'] = max(stage['max_ms'], elapsed_ms)
+            stage['buckets'][bisect.bisect_left(TextureMetrics.BUCKETS_MS, elapsed_ms)] += 1
+
+    @staticmethod
+    @contextlib.contextmanager
+    def stage(name: str) -> Iterator[None]:
+        """Замеряет время выполнения блока как этап.
+
+        Args:
+            name (str): Имя этапа.
+        """
+        if not TextureMetrics.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+
+        finally:
+            TextureMetrics.record(name, time.perf_counter() - start)
+
+    @staticmethod
+    def snapshot() -> Dict[str, Any]:
+        """Возвращает копию собранных данных.
+
+        Returns:
+            Dict[str, Any]: Счетчики и этапы. У этапа: число замеров, суммарное, среднее и наибольшее время в мс
+            и гистограмма - число замеров не дольше каждой границы BUCKETS_MS, последняя корзина - дольше всех границ.
+        """
+        with TextureMetrics._lock:
+            stages = {
+                name: {
+                    'count': stage['count'],
+                    'total_ms': stage['total_ms'],
+                    'mean_ms': stage['total_ms'] / stage['count'],
+                    'max_ms': stage['max_ms'],
+                    'histogram': dict(zip([*map(str, TextureMetrics.BUCKETS_MS), 'inf'], stage['buckets'])),
+                }
+                for name, stage in TextureMetrics._stages.items()
+            }
+            return {'counters': dict(TextureMetrics._counters), 'stages': stages}
+
+    @staticmethod
+    def reset() -> None:
+        """Сбрасывает все счетчики и этапы."""
+        with TextureMetrics._lock:
+            TextureMetrics._counters.clear()
+            TextureMetrics._stages.clear()
@@ -0,0 +1,199 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from .memory_cache import MemoryCache
+
+
+class PrefixCache:
+    """Статический класс PrefixCache хранит промежуточные результаты объединения слоев.
+
+    Записи лежат в префиксном дереве: каждый уровень соответствует слою, ребро - ключу слоя
+    (CacheKey.layer_spec). Узел хранит уникальные кадры, собранные из слоев на пути от корня, и их временную шкалу.
+    Объединение, у которого совпадают нижние слои с уже собранным, начинается с самого длинного такого префикса.
+    Объем ограничен собственным бюджетом, при переполнении вытесняются давно не использованные узлы.
+    """
+    __slots__ = []
+    DEFAULT_BUDGET: int = 64 * 1024 * 1024
+
+    _budget: int = DEFAULT_BUDGET
+    _used: int = 0
+    _lookups: int = 0
+    _hits: int = 0
+    _reused_layers: int = 0
+    _root: Dict[str, Any] = {'children': {}, 'value': None}
+    _lru: "OrderedDict[Tuple[str, ...], int]" = OrderedDict()
+    _sources: Dict[Tuple[str, ...], FrozenSet[str]] = {}
+    _lock: threading.Lock = threading.Lock()
+
+    @classmethod
+    def _node(cls, keys: Sequence[str], create: bool = False) -> Optional[Dict[str, Any]]:
+        """Возвращает узел дерева по пути ключей. Вызывается под блокировкой.
+
+        Args:
+            keys (Sequence[str]): Ключи слоев снизу вверх.
+            create (bool, optional): Создавать недостающие узлы. По умолчанию False.
+
+        Returns:
+            Optional[Dict[str, Any]]: Узел или None, если его нет.
+        """
+        node = cls._root
+        for key in keys:
+            child = node['children'].get(key)
+            if child is None:
+                if not create:
+                    return None
+
+                child = node['children'][key] = {'children': {}, 'value': None}
+
+            node = child
+
+        return node
+
+    @classmethod
+    def longest(cls, keys: Sequence[str]) -> Tuple[int, Optional[List[Image.Image]], Optional[List[int]]]:
+        """Ищет самый длинный сохраненный префикс стека слоев.
+
+        Args:
+            keys (Sequence[str]): Ключи слоев снизу вверх.
+
+        Returns:
+            Tuple[int, Optional[List[Image.Image]], Optional[List[int]]]: Длина префикса, его уникальные кадры и временная шкала, либо (0, None, None).
+            Кадры разделяются между вызовами, изменять их нельзя.
+        """
+        with cls._lock:
+            cls._lookups += 1
+            node = cls._root
+            depth, value = 0, None
+            for i, key in enumerate(keys):
+                node = node['children'].get(key)
+                if node is None:
+                    break
+
+                if node['value'] is not None:
+                    depth, value = i + 1, node['value']
+
+            if value is not None:
+                cls._hits += 1
+                cls._reused_layers += depth
+                cls._lru.move_to_end(tuple(keys[:depth]))
+                return depth, value[0], value[1]
+
+            return 0, None, None
+
+    @classmethod
+    def put(cls, keys: Sequence[str], frames: List[Image.Image], timeline: List[int], sources: Iterable[str] = ()) -> None:
+        """Сохраняет кадры префикса стека слоев.
+
+        Args:
+            keys (Sequence[str]): Ключи слоев префикса снизу вверх.
+            frames (List[Image.Image]): Уникальные собранные кадры. После сохранения изменять их нельзя.
+            timeline (List[int]): Номер уникального кадра для каждого кадра цикла префикса.
+            sources (Iterable[str], optional): Исходные файлы слоев префикса, см. discard_sources. По умолчанию нет.
+        """
+        size = MemoryCache.sizeof(frames)
+        path = tuple(keys)
+        with cls._lock:
+            if size > cls._budget:
+                return
+
+            node = cls._node(path, create=True)
+            if node['value'] is not None:
+                cls._used -= cls._lru.pop(path)
+
+            node['value'] = (frames, timeline)
+            cls._lru[path] = size
+            cls._sources[path] = frozenset(sources)
+            cls._used += size
+            cls._evict()
+
+    @classmethod
+    def _remove(cls, path: Tuple[str, ...]) -> None:
+        """Удаляет значение узла и пустые узлы на пути к нему. Вызывается под блокировкой.
+
+        Args:
+            path (Tuple[str, ...]): Путь ключей узла.
+        """
+        nodes = [cls._root]
+        for key in path:
+            nodes.append(nodes[-1]['children'][key])
+
+        nodes[-1]['value'] = None
+        for depth in range(len(path), 0, -1):
+            node = nodes[depth]
+            if node['value'] is not None or node['children']:
+                break
+
+            del nodes[depth - 1]['children'][path[depth - 1]]
+
+    @classmethod
+    def _evict(cls) -> None:
+        """Вытесняет узлы, пока занятый объем превышает бюджет. Вызывается под блокировкой."""
+        while cls._used > cls._budget and cls._lru:
+            path, size = cls._lru.popitem(last=False)
+            cls._used -= size
+            cls._remove(path)
+            cls._sources.pop(path, None)
+
+    @classmethod
+    def discard_sources(cls, sources: Iterable[str]) -> int:
+        """Удаляет префиксы, собранные из слоев с указанными исходниками.
+
+        Args:
+            sources (Iterable[str]): Абсолютные пути исходных файлов.
+
+        Returns:
+            int: Число удаленных префиксов.
+        """
+        sources = set(sources)
+        with cls._lock:
+            stale = [path for path, used in cls._sources.items() if not sources.isdisjoint(used)]
+            for path in stale:
+                cls._used -= cls._lru.pop(path)
+                cls._remove(path)
+                del cls._sources[path]
+
+            return len(stale)
+
+    @classmethod
+    def set_budget(cls, budget: int) -> None:
+        """Задает бюджет кеша в байтах.
+
+        Args:
+            budget (int): Максимальный объем кадров.
+        """
+        with cls._lock:
+            cls._budget = budget
+            cls._evict()
+
+    @classmethod
+    def clear(cls) -> None:
+        """Очищает кеш и сбрасывает счетчики."""
+        with cls._lock:
+            cls._root = {'children': {}, 'value': None}
+            cls._lru.clear()
+            cls._sources.clear()
+            cls._used = 0
+            cls._lookups = 0
+            cls._hits = 0
+            cls._reused_layers = 0
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """Возвращает статистику кеша.
+
+        Returns:
+            Dict[str, Any]: Поиски, попадания, доля попаданий, число переиспользованных слоев, число записей, занятый объем и бюджет.
+        """
+        with cls._lock:
+            return {
+                'lookups': cls._lookups,
+                'hits': cls._hits,
+                'hit_rate': cls._hits / cls._lookups if cls._lookups else 0.0,
+                'reused_layers': cls._reused_layers,
+                'entries': len(cls._lru),
+                'bytes': cls._used,
+                'budget': cls._budget,
+            }
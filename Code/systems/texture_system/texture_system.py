@@ -1,11 +1,25 @@
-import hashlib
+import asyncio
+import logging
+import math
 import os
-import pickle
-from typing import Any, Dict, List, Optional, Tuple, Union
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
-import yaml
+import numpy as np
 from DMBotTools import Color
-from PIL import Image, ImageSequence
+from PIL import Image
+
+from .cache_key import CacheKey
+from .compile_lock import CompileLock
+from .compiled_cache import CompiledCache
+from .compositor import Compositor
+from .frame_stack import FrameStack
+from .frame_strip import FrameStrip
+from .memory_cache import MemoryCache
+from .metadata_index import MetadataIndex
+from .metrics import TextureMetrics
+from .prefix_cache import PrefixCache
 
 
 class TextureSystem:
@@ -14,25 +28,280 @@ class TextureSystem:
     __slots__ = []
     DEFAULT_FPS: int = 24
     DEFAULT_COLOR: Color = Color(255, 255, 255, 255)
+    BATCH_WORKERS: int = min(8, os.cpu_count() or 1)
+    MAX_LOOP_FRAMES: int = 120
+    _executor: Optional[ThreadPoolExecutor] = None
+    _inflight: Dict[Tuple[Any, ...], "asyncio.Future[Any]"] = {}
 
     @staticmethod
     def _get_hash_list(layers: List[Dict[str, Any]]) -> str:
         """Возвращает хеш списка слоев для идентификации уникальных комбинаций.
 
+        Хеш строится по канонической записи слоев и отпечаткам исходных файлов, см. CacheKey.
+
         Args:
             layers (List[Dict[str, Any]]): Список слоев.
 
         Returns:
             str: Хеш в виде строки.
         """
-        serialized_data = pickle.dumps(layers)
-        hash_object = hashlib.sha256(serialized_data)
-        return hash_object.hexdigest()
+        return CacheKey.layers_key(layers)
     
+    @staticmethod
+    def _copy_frames(value: Union[Image.Image, Sequence[Image.Image]]) -> Union[Image.Image, Sequence[Image.Image]]:
+        """Копирует изображение или список кадров, чтобы вызывающий код не портил записи кеша.
+
+        Для FrameStrip создается представление (FrameStrip.view): его можно закрыть, не трогая отображение в кеше.
+        Буфер FrameStack копируется одной операцией.
+
+        Args:
+            value (Union[Image.Image, Sequence[Image.Image]]): Изображение или последовательность кадров.
+
+        Returns:
+            Union[Image.Image, Sequence[Image.Image]]: Копия.
+        """
+        if isinstance(value, Image.Image):
+            return value.copy()
+
+        if isinstance(value, FrameStrip):
+            return value.view()
+
+        if isinstance(value, FrameStack):
+            return FrameStack(value.array.copy(), value.durations)
+
+        return [frame.copy() for frame in value]
+
+    @staticmethod
+    def _source_version(path: str, state: str) -> Tuple[Optional[Tuple[int, int]], Optional[Tuple[int, int]]]:
+        """Возвращает отпечатки исходников состояния: листа и info.yml.
+
+        Args:
+            path (str): Путь к файлу.
+            state (str): Имя состояния.
+
+        Returns:
+            Tuple[Optional[Tuple[int, int]], Optional[Tuple[int, int]]]: Отпечатки листа состояния и info.yml.
+        """
+        return CacheKey.fingerprint(f"{path}/{state}.png"), CacheKey.fingerprint(f"{path}/info.yml")
+
+    @staticmethod
+    def _state_sources(path: str, state: str) -> List[str]:
+        """Возвращает исходные файлы состояния для учета зависимостей в CompiledCache.
+
+        Args:
+            path (str): Путь к файлу.
+            state (str): Имя состояния.
+
+        Returns:
+            List[str]: Абсолютные пути к листу состояния и info.yml.
+        """
+        return CacheKey.layer_sources({'path': path, 'state': state})
+
+    @staticmethod
+    def _recipe(kind: str, **params: Any) -> Dict[str, Any]:
+        """Собирает JSON-описание пересборки скомпилированного файла, см. rebuild.
+
+        Args:
+            kind (str): Вид результата.
+            **params (Any): Аргументы метода, который строит результат.
+
+        Returns:
+            Dict[str, Any]: Описание пересборки.
+        """
+        if 'path' in params:
+            params['path'] = os.path.abspath(params['path'])
+
+        return {'kind': kind, **CacheKey.canonical(params)}
+
+    @staticmethod
+    def _load_compiled(key: Tuple, image_path: str, is_gif: bool, track: bool = True, version: Any = None) -> Union[Image.Image, Sequence[Image.Image], None]:
+        """Загружает скомпилированный файл через кеш в памяти.
+
+        Args:
+            key (Tuple): Ключ кеша в памяти, см. MemoryCache.make_key.
+            image_path (str): Путь к скомпилированному файлу.
+            is_gif (bool): Указывает, является ли файл анимацией в формате FrameStrip.
+            track (bool, optional): Учитывать обращение в CompiledCache. Для исходных файлов False. По умолчанию True.
+            version (Any, optional): Отпечатки исходников, см. _source_version. Файл старше исходников считается устаревшим. По умолчанию None.
+
+        Returns:
+            Union[Image.Image, Sequence[Image.Image], None]: Копия изображения или последовательность кадров, либо None, если файла нет, он устарел или поврежден.
+        """
+        cached = MemoryCache.get(key, version)
+        if cached is not None:
+            if track:
+                CompiledCache.touch(image_path)
+                TextureMetrics.count("compiled_memory_hits")
+
+            return TextureSystem._copy_frames(cached)
+
+        compiled_fingerprint = CacheKey.fingerprint(image_path)
+        if compiled_fingerprint is None:
+            if track:
+                TextureMetrics.count("compiled_misses")
+
+            return None
+
+        if track and version is not None:
+            newest_source = max((source[0] for source in version if source is not None), default=0)
+            if compiled_fingerprint[0] < newest_source:
+                TextureMetrics.count("compiled_stale")
+                return None
+
+        if track:
+            CompiledCache.touch(image_path, adopt=True)
+
+        try:
+            with TextureMetrics.stage("decode"):
+                if is_gif:
+                    loaded = FrameStrip(image_path)
+                else:
+                    with Image.open(image_path) as img:
+                        loaded = img.convert("RGBA").copy()
+
+        except (OSError, ValueError) as err:
+            # Поврежденный файл (например, недописанный при прерывании) считается промахом и будет перезаписан
+            logging.warning(f"Compiled texture '{image_path}' is unreadable: {err}")
+            TextureMetrics.count("compiled_corrupt")
+            return None
+
+        if track:
+            TextureMetrics.count("compiled_disk_hits")
+
+        # FrameStrip отображается в память и читается по мере обращения к кадрам, учитываем весь файл
+        TextureMetrics.count("bytes_read", compiled_fingerprint[1])
+
+        MemoryCache.put(key, loaded, version)
+        return TextureSystem._copy_frames(loaded)
+
+    @staticmethod
+    def _remember_compiled(key: Tuple, value: Union[Image.Image, Sequence[Image.Image]], version: Any = None) -> None:
+        """Кладет копию только что скомпилированного изображения или кадров в кеш в памяти.
+
+        Args:
+            key (Tuple): Ключ кеша в памяти, см. MemoryCache.make_key.
+            value (Union[Image.Image, Sequence[Image.Image]]): Изображение или последовательность кадров.
+            version (Any, optional): Отпечатки исходников, см. _source_version. По умолчанию None.
+        """
+        MemoryCache.put(key, TextureSystem._copy_frames(value), version)
+
+    @staticmethod
+    def _recolor_array(pixels: np.ndarray, color: Color) -> np.ndarray:
+        """Перекрашивает массив пикселей маски целиком, без обхода по пикселям.
+
+        Каждый канал результата равен красному каналу маски, умноженному на канал цвета.
+        Альфа сохраняется, полностью прозрачные пиксели остаются нетронутыми.
+
+        Args:
+            pixels (np.ndarray): Массив RGBA формы (..., 4) типа uint8.
+            color (Color): Цвет в формате RGBA.
+
+        Returns:
+            np.ndarray: Новый массив той же формы с перекрашенными пикселями.
+        """
+        with TextureMetrics.stage("recolor"):
+            # Таблица на 256 значений даёт тот же результат, что и int(pixel * c / 255)
+            channels = np.array([color[0], color[1], color[2]], dtype=np.uint16)
+            lut = (np.arange(256, dtype=np.uint16)[:, None] * channels // 255).astype(np.uint8)
+
+            result = pixels.copy()
+            opaque = pixels[..., 3] != 0
+            result[..., :3] = np.where(opaque[..., None], lut[pixels[..., 0]], pixels[..., :3])
+            return result
+
+    @staticmethod
+    def _recolor_many(pixels: np.ndarray, colors: Sequence[Color]) -> np.ndarray:
+        """Перекрашивает массив пикселей маски сразу в несколько цветов, как _recolor_array.
+
+        Плоскость яркости и маска непрозрачности вычисляются один раз на все цвета.
+
+        Args:
+            pixels (np.ndarray): Массив RGBA формы (H, W, 4) типа uint8.
+            colors (Sequence[Color]): Цвета в формате RGBA.
+
+        Returns:
+            np.ndarray: Массив формы (N, H, W, 4), по одному изображению на цвет.
+        """
+        with TextureMetrics.stage("recolor"):
+            channels = np.array([[color[0], color[1], color[2]] for color in colors], dtype=np.uint16)
+            luts = (np.arange(256, dtype=np.uint16)[None, :, None] * channels[:, None, :] // 255).astype(np.uint8)
+
+            intensity = pixels[..., 0]
+            opaque = (pixels[..., 3] != 0)[None, ..., None]
+
+            result = np.empty((len(colors), *pixels.shape), dtype=np.uint8)
+            result[..., :3] = np.where(opaque, luts[:, intensity], pixels[None, ..., :3])
+            result[..., 3] = pixels[..., 3]
+            return result
+
+    @staticmethod
+    def _read_pixels(image_path: str) -> np.ndarray:
+        """Читает изображение как массив RGBA.
+
+        Args:
+            image_path (str): Путь к изображению.
+
+        Returns:
+            np.ndarray: Массив формы (H, W, 4) типа uint8.
+        """
+        with TextureMetrics.stage("decode"):
+            with Image.open(image_path) as image:
+                pixels = np.asarray(image.convert("RGBA"))
+
+        TextureMetrics.count("bytes_read", os.path.getsize(image_path))
+        return pixels
+
+    @staticmethod
+    def _sheet_array(image: Image.Image) -> np.ndarray:
+        """Переводит лист кадров в массив RGBA одним преобразованием.
+
+        Args:
+            image (Image.Image): Лист кадров.
+
+        Returns:
+            np.ndarray: Массив формы (H, W, 4) типа uint8.
+        """
+        return np.asarray(image if image.mode == "RGBA" else image.convert("RGBA"))
+
+    @staticmethod
+    def _frame_views(pixels: np.ndarray, frame_width: int, frame_height: int, num_frames: int) -> List[np.ndarray]:
+        """Разрезает массив листа на кадры-представления без копирования.
+
+        Кадры идут слева направо и сверху вниз. Кадр, выходящий за край листа, дополняется прозрачными пикселями
+        и в этом случае копируется, как и при обрезке через PIL.
+
+        Args:
+            pixels (np.ndarray): Массив листа формы (H, W, 4).
+            frame_width (int): Ширина кадра.
+            frame_height (int): Высота кадра.
+            num_frames (int): Количество кадров.
+
+        Returns:
+            List[np.ndarray]: Кадры формы (frame_height, frame_width, 4).
+        """
+        frames = []
+        image_width = pixels.shape[1]
+
+        with TextureMetrics.stage("slice"):
+            for i in range(num_frames):
+                top = ((i * frame_width) // image_width) * frame_height
+                left = (i * frame_width) % image_width
+                frame = pixels[top:top + frame_height, left:left + frame_width]
+                if frame.shape[:2] != (frame_height, frame_width):
+                    padded = np.zeros((frame_height, frame_width, 4), dtype=np.uint8)
+                    padded[:frame.shape[0], :frame.shape[1]] = frame
+                    frame = padded
+
+                frames.append(frame)
+
+        return frames
+
     @staticmethod
     def _slice_image(image: Image.Image, frame_width: int, frame_height: int, num_frames: int) -> List[Image.Image]:
         """Разрезает изображение на кадры заданного размера.
 
+        Лист переводится в RGBA один раз, кадры берутся как срезы его массива.
+
         Args:
             image (Image.Image): Изображение для разрезания.
             frame_width (int): Ширина кадра.
@@ -42,18 +311,36 @@ class TextureSystem:
         Returns:
             List[Image.Image]: Список кадров.
         """
-        frames = []
-        image_width, _ = image.size
-
-        for i in range(num_frames):
-            row = (i * frame_width) // image_width
-            col = (i * frame_width) % image_width
-            box = (col, row * frame_height, col + frame_width, row * frame_height + frame_height)
-            frame = image.crop(box)
-            frame = frame.convert("RGBA")
-            frames.append(frame)
-        
-        return frames
+        views = TextureSystem._frame_views(TextureSystem._sheet_array(image), frame_width, frame_height, num_frames)
+        return [Image.fromarray(view, "RGBA") for view in views]
+
+    @staticmethod
+    def _compile_strip(output_path: str, key: Tuple, sheet: Image.Image, frame_size: Tuple[int, int, int], fps: int, version: Any, recipe: Dict[str, Any]) -> FrameStrip:
+        """Режет лист на кадры и записывает их в FrameStrip. Вызывается под CompileLock.hold(output_path).
+
+        Кадры пишутся прямо из срезов массива листа, отдельные изображения кадров не создаются.
+        Результат отображается из файла в память, поэтому кадры не держатся в памяти процесса.
+
+        Args:
+            output_path (str): Путь к скомпилированному файлу.
+            key (Tuple): Ключ кеша в памяти, см. MemoryCache.make_key.
+            sheet (Image.Image): Лист кадров.
+            frame_size (Tuple[int, int, int]): Ширина, высота и количество кадров.
+            fps (int): Частота кадров.
+            version (Any): Отпечатки исходников, см. _source_version.
+            recipe (Dict[str, Any]): Описание пересборки, см. _recipe.
+
+        Returns:
+            FrameStrip: Представление кадров анимации, отображение-владелец остается в кеше в памяти.
+        """
+        frames = TextureSystem._frame_views(TextureSystem._sheet_array(sheet), *frame_size)
+        with CompileLock.atomic_path(output_path) as tmp_path:
+            FrameStrip.write(tmp_path, frames, 1000//fps)
+
+        CompiledCache.register(output_path, TextureSystem._state_sources(recipe['path'], recipe['state']), recipe)
+        strip = FrameStrip(output_path)
+        MemoryCache.put(key, strip, version)
+        return strip.view()
 
     @staticmethod
     def get_textures(path: str) -> List[Dict[str, Any]]:
@@ -65,10 +352,7 @@ class TextureSystem:
         Returns:
             List[Dict[str, Any]]: Список текстур.
         """
-        with open(f"{path}/info.yml", 'r') as file:
-            info = yaml.safe_load(file)
-        
-        return info.get('Texture', [])
+        return MetadataIndex.get_textures(path)
 
     @staticmethod
     def get_state_info(path: str, state: str) -> Tuple[int, int, int, bool]:
@@ -84,12 +368,7 @@ class TextureSystem:
         Returns:
             Tuple[int, int, int, bool]: Ширина кадра, высота кадра, количество кадров и флаг маски.
         """
-        with open(f"{path}/info.yml", 'r') as file:
-            info = yaml.safe_load(file)
-        
-        info = info.get('Texture', [])
-
-        sprite_info = next((sprite for sprite in info if sprite['name'] == state), None)
+        sprite_info = MetadataIndex.get_sprite(path, state)
         if not sprite_info:
             raise ValueError(f"No sprite info found for state '{state}' in path '{path}'")
         
@@ -101,33 +380,41 @@ class TextureSystem:
         return frame_width, frame_height, num_frames, is_mask
     
     @staticmethod
-    def _get_compiled(path: str, state: str, color: Optional[Color] = None, is_gif: bool = False) -> Union[Image.Image, List[Image.Image], None]:
-        """Проверяет наличие компилированного изображения или GIF.
+    def compiled_path(path: str, state: str, color: Optional[Color] = None, is_gif: bool = False) -> str:
+        """Возвращает путь к скомпилированному изображению или анимации состояния.
 
         Args:
             path (str): Путь к файлу.
             state (str): Имя состояния.
             color (Optional[Color], optional): Цвет в формате RGBA. По умолчанию None.
-            is_gif (bool, optional): Указывает, является ли изображение GIF. По умолчанию False.
+            is_gif (bool, optional): Указывает, является ли изображение анимацией. По умолчанию False.
 
         Returns:
-            Union[Image.Image, List[Image.Image], None]: Изображение или список кадров, если существует, иначе None.
+            str: Путь к файлу. Без цвета для статичного изображения это исходный лист состояния.
         """
         image_path: str = f"{path}/{state}"
         if color:
             image_path += f"_compiled_{color}"
         
-        image_path += ".gif" if is_gif else ".png"
+        return image_path + (FrameStrip.EXTENSION if is_gif else ".png")
 
-        if os.path.exists(image_path):
-            with Image.open(image_path) as img:
-                if is_gif:
-                    return [frame.convert("RGBA").copy() for frame in ImageSequence.Iterator(img)]
-                else:
-                    return img.convert("RGBA").copy()
-        
-        else:
-            return None
+    @staticmethod
+    def _get_compiled(path: str, state: str, color: Optional[Color] = None, is_gif: bool = False) -> Union[Image.Image, Sequence[Image.Image], None]:
+        """Проверяет наличие компилированного изображения или анимации.
+
+        Args:
+            path (str): Путь к файлу.
+            state (str): Имя состояния.
+            color (Optional[Color], optional): Цвет в формате RGBA. По умолчанию None.
+            is_gif (bool, optional): Указывает, является ли изображение анимацией. По умолчанию False.
+
+        Returns:
+            Union[Image.Image, Sequence[Image.Image], None]: Изображение или FrameStrip с кадрами анимации, если существует, иначе None.
+        """
+        image_path = TextureSystem.compiled_path(path, state, color, is_gif)
+        key = MemoryCache.make_key(path, state, color, "gif" if is_gif else "png")
+        version = TextureSystem._source_version(path, state)
+        return TextureSystem._load_compiled(key, image_path, is_gif, track=bool(color) or is_gif, version=version)
     
     @staticmethod
     def get_image_recolor(path: str, state: str, color: Color = DEFAULT_COLOR) -> Image.Image:
@@ -145,22 +432,79 @@ class TextureSystem:
         if image:
             return image
         
-        with Image.open(f"{path}/{state}.png") as image:
-            image = image.convert("RGBA")
-            new_colored_image = [
-                (
-                    int(pixel[0] * color.r / 255),
-                    int(pixel[0] * color.g / 255),
-                    int(pixel[0] * color.b / 255),
-                    pixel[3]
-                ) if pixel[3] != 0 else pixel
-                for pixel in image.getdata()
-            ]
-
-            image.putdata(new_colored_image)
-            image.save(f"{path}/{state}_compiled_{color}.png")
+        output_path = TextureSystem.compiled_path(path, state, color, False)
+        with CompileLock.hold(output_path):
+            # Пока ждали блокировку, файл мог записать другой поток или процесс
+            image = TextureSystem._get_compiled(path, state, color, False)
+            if image:
+                return image
+
+            pixels = TextureSystem._read_pixels(f"{path}/{state}.png")
+            
+            image = Image.fromarray(TextureSystem._recolor_array(pixels, color))
+            with CompileLock.atomic_path(output_path) as tmp_path:
+                image.save(tmp_path, format="PNG")
+
+            CompiledCache.register(output_path, TextureSystem._state_sources(path, state), TextureSystem._recipe("recolor", path=path, state=state, color=color))
+            TextureSystem._remember_compiled(MemoryCache.make_key(path, state, color, "png"), image, TextureSystem._source_version(path, state))
             return image
     
+    @staticmethod
+    def get_image_recolor_many(path: str, state: str, colors: Sequence[Color]) -> List[Image.Image]:
+        """Возвращает изображение состояния, перекрашенное в каждый из цветов.
+
+        Маска читается один раз, все недостающие цвета перекрашиваются за один проход.
+        Каждый результат записывается в кеш скомпилированных файлов, как в get_image_recolor.
+
+        Args:
+            path (str): Путь к файлу.
+            state (str): Имя состояния.
+            colors (Sequence[Color]): Цвета в формате RGBA.
+
+        Returns:
+            List[Image.Image]: Перекрашенные изображения в порядке цветов.
+        """
+        images: Dict[Tuple[int, ...], Image.Image] = {}
+        missing: Dict[Tuple[int, ...], Color] = {}
+        for color in colors:
+            color_key = tuple(color)
+            if color_key in images or color_key in missing:
+                continue
+
+            image = TextureSystem._get_compiled(path, state, color, False)
+            if image:
+                images[color_key] = image
+            else:
+                missing[color_key] = color
+
+        if missing:
+            pixels = TextureSystem._read_pixels(f"{path}/{state}.png")
+
+            recolored = TextureSystem._recolor_many(pixels, list(missing.values()))
+            version = TextureSystem._source_version(path, state)
+            for (color_key, color), array in zip(missing.items(), recolored):
+                output_path = TextureSystem.compiled_path(path, state, color, False)
+                with CompileLock.hold(output_path):
+                    image = TextureSystem._get_compiled(path, state, color, False)
+                    if not image:
+                        image = Image.fromarray(array)
+                        with CompileLock.atomic_path(output_path) as tmp_path:
+                            image.save(tmp_path, format="PNG")
+
+                        CompiledCache.register(output_path, TextureSystem._state_sources(path, state), TextureSystem._recipe("recolor", path=path, state=state, color=color))
+                        TextureSystem._remember_compiled(MemoryCache.make_key(path, state, color, "png"), image, version)
+
+                images[color_key] = image
+
+        returned = set()
+        output: List[Image.Image] = []
+        for color in colors:
+            color_key = tuple(color)
+            output.append(images[color_key].copy() if color_key in returned else images[color_key])
+            returned.add(color_key)
+
+        return output
+
     @staticmethod
     def get_image(path: str, state: str) -> Image.Image:
         """Возвращает изображение указанного состояния.
@@ -182,7 +526,7 @@ class TextureSystem:
         raise FileNotFoundError(f"Image file for state '{state}' not found in path '{path}'.")
 
     @staticmethod
-    def get_gif_recolor(path: str, state: str, color: Color = DEFAULT_COLOR, fps: int = DEFAULT_FPS) -> List[Image.Image]:
+    def get_gif_recolor(path: str, state: str, color: Color = DEFAULT_COLOR, fps: int = DEFAULT_FPS) -> Sequence[Image.Image]:
         """Возвращает перекрашенный GIF указанного состояния.
 
         Args:
@@ -192,25 +536,82 @@ class TextureSystem:
             fps (int, optional): Частота кадров. По умолчанию DEFAULT_FPS.
 
         Returns:
-            List[Image.Image]: Список кадров перекрашенного GIF.
+            Sequence[Image.Image]: Кадры перекрашенного GIF.
         """
         image = TextureSystem._get_compiled(path, state, color, True)
         if image:
             return image
         
-        image = TextureSystem.get_image_recolor(path, state, color)
-        
-        frame_width, frame_height, num_frames, _ = TextureSystem.get_state_info(path, state)
-        
-        frames = TextureSystem._slice_image(image, frame_width, frame_height, num_frames)
-        
-        output_path = f"{path}/{state}_compiled_{color}.gif"
-        frames[0].save(output_path, save_all=True, append_images=frames[1:], duration=1000//fps, loop=0)
-        
-        return frames
+        output_path = TextureSystem.compiled_path(path, state, color, True)
+        with CompileLock.hold(output_path):
+            image = TextureSystem._get_compiled(path, state, color, True)
+            if image:
+                return image
+
+            image = TextureSystem.get_image_recolor(path, state, color)
+            frame_width, frame_height, num_frames, _ = TextureSystem.get_state_info(path, state)
+            return TextureSystem._compile_strip(
+                output_path, MemoryCache.make_key(path, state, color, "gif"), image,
+                (frame_width, frame_height, num_frames), fps, TextureSystem._source_version(path, state),
+                TextureSystem._recipe("gif", path=path, state=state, color=color, fps=fps)
+            )
     
     @staticmethod
-    def get_gif(path: str, state: str, fps: int = DEFAULT_FPS) -> List[Image.Image]:
+    def get_gif_recolor_many(path: str, state: str, colors: Sequence[Color], fps: int = DEFAULT_FPS) -> List[Sequence[Image.Image]]:
+        """Возвращает кадры GIF состояния, перекрашенного в каждый из цветов.
+
+        Недостающие листы перекрашиваются одним вызовом get_image_recolor_many.
+
+        Args:
+            path (str): Путь к файлу.
+            state (str): Имя состояния.
+            colors (Sequence[Color]): Цвета в формате RGBA.
+            fps (int, optional): Частота кадров. По умолчанию DEFAULT_FPS.
+
+        Returns:
+            List[Sequence[Image.Image]]: Кадры перекрашенных GIF в порядке цветов.
+        """
+        animations: Dict[Tuple[int, ...], Sequence[Image.Image]] = {}
+        missing: Dict[Tuple[int, ...], Color] = {}
+        for color in colors:
+            color_key = tuple(color)
+            if color_key in animations or color_key in missing:
+                continue
+
+            frames = TextureSystem._get_compiled(path, state, color, True)
+            if frames:
+                animations[color_key] = frames
+            else:
+                missing[color_key] = color
+
+        if missing:
+            sheets = TextureSystem.get_image_recolor_many(path, state, list(missing.values()))
+            frame_width, frame_height, num_frames, _ = TextureSystem.get_state_info(path, state)
+            version = TextureSystem._source_version(path, state)
+            for (color_key, color), sheet in zip(missing.items(), sheets):
+                output_path = TextureSystem.compiled_path(path, state, color, True)
+                with CompileLock.hold(output_path):
+                    frames = TextureSystem._get_compiled(path, state, color, True)
+                    if not frames:
+                        frames = TextureSystem._compile_strip(
+                            output_path, MemoryCache.make_key(path, state, color, "gif"), sheet,
+                            (frame_width, frame_height, num_frames), fps, version,
+                            TextureSystem._recipe("gif", path=path, state=state, color=color, fps=fps)
+                        )
+
+                animations[color_key] = frames
+
+        returned = set()
+        output: List[Sequence[Image.Image]] = []
+        for color in colors:
+            color_key = tuple(color)
+            output.append(TextureSystem._copy_frames(animations[color_key]) if color_key in returned else animations[color_key])
+            returned.add(color_key)
+
+        return output
+
+    @staticmethod
+    def get_gif(path: str, state: str, fps: int = DEFAULT_FPS) -> Sequence[Image.Image]:
         """Возвращает GIF указанного состояния.
 
         Args:
@@ -219,21 +620,76 @@ class TextureSystem:
             fps (int, optional): Частота кадров. По умолчанию DEFAULT_FPS.
 
         Returns:
-            List[Image.Image]: Список кадров GIF.
+            Sequence[Image.Image]: Кадры GIF.
         """
         image = TextureSystem._get_compiled(path, state, None, True)
         if image:
             return image
         
-        image = TextureSystem.get_image(path, state)
-        frame_width, frame_height, num_frames, _ = TextureSystem.get_state_info(path, state)
-        
-        frames = TextureSystem._slice_image(image, frame_width, frame_height, num_frames)
-        
-        output_path = f"{path}/{state}.gif"
-        frames[0].save(output_path, save_all=True, append_images=frames[1:], duration=1000//fps, loop=0)
-        
-        return frames
+        output_path = TextureSystem.compiled_path(path, state, None, True)
+        with CompileLock.hold(output_path):
+            image = TextureSystem._get_compiled(path, state, None, True)
+            if image:
+                return image
+
+            image = TextureSystem.get_image(path, state)
+            frame_width, frame_height, num_frames, _ = TextureSystem.get_state_info(path, state)
+            return TextureSystem._compile_strip(
+                output_path, MemoryCache.make_key(path, state, None, "gif"), image,
+                (frame_width, frame_height, num_frames), fps, TextureSystem._source_version(path, state),
+                TextureSystem._recipe("gif", path=path, state=state, color=None, fps=fps)
+            )
+
+    @staticmethod
+    def get_frame_stack(path: str, state: str, color: Optional[Color] = None, fps: int = DEFAULT_FPS) -> FrameStack:
+        """Возвращает кадры состояния одним непрерывным буфером.
+
+        Args:
+            path (str): Путь к файлу.
+            state (str): Имя состояния.
+            color (Optional[Color], optional): Цвет для маски. По умолчанию None.
+            fps (int, optional): Частота кадров анимации. По умолчанию DEFAULT_FPS.
+
+        Returns:
+            FrameStack: Кадры состояния. У статичного состояния один кадр.
+        """
+        _, _, num_frames, is_mask = TextureSystem.get_state_info(path, state)
+        color = color if is_mask else None
+        if num_frames > 1:
+            frames = TextureSystem.get_gif_recolor(path, state, color, fps) if color else TextureSystem.get_gif(path, state, fps)
+            return FrameStack.from_frames(frames, getattr(frames, 'durations', 1000//fps))
+
+        image = TextureSystem.get_image_recolor(path, state, color) if color else TextureSystem.get_image(path, state)
+        return FrameStack(TextureSystem._sheet_array(image)[None], 1000//fps)
+
+    @staticmethod
+    def recolor_frames(frames: FrameStack, color: Color) -> FrameStack:
+        """Перекрашивает все кадры стека маски одной векторной операцией.
+
+        Args:
+            frames (FrameStack): Кадры маски.
+            color (Color): Цвет в формате RGBA.
+
+        Returns:
+            FrameStack: Новый стек с теми же длительностями.
+        """
+        return FrameStack(TextureSystem._recolor_array(frames.array, color), frames.durations)
+
+    @staticmethod
+    def export_gif(frames: Sequence[Image.Image], output_path: str, fps: int = DEFAULT_FPS) -> None:
+        """Экспортирует кадры анимации в GIF.
+
+        GIF не используется как формат кеша: он медленно кодируется и сводит кадры к 256 цветам.
+
+        Args:
+            frames (Sequence[Image.Image]): Кадры анимации.
+            output_path (str): Путь к GIF.
+            fps (int, optional): Частота кадров. Игнорируется, если у кадров есть собственные длительности (FrameStrip, FrameStack). По умолчанию DEFAULT_FPS.
+        """
+        durations = frames.durations if isinstance(frames, (FrameStrip, FrameStack)) else 1000//fps
+        frames = list(frames)
+        with TextureMetrics.stage("gif_encode"):
+            frames[0].save(output_path, save_all=True, append_images=frames[1:], duration=durations, loop=0, disposal=2)
 
     @staticmethod
     def merge_images(background: Image.Image, overlay: Image.Image, position: Tuple[int, int] = (0, 0)) -> Image.Image:
@@ -248,120 +704,612 @@ class TextureSystem:
             Image.Image: Объединенное изображение.
         """
         merged_image = background.copy()
-        overlay_alpha = overlay.split()[3]
-        merged_image.paste(overlay, position, overlay_alpha)
+        bbox = Compositor.alpha_bbox(overlay)
+        if bbox is None:
+            return merged_image
+
+        # Накладываем только непрозрачную часть overlay
+        region = overlay.crop(bbox)
+        merged_image.paste(region, (position[0] + bbox[0], position[1] + bbox[1]), region.getchannel("A"))
         
         return merged_image
 
     @staticmethod
-    def merge_layers(root_path, layers: List[Dict[str, Any]], fps: int = DEFAULT_FPS) -> Union[Image.Image, List[Image.Image]]:
+    def _layer_frames(layer: Dict[str, Any], fps: int = DEFAULT_FPS) -> Sequence[Image.Image]:
+        """Возвращает кадры слоя: перекрашенные, если состояние - маска.
+
+        Args:
+            layer (Dict[str, Any]): Описание слоя.
+            fps (int, optional): Частота кадров. По умолчанию DEFAULT_FPS.
+
+        Returns:
+            Sequence[Image.Image]: Кадры слоя, для статичного состояния - один кадр.
+        """
+        _, _, num_frames, is_mask = TextureSystem.get_state_info(layer['path'], layer['state'])
+        if num_frames > 1:
+            if is_mask:
+                return TextureSystem.get_gif_recolor(layer['path'], layer['state'], Color(*layer['color']), fps)
+
+            return TextureSystem.get_gif(layer['path'], layer['state'], fps)
+
+        if is_mask:
+            return [TextureSystem.get_image_recolor(layer['path'], layer['state'], Color(*layer['color']))]
+
+        return [TextureSystem.get_image(layer['path'], layer['state'])]
+
+    @staticmethod
+    def _layer_key(layer: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Возвращает ключ кадров слоя для запоминания их рамок в Compositor.
+
+        Args:
+            layer (Dict[str, Any]): Описание слоя.
+
+        Returns:
+            Tuple[Any, ...]: Ключ, меняющийся вместе с исходниками слоя.
+        """
+        _, _, num_frames, is_mask = TextureSystem.get_state_info(layer['path'], layer['state'])
+        color = Color(*layer['color']) if is_mask else None
+        key = MemoryCache.make_key(layer['path'], layer['state'], color, "gif" if num_frames > 1 else "png")
+        return key, TextureSystem._source_version(layer['path'], layer['state'])
+
+    @staticmethod
+    def _composite_layers(layers: List[Dict[str, Any]], offsets: List[Tuple[int, int]], size: Tuple[int, int], frame_count: int, fps: int = DEFAULT_FPS) -> Tuple[List[Image.Image], List[int]]:
+        """Собирает уникальные кадры стека слоев, начиная с самого длинного префикса из PrefixCache.
+
+        Слои зацикливаются: кадр t берет из слоя кадр t % длина слоя. Префикс собирается в своем
+        естественном размере, а его цикл равен НОК длин его слоев, поэтому кадр t % цикл префикса
+        совпадает с тем, что дали бы его слои. Наложенный первым слоем на больший холст, он дает
+        тот же результат: лишняя область прозрачна. Каждый новый промежуточный префикс с циклом
+        не длиннее MAX_LOOP_FRAMES сохраняется в PrefixCache.
+
+        Args:
+            layers (List[Dict[str, Any]]): Список слоев.
+            offsets (List[Tuple[int, int]]): Смещения слоев.
+            size (Tuple[int, int]): Размер итогового холста.
+            frame_count (int): Число итоговых кадров, см. Compositor.loop_length.
+            fps (int, optional): Частота кадров. По умолчанию DEFAULT_FPS.
+
+        Returns:
+            Tuple[List[Image.Image], List[int]]: Уникальные кадры и номер уникального кадра для каждого итогового кадра.
+        """
+        lengths = [TextureSystem.get_state_info(layer['path'], layer['state'])[2] for layer in layers]
+        if len(layers) == 1:
+            frames = TextureSystem._layer_frames(layers[0], fps)
+            indices = Compositor.loop_indices(lengths, frame_count)
+            return Compositor.composite_unique([frames], size, indices, offsets, [TextureSystem._layer_key(layers[0])])
+
+        prefix_keys = [CacheKey.digest(CacheKey.layer_spec(layer)) for layer in layers]
+        depth, current, timeline = PrefixCache.longest(prefix_keys[:-1])
+        current_offset = (0, 0)
+        if current is None:
+            depth = 1
+            current = TextureSystem._layer_frames(layers[0], fps)
+            timeline = list(range(lengths[0]))
+            current_offset = offsets[0]
+
+        # Естественный размер уже собранного префикса
+        width = height = 0
+        for layer, (offset_x, offset_y) in zip(layers[:depth], offsets):
+            frame_width, frame_height, _, _ = TextureSystem.get_state_info(layer['path'], layer['state'])
+            width, height = max(width, offset_x + frame_width), max(height, offset_y + frame_height)
+
+        for i in range(depth, len(layers)):
+            period = math.lcm(*lengths[:i + 1])
+            if i == len(layers) - 1 or period > TextureSystem.MAX_LOOP_FRAMES:
+                # Оставшиеся слои накладываются сразу на итоговые кадры
+                rest = layers[i:]
+                indices = [
+                    (timeline[t % len(timeline)], *(t % length for length in lengths[i:]))
+                    for t in range(frame_count)
+                ]
+                return Compositor.composite_unique(
+                    [current, *(TextureSystem._layer_frames(layer, fps) for layer in rest)],
+                    size,
+                    indices,
+                    [current_offset, *offsets[i:]],
+                    [None, *(TextureSystem._layer_key(layer) for layer in rest)]
+                )
+
+            layer = layers[i]
+            frame_width, frame_height, _, _ = TextureSystem.get_state_info(layer['path'], layer['state'])
+            width, height = max(width, offsets[i][0] + frame_width), max(height, offsets[i][1] + frame_height)
+
+            indices = [(timeline[t % len(timeline)], t % lengths[i]) for t in range(period)]
+            current, timeline = Compositor.composite_unique(
+                [current, TextureSystem._layer_frames(layer, fps)],
+                (width, height),
+                indices,
+                [current_offset, offsets[i]],
+                [None, TextureSystem._layer_key(layer)]
+            )
+            current_offset = (0, 0)
+            PrefixCache.put(prefix_keys[:i + 1], current, timeline, TextureSystem._layers_sources(layers[:i + 1]))
+
+        raise AssertionError("Unreachable")
+
+    @staticmethod
+    def _layers_sources(layers: List[Dict[str, Any]]) -> List[str]:
+        """Возвращает исходные файлы всех слоев.
+
+        Args:
+            layers (List[Dict[str, Any]]): Список слоев.
+
+        Returns:
+            List[str]: Абсолютные пути к листам и info.yml слоев.
+        """
+        return [source for layer in layers for source in CacheKey.layer_sources(layer)]
+
+    @staticmethod
+    def merged_path(root_path, layers: List[Dict[str, Any]]) -> str:
+        """Возвращает путь к результату merge_layers для списка слоев.
+
+        Args:
+            root_path: Корень клиента.
+            layers (List[Dict[str, Any]]): Список слоев.
+
+        Returns:
+            str: Путь к файлу в Content/Compiled.
+        """
+        is_gif = any(TextureSystem.get_state_info(layer['path'], layer['state'])[2] > 1 for layer in layers)
+        path = os.path.join(root_path, 'Content', 'Compiled', TextureSystem._get_hash_list(layers))
+        return path + (FrameStrip.EXTENSION if is_gif else ".png")
+
+    @staticmethod
+    def merge_layers(root_path, layers: List[Dict[str, Any]], fps: int = DEFAULT_FPS) -> Union[Image.Image, Sequence[Image.Image]]:
         """Объединяет слои в одно изображение или GIF.
 
+        Слой может задать смещение 'offset': [x, y], холст расширяется, чтобы вместить все слои.
+        Анимированные слои зацикливаются, длина результата - НОК их длин (не больше MAX_LOOP_FRAMES).
+        Одинаковые кадры результата собираются и хранятся один раз.
+
         Args:
             layers (List[Dict[str, Any]]): Список слоев.
             fps (int, optional): Частота кадров для GIF. По умолчанию DEFAULT_FPS.
 
         Returns:
-            Union[Image.Image, List[Image.Image]]: Объединенное изображение или список кадров GIF.
+            Union[Image.Image, Sequence[Image.Image]]: Объединенное изображение или FrameStrip с кадрами GIF.
         """
-        base_path = os.path.join(root_path, 'Content', 'Compiled')
-        if not os.path.exists(base_path):
-            os.makedirs(base_path)
-        
-        hash_layers = TextureSystem._get_hash_list(layers)
-        path = os.path.join(base_path, hash_layers)
-        
-        is_gif: bool = False
+        path = TextureSystem.merged_path(root_path, layers)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
         max_width: int = 0
         max_height: int = 0
         max_frames: int = 0
         
+        lengths: List[int] = []
+        offsets: List[Tuple[int, int]] = []
         for layer in layers:
             frame_width, frame_height, num_frames, _ = TextureSystem.get_state_info(layer['path'], layer['state'])
-            max_width = max(max_width, frame_width)
-            max_height = max(max_height, frame_height)
+            offset_x, offset_y = layer.get('offset') or (0, 0)
+            offsets.append((offset_x, offset_y))
+            max_width = max(max_width, offset_x + frame_width)
+            max_height = max(max_height, offset_y + frame_height)
             max_frames = max(max_frames, num_frames)
-            if num_frames > 1:
-                is_gif = True
+            lengths.append(num_frames)
         
-        path += ".gif" if is_gif else ".png"
-        
-        if os.path.exists(path):
-            with Image.open(path) as img:
+        is_gif = max_frames > 1
+        memory_key = MemoryCache.make_key(path, None, None, "merged_gif" if is_gif else "merged_png")
+        compiled = TextureSystem._load_compiled(memory_key, path, is_gif)
+        if compiled is not None:
+            return compiled
+
+        with CompileLock.hold(path):
+            compiled = TextureSystem._load_compiled(memory_key, path, is_gif)
+            if compiled is not None:
+                return compiled
+
+            # Закончили проверку и поняли, что нам надо работать
+            frame_count = Compositor.loop_length(lengths, TextureSystem.MAX_LOOP_FRAMES)
+            unique_images, timeline = TextureSystem._composite_layers(layers, offsets, (max_width, max_height), frame_count, fps)
+
+            with CompileLock.atomic_path(path) as tmp_path:
                 if is_gif:
-                    return [frame.convert("RGBA").copy() for frame in ImageSequence.Iterator(img)]
+                    FrameStrip.write(tmp_path, unique_images, 1000//fps, timeline)
                 else:
-                    return img.convert("RGBA").copy()
+                    unique_images[0].save(tmp_path, format="PNG")
 
-        # Закончили проверку и поняли, что нам надо работать. Первоначальная обработка первого слоя
-        final_images: List[Image.Image] = []
-        first_layer = layers[0]
-        _, _, _, is_mask = TextureSystem.get_state_info(first_layer['path'], first_layer['state'])
+            CompiledCache.register(path, TextureSystem._layers_sources(layers), TextureSystem._recipe("merge", root_path=str(root_path), layers=layers, fps=fps))
+            if not is_gif:
+                TextureSystem._remember_compiled(memory_key, unique_images[0])
+                return unique_images[0]
+
+            # В памяти держим отображение файла: уникальные кадры без повторов, как и при загрузке с диска
+            strip = FrameStrip(path)
+            MemoryCache.put(memory_key, strip)
+            return strip.view()
+
+    @staticmethod
+    def _scale_key(scale: float) -> str:
+        """Записывает масштаб без потери точности для имени файла и ключа кеша.
+
+        Args:
+            scale (float): Масштаб.
+
+        Returns:
+            str: Кратчайшая точная запись, целый масштаб без ".0", например "2", "0.5" или "1.0000001".
+        """
+        text = repr(float(scale))
+        return text[:-2] if text.endswith(".0") else text
+
+    @staticmethod
+    def scaled_path(compiled_path: str, scale: float, resample: int = Image.Resampling.NEAREST) -> str:
+        """Возвращает путь к масштабированному варианту скомпилированного файла.
+
+        Вариант лежит рядом с исходным файлом и помечен "_compiled_", поэтому учитывается и вытесняется CompiledCache как обычный скомпилированный файл.
+
+        Args:
+            compiled_path (str): Путь к скомпилированному файлу или листу состояния.
+            scale (float): Масштаб.
+            resample (int, optional): Фильтр масштабирования PIL. По умолчанию ближайший сосед.
+
+        Returns:
+            str: Путь к файлу варианта.
+        """
+        base, extension = os.path.splitext(compiled_path)
+        suffix = ("_x" if "_compiled_" in os.path.basename(base) else "_compiled_x") + TextureSystem._scale_key(scale)
+        if resample != Image.Resampling.NEAREST:
+            suffix += f"_{Image.Resampling(resample).name.lower()}"
+
+        return base + suffix + extension
+
+    @staticmethod
+    def _scale_array(pixels: np.ndarray, scale: float, resample: int = Image.Resampling.NEAREST) -> np.ndarray:
+        """Масштабирует массив RGBA.
+
+        Целый масштаб ближайшим соседом - повтор пикселей без PIL, результат совпадает с Image.resize.
+
+        Args:
+            pixels (np.ndarray): Массив формы (H, W, 4) типа uint8.
+            scale (float): Масштаб.
+            resample (int, optional): Фильтр масштабирования PIL. По умолчанию ближайший сосед.
+
+        Returns:
+            np.ndarray: Масштабированный массив. Стороны не меньше пикселя.
+        """
+        if resample == Image.Resampling.NEAREST and float(scale).is_integer():
+            factor = int(scale)
+            return np.repeat(np.repeat(pixels, factor, axis=0), factor, axis=1)
+
+        height, width = pixels.shape[:2]
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return np.asarray(Image.fromarray(pixels, "RGBA").resize(size, resample))
+
+    @staticmethod
+    def _scaled(
+        source_path: str,
+        key: Tuple,
+        version: Any,
+        is_gif: bool,
+        scale: float,
+        resample: int,
+        fps: int,
+        produce: Callable[[], Union[Image.Image, Sequence[Image.Image]]],
+        sources: List[str],
+        recipe: Dict[str, Any]
+    ) -> Union[Image.Image, Sequence[Image.Image]]:
+        """Возвращает масштабированный вариант результата, компилируя его при необходимости.
+
+        Args:
+            source_path (str): Путь к скомпилированному файлу исходного результата.
+            key (Tuple): Ключ исходного результата в кеше в памяти.
+            version (Any): Отпечатки исходников, см. _source_version, или None.
+            is_gif (bool): Указывает, является ли результат анимацией.
+            scale (float): Масштаб.
+            resample (int): Фильтр масштабирования PIL.
+            fps (int): Частота кадров, если длительности не записаны в кадрах.
+            produce (Callable[[], Union[Image.Image, Sequence[Image.Image]]]): Возвращает исходный результат.
+            sources (List[str]): Исходные файлы результата.
+            recipe (Dict[str, Any]): Описание пересборки, см. _recipe.
+
+        Raises:
+            ValueError: Если масштаб не положительный.
+
+        Returns:
+            Union[Image.Image, Sequence[Image.Image]]: Масштабированное изображение или кадры.
+        """
+        if scale <= 0:
+            raise ValueError(f"Scale must be positive, got {scale}")
+
+        if scale == 1:
+            return produce()
+
+        output_path = TextureSystem.scaled_path(source_path, scale, resample)
+        scaled_key = (*key, "scaled", TextureSystem._scale_key(scale), int(resample))
+        compiled = TextureSystem._load_compiled(scaled_key, output_path, is_gif, version=version)
+        if compiled is not None:
+            return compiled
+
+        with CompileLock.hold(output_path):
+            compiled = TextureSystem._load_compiled(scaled_key, output_path, is_gif, version=version)
+            if compiled is not None:
+                return compiled
+
+            value = produce()
+            if not is_gif:
+                with TextureMetrics.stage("scale"):
+                    image = Image.fromarray(TextureSystem._scale_array(TextureSystem._sheet_array(value), scale, resample), "RGBA")
+
+                with CompileLock.atomic_path(output_path) as tmp_path:
+                    image.save(tmp_path, format="PNG")
+
+                CompiledCache.register(output_path, sources, recipe)
+                TextureSystem._remember_compiled(scaled_key, image, version)
+                return image
+
+            # Масштабируются только уникальные кадры, шкала и длительности сохраняются
+            if isinstance(value, FrameStrip):
+                frames = [value.unique_array(index) for index in range(value.unique_count)]
+                durations, timeline = value.durations, value.timeline
+
+            elif isinstance(value, FrameStack):
+                frames, durations, timeline = list(value.array), value.durations, None
 
-        if is_gif:
-            if is_mask:
-                final_images = [frame for frame in TextureSystem.get_gif_recolor(first_layer['path'], first_layer['state'], first_layer['color'], fps)]
-            else:
-                final_images = [frame for frame in TextureSystem.get_gif(first_layer['path'], first_layer['state'], fps)]
-            
-            for i in range(len(final_images)):
-                final_image_expanded = Image.new("RGBA", (max_width, max_height))
-                final_image_expanded.paste(final_images[i], (0, 0))
-                final_images[i] = final_image_expanded
-        else:
-            if is_mask:
-                final_image = TextureSystem.get_image_recolor(first_layer['path'], first_layer['state'], Color(*first_layer['color']))
             else:
-                final_image = TextureSystem.get_image(first_layer['path'], first_layer['state'])
-            
-            final_image_expanded = Image.new("RGBA", (max_width, max_height))
-            final_image_expanded.paste(final_image, (0, 0))
-            final_images.append(final_image_expanded)
+                frames = [TextureSystem._sheet_array(frame) for frame in value]
+                durations, timeline = getattr(value, 'durations', 1000//fps), None
+
+            with TextureMetrics.stage("scale"):
+                frames = [TextureSystem._scale_array(frame, scale, resample) for frame in frames]
 
-        # Обработка оставшихся слоев
-        for layer in layers[1:]:
-            _, _, _, is_mask = TextureSystem.get_state_info(layer['path'], layer['state'])
+            with CompileLock.atomic_path(output_path) as tmp_path:
+                FrameStrip.write(tmp_path, frames, durations, timeline)
+
+            CompiledCache.register(output_path, sources, recipe)
+            strip = FrameStrip(output_path)
+            MemoryCache.put(scaled_key, strip, version)
+            return strip.view()
+
+    @staticmethod
+    def get_scaled(path: str, state: str, scale: float, color: Optional[Color] = None, fps: int = DEFAULT_FPS, resample: int = Image.Resampling.NEAREST) -> Union[Image.Image, Sequence[Image.Image]]:
+        """Возвращает изображение или кадры состояния в заданном масштабе.
+
+        Варианты масштаба компилируются один раз, как уровни mipmap, и хранятся рядом с остальными скомпилированными файлами.
+
+        Args:
+            path (str): Путь к директории с текстурами.
+            state (str): Имя состояния.
+            scale (float): Масштаб, целый или дробный.
+            color (Optional[Color], optional): Цвет для маски. По умолчанию None.
+            fps (int, optional): Частота кадров анимации. По умолчанию DEFAULT_FPS.
+            resample (int, optional): Фильтр масштабирования PIL. По умолчанию ближайший сосед, чтобы пиксель-арт оставался четким.
 
+        Returns:
+            Union[Image.Image, Sequence[Image.Image]]: Масштабированное изображение или кадры.
+        """
+        _, _, num_frames, is_mask = TextureSystem.get_state_info(path, state)
+        is_gif = num_frames > 1
+        color = color if is_mask else None
+
+        def produce() -> Union[Image.Image, Sequence[Image.Image]]:
             if is_gif:
+                return TextureSystem.get_gif_recolor(path, state, color, fps) if color else TextureSystem.get_gif(path, state, fps)
+
+            return TextureSystem.get_image_recolor(path, state, color) if color else TextureSystem.get_image(path, state)
+
+        return TextureSystem._scaled(
+            TextureSystem.compiled_path(path, state, color, is_gif), MemoryCache.make_key(path, state, color, "gif" if is_gif else "png"),
+            TextureSystem._source_version(path, state), is_gif, scale, resample, fps, produce, TextureSystem._state_sources(path, state),
+            TextureSystem._recipe("scaled", path=path, state=state, scale=scale, color=color, fps=fps, resample=int(resample))
+        )
+
+    @staticmethod
+    def merge_layers_scaled(root_path, layers: List[Dict[str, Any]], scale: float, fps: int = DEFAULT_FPS, resample: int = Image.Resampling.NEAREST) -> Union[Image.Image, Sequence[Image.Image]]:
+        """Объединяет слои через merge_layers и возвращает результат в заданном масштабе.
+
+        Args:
+            root_path: Корень клиента.
+            layers (List[Dict[str, Any]]): Список слоев.
+            scale (float): Масштаб, целый или дробный.
+            fps (int, optional): Частота кадров для GIF. По умолчанию DEFAULT_FPS.
+            resample (int, optional): Фильтр масштабирования PIL. По умолчанию ближайший сосед.
+
+        Returns:
+            Union[Image.Image, Sequence[Image.Image]]: Масштабированное изображение или кадры.
+        """
+        path = TextureSystem.merged_path(root_path, layers)
+        is_gif = path.endswith(FrameStrip.EXTENSION)
+        key = MemoryCache.make_key(path, None, None, "merged_gif" if is_gif else "merged_png")
+        return TextureSystem._scaled(
+            path, key, None, is_gif, scale, resample, fps, lambda: TextureSystem.merge_layers(root_path, layers, fps), TextureSystem._layers_sources(layers),
+            TextureSystem._recipe("merge_scaled", root_path=str(root_path), layers=layers, scale=scale, fps=fps, resample=int(resample))
+        )
+
+    @staticmethod
+    def rebuild(recipe: Dict[str, Any]) -> Union[Image.Image, Sequence[Image.Image]]:
+        """Пересобирает скомпилированный файл по описанию из CompiledCache.
+
+        Args:
+            recipe (Dict[str, Any]): Описание пересборки, см. CompiledCache.invalidate_sources.
+
+        Raises:
+            ValueError: Если вид результата неизвестен.
+
+        Returns:
+            Union[Image.Image, Sequence[Image.Image]]: Пересобранный результат.
+        """
+        kind = recipe['kind']
+        color = Color(*recipe['color']) if recipe.get('color') else None
+        if kind == "recolor":
+            return TextureSystem.get_image_recolor(recipe['path'], recipe['state'], color)
+
+        if kind == "gif":
+            if color:
+                return TextureSystem.get_gif_recolor(recipe['path'], recipe['state'], color, recipe['fps'])
+
+            return TextureSystem.get_gif(recipe['path'], recipe['state'], recipe['fps'])
+
+        if kind == "scaled":
+            return TextureSystem.get_scaled(recipe['path'], recipe['state'], recipe['scale'], color, recipe['fps'], recipe['resample'])
+
+        if kind == "merge":
+            return TextureSystem.merge_layers(recipe['root_path'], recipe['layers'], recipe['fps'])
+
+        if kind == "merge_scaled":
+            return TextureSystem.merge_layers_scaled(recipe['root_path'], recipe['layers'], recipe['scale'], recipe['fps'], recipe['resample'])
+
+        raise ValueError(f"Unknown compiled file kind '{kind}'")
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """Возвращает счетчики и время этапов TextureSystem вместе со статистикой кешей.
+
+        Returns:
+            Dict[str, Any]: Счетчики (counters), этапы с гистограммами времени (stages),
+            статистика memory_cache, prefix_cache и compiled_cache.
+        """
+        return {
+            **TextureMetrics.snapshot(),
+            'memory_cache': MemoryCache.stats(),
+            'prefix_cache': PrefixCache.stats(),
+            'compiled_cache': CompiledCache.stats(),
+        }
+
+    @staticmethod
+    def _run_batch(executor: ThreadPoolExecutor, jobs: List[Tuple[Callable[..., Any], Tuple[Any, ...]]], cancel_event: Optional[threading.Event]) -> List[Any]:
+        """Выполняет задания в пуле и ждет их завершения, следя за отменой.
+
+        Args:
+            executor (ThreadPoolExecutor): Пул потоков.
+            jobs (List[Tuple[Callable[..., Any], Tuple[Any, ...]]]): Функции и их аргументы.
+            cancel_event (Optional[threading.Event]): Событие отмены.
+
+        Raises:
+            CancelledError: Если пакет был отменен.
+
+        Returns:
+            List[Any]: Результаты в порядке заданий.
+        """
+        futures: List[Future] = [executor.submit(func, *args) for func, args in jobs]
+        pending = set(futures)
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                for future in pending:
+                    future.cancel()
+
+                raise CancelledError("Texture batch was cancelled")
+
+            _, pending = wait(pending, timeout=0.05)
+
+        return [future.result() for future in futures]
+
+    @staticmethod
+    def merge_layers_many(root_path, specs: List[List[Dict[str, Any]]], fps: int = DEFAULT_FPS, workers: Optional[int] = None, cancel_event: Optional[threading.Event] = None) -> List[Union[Image.Image, Sequence[Image.Image]]]:
+        """Объединяет слои для множества описаний параллельно.
+
+        Одинаковые описания внутри пакета считаются один раз. Исходные слои сначала декодируются
+        и перекрашиваются по одному разу на весь пакет, затем объединения собираются из кеша.
+
+        Args:
+            root_path: Корень клиента, см. merge_layers.
+            specs (List[List[Dict[str, Any]]]): Список описаний слоев.
+            fps (int, optional): Частота кадров для GIF. По умолчанию DEFAULT_FPS.
+            workers (Optional[int], optional): Число потоков. По умолчанию BATCH_WORKERS.
+            cancel_event (Optional[threading.Event], optional): Событие, установка которого отменяет пакет. По умолчанию None.
+
+        Raises:
+            CancelledError: Если пакет был отменен.
+
+        Returns:
+            List[Union[Image.Image, Sequence[Image.Image]]]: Результаты в порядке описаний.
+        """
+        keys = [TextureSystem._get_hash_list(layers) for layers in specs]
+        unique_specs: Dict[str, List[Dict[str, Any]]] = {}
+        for key, layers in zip(keys, specs):
+            unique_specs.setdefault(key, layers)
+
+        # Исходные слои, нужные пакету. Кадры GIF строятся из перекрашенных листов, поэтому листы готовятся раньше
+        images: Dict[Tuple[Any, ...], Tuple[Callable[..., Any], Tuple[Any, ...]]] = {}
+        animations: Dict[Tuple[Any, ...], Tuple[Callable[..., Any], Tuple[Any, ...]]] = {}
+        for layers in unique_specs.values():
+            states = [TextureSystem.get_state_info(layer['path'], layer['state']) for layer in layers]
+            for layer, (_, _, num_frames, is_mask) in zip(layers, states):
+                color = Color(*layer['color']) if is_mask else None
+                key = (os.path.abspath(layer['path']), layer['state'], tuple(color) if color else None)
                 if is_mask:
-                    recolored_frames = TextureSystem.get_gif_recolor(layer['path'], layer['state'], Color(*layer['color']), fps)
-                    for i in range(max_frames):
-                        recolored_frame_expanded = Image.new("RGBA", (max_width, max_height))
-                        frame_to_use = recolored_frames[min(i, len(recolored_frames) - 1)]  # Используем последний кадр, если i превышает количество кадров
-                        recolored_frame_expanded.paste(frame_to_use, (0, 0))
-                        if i < len(final_images):
-                            final_images[i] = TextureSystem.merge_images(final_images[i], recolored_frame_expanded)
-                        else:
-                            final_images.append(recolored_frame_expanded)
-                else:
-                    normal_frames = TextureSystem.get_gif(layer['path'], layer['state'], fps)
-                    for i in range(max_frames):
-                        normal_frame_expanded = Image.new("RGBA", (max_width, max_height))
-                        frame_to_use = normal_frames[min(i, len(normal_frames) - 1)]  # Используем последний кадр, если i превышает количество кадров
-                        normal_frame_expanded.paste(frame_to_use, (0, 0))
-                        if i < len(final_images):
-                            final_images[i] = TextureSystem.merge_images(final_images[i], normal_frame_expanded)
-                        else:
-                            final_images.append(normal_frame_expanded)
-            else:
-                if is_mask:
-                    recolored_image = TextureSystem.get_image_recolor(layer['path'], layer['state'], Color(*layer['color']))
-                    recolored_image_expanded = Image.new("RGBA", (max_width, max_height))
-                    recolored_image_expanded.paste(recolored_image, (0, 0))
-                    for i in range(len(final_images)):
-                        final_images[i] = TextureSystem.merge_images(final_images[i], recolored_image_expanded)
+                    images[key] = (TextureSystem.get_image_recolor, (layer['path'], layer['state'], color))
+                    if num_frames > 1:
+                        animations[key] = (TextureSystem.get_gif_recolor, (layer['path'], layer['state'], color, fps))
                 else:
-                    normal_image = TextureSystem.get_image(layer['path'], layer['state'])
-                    normal_image_expanded = Image.new("RGBA", (max_width, max_height))
-                    normal_image_expanded.paste(normal_image, (0, 0))
-                    for i in range(len(final_images)):
-                        final_images[i] = TextureSystem.merge_images(final_images[i], normal_image_expanded)
-        
-        # Создаем новое изображение с максимальными размерами
-        if is_gif:
-            final_images[0].save(path, save_all=True, append_images=final_images[1:], duration=1000//fps, loop=0)
-            return final_images.copy()
-        
-        else:
-            final_images[0].save(path)
-            return final_images[0].copy()
+                    images[key] = (TextureSystem.get_image, (layer['path'], layer['state']))
+                    if num_frames > 1:
+                        animations[key] = (TextureSystem.get_gif, (layer['path'], layer['state'], fps))
+
+        with ThreadPoolExecutor(max_workers=workers or TextureSystem.BATCH_WORKERS) as executor:
+            TextureSystem._run_batch(executor, list(images.values()), cancel_event)
+            TextureSystem._run_batch(executor, list(animations.values()), cancel_event)
+            merged = TextureSystem._run_batch(executor, [(TextureSystem.merge_layers, (root_path, layers, fps)) for layers in unique_specs.values()], cancel_event)
+
+        results = dict(zip(unique_specs.keys(), merged))
+        output: List[Union[Image.Image, Sequence[Image.Image]]] = []
+        returned = set()
+        for key in keys:
+            # Повторяющимся описаниям отдаем собственные копии
+            output.append(TextureSystem._copy_frames(results[key]) if key in returned else results[key])
+            returned.add(key)
+
+        return output
+
+    @staticmethod
+    def _get_executor() -> ThreadPoolExecutor:
+        """Возвращает общий пул потоков для асинхронных методов.
+
+        Returns:
+            ThreadPoolExecutor: Пул потоков.
+        """
+        if TextureSystem._executor is None:
+            TextureSystem._executor = ThreadPoolExecutor(max_workers=TextureSystem.BATCH_WORKERS, thread_name_prefix="TextureSystem")
+
+        return TextureSystem._executor
+
+    @staticmethod
+    async def _run_async(key: Tuple[Any, ...], func: Callable[..., Any], *args: Any) -> Any:
+        """Выполняет функцию в пуле потоков, объединяя одновременные запросы с одинаковым ключом.
+
+        Пока запрос выполняется, остальные вызовы с тем же ключом ждут его результата.
+        Отмена одного из ожидающих не отменяет общую работу.
+
+        Args:
+            key (Tuple[Any, ...]): Ключ запроса.
+            func (Callable[..., Any]): Синхронный метод TextureSystem.
+            *args (Any): Аргументы метода.
+
+        Returns:
+            Any: Результат метода. Каждый вызывающий получает свою копию.
+        """
+        loop = asyncio.get_running_loop()
+        inflight_key = (id(loop), key)
+
+        future = TextureSystem._inflight.get(inflight_key)
+        if future is None:
+            future = loop.run_in_executor(TextureSystem._get_executor(), func, *args)
+            TextureSystem._inflight[inflight_key] = future
+            future.add_done_callback(lambda _: TextureSystem._inflight.pop(inflight_key, None))
+
+        result = await asyncio.shield(future)
+        return TextureSystem._copy_frames(result)
+
+    @staticmethod
+    async def aget_image(path: str, state: str) -> Image.Image:
+        """Асинхронная версия get_image."""
+        return await TextureSystem._run_async(("get_image", os.fspath(path), state), TextureSystem.get_image, path, state)
+
+    @staticmethod
+    async def aget_image_recolor(path: str, state: str, color: Color = DEFAULT_COLOR) -> Image.Image:
+        """Асинхронная версия get_image_recolor."""
+        return await TextureSystem._run_async(("get_image_recolor", os.fspath(path), state, tuple(color)), TextureSystem.get_image_recolor, path, state, color)
+
+    @staticmethod
+    async def aget_gif(path: str, state: str, fps: int = DEFAULT_FPS) -> Sequence[Image.Image]:
+        """Асинхронная версия get_gif."""
+        return await TextureSystem._run_async(("get_gif", os.fspath(path), state, fps), TextureSystem.get_gif, path, state, fps)
+
+    @staticmethod
+    async def aget_gif_recolor(path: str, state: str, color: Color = DEFAULT_COLOR, fps: int = DEFAULT_FPS) -> Sequence[Image.Image]:
+        """Асинхронная версия get_gif_recolor."""
+        return await TextureSystem._run_async(("get_gif_recolor", os.fspath(path), state, tuple(color), fps), TextureSystem.get_gif_recolor, path, state, color, fps)
+
+    @staticmethod
+    async def amerge_layers(root_path, layers: List[Dict[str, Any]], fps: int = DEFAULT_FPS) -> Union[Image.Image, Sequence[Image.Image]]:
+        """Асинхронная версия merge_layers."""
+        key = ("merge_layers", os.fspath(root_path), CacheKey.digest(CacheKey.canonical(layers)), fps)
+        return await TextureSystem._run_async(key, TextureSystem.merge_layers, root_path, layers, fps)
@@ -0,0 +1,273 @@
+import argparse
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+import yaml
+from DMBotTools import Color
+from root_path import ROOT_PATH
+from systems.texture_system import CacheKey, CompiledCache, MetadataIndex, TextureSystem
+
+JOURNAL_PATH = ROOT_PATH / "Content" / "Compiled" / "precompile.journal"
+
+
+def cmd_stats(args: argparse.Namespace) -> None:
+    """Печатает статистику скомпилированного кеша."""
+    if args.scan:
+        CompiledCache.scan(ROOT_PATH)
+
+    print(json.dumps(CompiledCache.stats(), indent=4))
+
+
+def cmd_gc(args: argparse.Namespace) -> None:
+    """Освобождает место до квоты и убирает из индекса пропавшие файлы."""
+    if args.scan:
+        added = CompiledCache.scan(ROOT_PATH)
+        logging.info(f"Found {added} untracked compiled files")
+
+    quota = args.quota * 1024 * 1024 if args.quota is not None else None
+    result = CompiledCache.gc(quota)
+    logging.info(
+        f"Removed {result['removed']} files ({result['freed'] / 1024 / 1024:.1f} MiB), "
+        f"dropped {result['missing']} missing entries"
+    )
+
+
+def _parse_color(value: str) -> Tuple[int, int, int, int]:
+    """Разбирает цвет R,G,B[,A] из аргумента командной строки."""
+    parts = [int(part) for part in value.split(",")]
+    if len(parts) == 3:
+        parts.append(255)
+
+    if len(parts) != 4 or not all(0 <= part <= 255 for part in parts):
+        raise argparse.ArgumentTypeError(f"Invalid color '{value}', expected R,G,B[,A]")
+
+    return tuple(parts)  # type: ignore
+
+
+def _resolve(path: str) -> str:
+    """Переводит путь относительно корня клиента в абсолютный."""
+    return str(ROOT_PATH / path) if not os.path.isabs(path) else path
+
+
+def collect_jobs(scan_dirs: List[str], colors: List[Tuple[int, int, int, int]], merges: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Собирает задания: перекраски и анимации состояний из просканированных директорий и объединения слоев."""
+    jobs: List[Dict[str, Any]] = []
+    for root in scan_dirs:
+        for texture_dir in MetadataIndex.find_texture_dirs(root):
+            for texture in MetadataIndex.get_textures(texture_dir):
+                _, _, num_frames, is_mask = TextureSystem.get_state_info(texture_dir, texture['name'])
+                if is_mask:
+                    for color in colors:
+                        jobs.append({'kind': 'recolor', 'path': texture_dir, 'state': texture['name'], 'color': list(color)})
+                        if num_frames > 1:
+                            jobs.append({'kind': 'animation', 'path': texture_dir, 'state': texture['name'], 'color': list(color)})
+
+                elif num_frames > 1:
+                    jobs.append({'kind': 'animation', 'path': texture_dir, 'state': texture['name'], 'color': None})
+
+    for layers in merges:
+        jobs.append({'kind': 'merge', 'layers': [dict(layer, path=_resolve(layer['path'])) for layer in layers]})
+
+    return jobs
+
+
+def _job_output(job: Dict[str, Any]) -> str:
+    """Возвращает путь к скомпилированному файлу задания."""
+    if job['kind'] == 'merge':
+        return TextureSystem.merged_path(ROOT_PATH, job['layers'])
+
+    color = Color(*job['color']) if job['color'] else None
+    return TextureSystem.compiled_path(job['path'], job['state'], color, job['kind'] == 'animation')
+
+
+def _job_sources(job: Dict[str, Any]) -> List[str]:
+    """Возвращает исходные файлы, от которых зависит результат задания."""
+    layers = job['layers'] if job['kind'] == 'merge' else [job]
+    return [source for layer in layers for source in CacheKey.layer_sources(layer)]
+
+
+def _is_fresh(job: Dict[str, Any], output: str, journal: Set[str], job_id: str) -> bool:
+    """Проверяет, что результат задания уже скомпилирован и не старше своих исходников.
+
+    Результат засчитывается, если задание записано в журнал или файл учтен в CompiledCache, например его скомпилировал клиент.
+    """
+    if not os.path.exists(output) or (job_id not in journal and not CompiledCache.tracked(output)):
+        return False
+
+    try:
+        newest_source = max((os.stat(source).st_mtime_ns for source in _job_sources(job)), default=0)
+
+    except OSError:  # Исходник пропал, задание завершится ошибкой и попадет в отчет
+        return False
+
+    return os.stat(output).st_mtime_ns >= newest_source
+
+
+def _job_runner(job: Dict[str, Any], fps: int) -> Callable[[], Any]:
+    """Возвращает функцию, компилирующую перекраску или анимацию задания."""
+    if job['kind'] == 'recolor':
+        return lambda: TextureSystem.get_image_recolor(job['path'], job['state'], Color(*job['color']))
+
+    if job['color']:
+        return lambda: TextureSystem.get_gif_recolor(job['path'], job['state'], Color(*job['color']), fps)
+
+    return lambda: TextureSystem.get_gif(job['path'], job['state'], fps)
+
+
+def _load_journal(restart: bool) -> Set[str]:
+    """Читает идентификаторы выполненных заданий из журнала, при restart журнал удаляется."""
+    if restart and JOURNAL_PATH.exists():
+        JOURNAL_PATH.unlink()
+
+    if not JOURNAL_PATH.exists():
+        return set()
+
+    with JOURNAL_PATH.open("r", encoding="utf-8") as file:
+        return {line.strip() for line in file if line.strip()}
+
+
+def cmd_precompile(args: argparse.Namespace) -> int:
+    """Заранее компилирует перекраски, анимации и объединения слоев.
+
+    Ошибка задания записывается в лог, остальные задания продолжают компилироваться.
+
+    Returns:
+        int: Код выхода: 0, если все задания выполнены, иначе 1.
+    """
+    scan_dirs: List[str] = [_resolve(path) for path in args.scan]
+    colors: List[Tuple[int, int, int, int]] = list(args.color)
+    merges: List[List[Dict[str, Any]]] = []
+
+    if args.manifest:
+        with Path(args.manifest).open("r", encoding="utf-8") as file:
+            manifest = yaml.safe_load(file) or {}
+
+        scan_dirs.extend(_resolve(path) for path in manifest.get("scan", []))
+        colors.extend(tuple(color) for color in manifest.get("colors", []))
+        merges.extend(manifest.get("merges", []))
+
+    jobs = collect_jobs(scan_dirs, colors, merges)
+    journal = _load_journal(args.restart)
+
+    # Задание считается выполненным, если результат на месте, учтен и не старше исходников
+    pending: List[Tuple[str, Dict[str, Any]]] = []
+    cached = 0
+    for job in jobs:
+        job_id = CacheKey.digest(CacheKey.canonical(job))
+        if _is_fresh(job, _job_output(job), journal, job_id):
+            cached += 1
+        else:
+            pending.append((job_id, job))
+
+    logging.info(f"{len(jobs)} jobs, {cached} already cached, {len(pending)} to compile")
+    if not pending:
+        return 0
+
+    JOURNAL_PATH.parent.mkdir(parents=True, exist_ok=True)
+    done = 0
+    failed = 0
+    report_every = max(1, len(pending) // 20)
+
+    with JOURNAL_PATH.open("a", encoding="utf-8") as journal_file:
+        def finish(job_id: str) -> None:
+            nonlocal done
+            journal_file.write(job_id + "\n")
+            journal_file.flush()
+            done += 1
+            if done % report_every == 0 or done == len(pending):
+                logging.info(f"[{done}/{len(pending)}] compiled")
+
+        def fail(job: Dict[str, Any], err: Exception) -> None:
+            nonlocal failed
+            failed += 1
+            logging.error(f"Can't compile {job}: {err}")
+
+        # Листы перекрашиваются раньше анимаций, которые из них строятся; объединения собираются последними
+        for kind in ('recolor', 'animation'):
+            stage = [(job_id, job) for job_id, job in pending if job['kind'] == kind]
+            with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                futures = {executor.submit(_job_runner(job, args.fps)): (job_id, job) for job_id, job in stage}
+                for future in as_completed(futures):
+                    job_id, job = futures[future]
+                    try:
+                        future.result()
+
+                    except Exception as err:
+                        fail(job, err)
+                        continue
+
+                    finish(job_id)
+
+        merge_stage = [(job_id, job) for job_id, job in pending if job['kind'] == 'merge']
+        chunk_size = args.workers * 4
+        for start in range(0, len(merge_stage), chunk_size):
+            chunk = merge_stage[start:start + chunk_size]
+            try:
+                TextureSystem.merge_layers_many(ROOT_PATH, [job['layers'] for _, job in chunk], args.fps, workers=args.workers)
+
+            except Exception:
+                # Пакет прерывается первой ошибкой, повторяем его по одному, чтобы найти сломанные задания
+                for job_id, job in chunk:
+                    try:
+                        TextureSystem.merge_layers(ROOT_PATH, job['layers'], args.fps)
+
+                    except Exception as err:
+                        fail(job, err)
+                        continue
+
+                    finish(job_id)
+
+                continue
+
+            for job_id, _ in chunk:
+                finish(job_id)
+
+    CompiledCache.save()
+    if failed:
+        logging.error(f"{failed} of {len(pending)} jobs failed")
+        return 1
+
+    return 0
+
+
+def main() -> int:
+    """Разбирает аргументы командной строки и выполняет команду.
+
+    Returns:
+        int: Код выхода.
+    """
+    parser = argparse.ArgumentParser(description="Управление скомпилированными текстурами DMBot")
+    parser.add_argument("--policy", choices=CompiledCache.POLICIES, help="Политика вытеснения")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    stats_parser = subparsers.add_parser("stats", help="Показать статистику кеша")
+    stats_parser.add_argument("--scan", action="store_true", help="Поставить на учет файлы, которых нет в индексе")
+    stats_parser.set_defaults(func=cmd_stats)
+
+    gc_parser = subparsers.add_parser("gc", help="Освободить место до квоты")
+    gc_parser.add_argument("--quota", type=int, help="Квота в МиБ")
+    gc_parser.add_argument("--scan", action="store_true", help="Поставить на учет файлы, которых нет в индексе")
+    gc_parser.set_defaults(func=cmd_gc)
+
+    precompile_parser = subparsers.add_parser("precompile", help="Заранее скомпилировать перекраски и объединения слоев")
+    precompile_parser.add_argument("--manifest", help="YAML с ключами scan, colors и merges")
+    precompile_parser.add_argument("--scan", action="append", default=[], help="Директория текстур или пакет контента (можно несколько)")
+    precompile_parser.add_argument("--color", action="append", default=[], type=_parse_color, help="Цвет масок R,G,B[,A] (можно несколько)")
+    precompile_parser.add_argument("--workers", type=int, default=TextureSystem.BATCH_WORKERS, help="Число потоков")
+    precompile_parser.add_argument("--fps", type=int, default=TextureSystem.DEFAULT_FPS, help="Частота кадров анимаций")
+    precompile_parser.add_argument("--restart", action="store_true", help="Начать заново, забыв прогресс прошлого запуска")
+    precompile_parser.set_defaults(func=cmd_precompile)
+
+    args = parser.parse_args()
+    CompiledCache.configure(policy=args.policy)
+    return args.func(args) or 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s][%(levelname)-7s] %(name)s: %(message)s")
+    sys.exit(main())
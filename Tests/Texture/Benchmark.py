@@ -0,0 +1,231 @@
+"""Замеры производительности TextureSystem на синтетическом контенте.
+
+Запуск из корня репозитория:
+    python -m Tests.Texture.Benchmark --output bench.json
+
+Каждый сценарий замеряется холодным (без скомпилированных файлов и кеша в памяти),
+теплым с диска (файлы есть, кеш в памяти пуст) и теплым из памяти.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import PIL
+import yaml
+from DMBotTools import Color
+from PIL import Image
+
+from Code.systems.texture_system import CompiledCache, Compositor, MemoryCache, PrefixCache, TextureSystem
+
+COLORS = [Color(255, 64, 64, 255), Color(64, 255, 64, 255), Color(64, 64, 255, 255), Color(200, 180, 40, 255)]
+
+
+def generate_content(root: str, states: int, size: int, frames: int, mask_ratio: float, seed: int = 0) -> List[Dict[str, Any]]:
+    """Создает директорию текстур со случайными листами.
+
+    Args:
+        root (str): Директория текстур.
+        states (int): Число состояний.
+        size (int): Размер кадра (квадрат).
+        frames (int): Число кадров анимированных состояний. Каждое второе состояние статично.
+        mask_ratio (float): Доля состояний-масок.
+        seed (int, optional): Зерно генератора. По умолчанию 0.
+
+    Returns:
+        List[Dict[str, Any]]: Описания созданных состояний.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(root, exist_ok=True)
+    textures = []
+    for index in range(states):
+        num_frames = frames if index % 2 else 1
+        is_mask = bool(rng.random() < mask_ratio)
+        name = f"state_{index}"
+        textures.append({'name': name, 'size': {'x': size, 'y': size}, 'frames': num_frames, 'is_mask': is_mask})
+
+        pixels = rng.integers(0, 256, size=(size, size * num_frames, 4), dtype=np.uint8)
+        # Слои накрывают только часть кадра, как шапки и глаза
+        coverage = np.zeros((size, size * num_frames), dtype=bool)
+        for frame in range(num_frames):
+            top, left = rng.integers(0, size // 2, size=2)
+            coverage[top:top + size // 2, frame * size + left:frame * size + left + size // 2] = True
+
+        pixels[..., 3] = np.where(coverage, pixels[..., 3] | 1, 0)
+        Image.fromarray(pixels).save(os.path.join(root, f"{name}.png"))
+
+    with open(os.path.join(root, "info.yml"), 'w') as file:
+        yaml.dump({'Texture': textures}, file)
+
+    return textures
+
+
+def remove_compiled(root: str) -> None:
+    """Удаляет все скомпилированные файлы и очищает кеши в памяти.
+
+    Args:
+        root (str): Корень синтетического контента.
+    """
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if "_compiled_" in filename or filename.endswith(".frames") or os.path.basename(dirpath) == "Compiled":
+                os.remove(os.path.join(dirpath, filename))
+
+    MemoryCache.clear()
+    PrefixCache.clear()
+    Compositor.clear()
+
+
+def measure(func: Callable[[], Any], repeat: int, setup: Optional[Callable[[], None]] = None) -> Dict[str, float]:
+    """Замеряет время вызова функции.
+
+    Args:
+        func (Callable[[], Any]): Замеряемая функция.
+        repeat (int): Число повторов.
+        setup (Optional[Callable[[], None]], optional): Подготовка перед каждым повтором, не входит в замер. По умолчанию None.
+
+    Returns:
+        Dict[str, float]: Минимум, медиана и среднее в миллисекундах.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {'min_ms': min(timings), 'median_ms': statistics.median(timings), 'mean_ms': statistics.fmean(timings)}
+
+
+def measure_paths(root: str, func: Callable[[], Any], repeat: int) -> Dict[str, Dict[str, float]]:
+    """Замеряет холодный, теплый с диска и теплый из памяти вызов.
+
+    Args:
+        root (str): Корень синтетического контента.
+        func (Callable[[], Any]): Замеряемая функция.
+        repeat (int): Число повторов.
+
+    Returns:
+        Dict[str, Dict[str, float]]: Замеры по путям cold, warm_disk и warm_memory.
+    """
+    def clear_memory() -> None:
+        MemoryCache.clear()
+        PrefixCache.clear()
+        Compositor.clear()
+
+    results = {'cold': measure(func, repeat, lambda: remove_compiled(root))}
+    func()
+    results['warm_disk'] = measure(func, repeat, clear_memory)
+    func()
+    results['warm_memory'] = measure(func, repeat)
+    return results
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Выполняет все сценарии.
+
+    Args:
+        args (argparse.Namespace): Параметры запуска.
+
+    Returns:
+        Dict[str, Any]: Результаты в виде, пригодном для JSON.
+    """
+    results: List[Dict[str, Any]] = []
+    work_dir = tempfile.mkdtemp(prefix="dm_texture_bench_")
+    default_index = CompiledCache._index_path
+    CompiledCache.configure(index_path=os.path.join(work_dir, "Content", "Compiled", "index.json"))
+    try:
+        for size in args.sizes:
+            content = os.path.join(work_dir, "Content", f"size_{size}")
+            textures = generate_content(content, args.states, size, args.frames, args.mask_ratio, args.seed)
+            masks = [texture['name'] for texture in textures if texture['is_mask'] and texture['frames'] == 1]
+            animated = [texture['name'] for texture in textures if not texture['is_mask'] and texture['frames'] > 1]
+            params = {'size': size, 'frames': args.frames}
+
+            if masks:
+                results.append({'name': 'get_image_recolor', 'params': params, **measure_paths(
+                    work_dir, lambda: [TextureSystem.get_image_recolor(content, state, color) for state in masks for color in COLORS], args.repeat
+                )})
+                results.append({'name': 'get_image_recolor_many', 'params': params, **measure_paths(
+                    work_dir, lambda: [TextureSystem.get_image_recolor_many(content, state, COLORS) for state in masks], args.repeat
+                )})
+
+            if animated:
+                results.append({'name': 'get_gif', 'params': params, **measure_paths(
+                    work_dir, lambda: [TextureSystem.get_gif(content, state) for state in animated], args.repeat
+                )})
+
+            for depth in args.depths:
+                layers = [
+                    {'path': content, 'state': texture['name'], 'color': list(COLORS[index % len(COLORS)])}
+                    for index, texture in enumerate(textures[:depth])
+                ]
+                results.append({'name': 'merge_layers', 'params': {**params, 'depth': len(layers)}, **measure_paths(
+                    work_dir, lambda: TextureSystem.merge_layers(work_dir, layers), args.repeat
+                )})
+
+    finally:
+        CompiledCache.configure(index_path=default_index)
+        MemoryCache.clear()
+        PrefixCache.clear()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {'meta': collect_meta(), 'args': vars(args), 'results': results}
+
+
+def collect_meta() -> Dict[str, Any]:
+    """Собирает сведения об окружении для сравнения результатов между версиями.
+
+    Returns:
+        Dict[str, Any]: Версии, платформа, коммит и время запуска.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'pillow': PIL.__version__,
+        'platform': platform.platform(),
+        'timestamp': time.time(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замеры производительности TextureSystem")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[32, 128], help="Размеры кадра")
+    parser.add_argument("--frames", type=int, default=4, help="Число кадров анимированных состояний")
+    parser.add_argument("--states", type=int, default=8, help="Число состояний в директории")
+    parser.add_argument("--mask-ratio", type=float, default=0.5, help="Доля состояний-масок")
+    parser.add_argument("--depths", type=int, nargs="+", default=[2, 4, 8], help="Глубины стеков для merge_layers")
+    parser.add_argument("--repeat", type=int, default=5, help="Число повторов каждого замера")
+    parser.add_argument("--seed", type=int, default=0, help="Зерно генератора контента")
+    parser.add_argument("--output", help="Файл для результатов в JSON. По умолчанию вывод в stdout")
+    args = parser.parse_args()
+
+    report = run(args)
+    encoded = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(encoded)
+
+    else:
+        print(encoded)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+import yaml
+from DMBotTools import Color
+from PIL import Image
+
+from Code.systems.texture_system import CompileLock, MemoryCache, TextureSystem
+
+
+class TestCompileLock(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.abspath('test_compile_lock')
+        os.makedirs(self.test_dir, exist_ok=True)
+        MemoryCache.clear()
+
+    def tearDown(self):
+        MemoryCache.clear()
+        shutil.rmtree(self.test_dir)
+
+    def test_failed_write_keeps_old_file(self):
+        target = os.path.join(self.test_dir, 'out.png')
+        with open(target, 'wb') as file:
+            file.write(b'old')
+
+        with self.assertRaises(RuntimeError):
+            with CompileLock.atomic_path(target) as tmp_path:
+                with open(tmp_path, 'wb') as file:
+                    file.write(b'half')
+
+                raise RuntimeError("interrupted")
+
+        with open(target, 'rb') as file:
+            self.assertEqual(file.read(), b'old')
+
+        self.assertEqual(os.listdir(self.test_dir), ['out.png'])
+
+    def test_stale_lock_is_broken(self):
+        target = os.path.join(self.test_dir, 'out.png')
+        lock_path = target + CompileLock.LOCK_SUFFIX
+        with open(lock_path, 'w') as file:
+            file.write('0')
+
+        old = time.time() - CompileLock.STALE_AFTER - 1
+        os.utime(lock_path, (old, old))
+
+        with CompileLock.hold(target):
+            self.assertTrue(os.path.exists(lock_path))
+
+        self.assertFalse(os.path.exists(lock_path))
+
+    def test_lock_of_dead_process_is_broken(self):
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+
+        target = os.path.join(self.test_dir, 'out.png')
+        lock_path = target + CompileLock.LOCK_SUFFIX
+        with open(lock_path, 'w') as file:
+            file.write(str(process.pid))
+
+        self.assertFalse(CompileLock._pid_alive(process.pid))
+        self.assertTrue(CompileLock._pid_alive(os.getpid()))
+
+        started = time.monotonic()
+        with CompileLock.hold(target):
+            self.assertEqual(CompileLock._owner(lock_path), os.getpid())
+
+        self.assertLess(time.monotonic() - started, CompileLock.STALE_AFTER)
+
+    def test_held_lock_is_refreshed(self):
+        target = os.path.join(self.test_dir, 'out.png')
+        lock_path = target + CompileLock.LOCK_SUFFIX
+        old = time.time() - CompileLock.STALE_AFTER - 1
+
+        with mock.patch.object(CompileLock, 'HEARTBEAT_INTERVAL', 0.01):
+            with CompileLock.hold(target):
+                os.utime(lock_path, (old, old))
+                deadline = time.monotonic() + 5
+                while os.path.getmtime(lock_path) <= old + 1 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+
+                self.assertFalse(CompileLock._is_stale(lock_path))
+
+    def test_thread_locks_are_released(self):
+        for index in range(10):
+            with CompileLock.hold(os.path.join(self.test_dir, f'{index}.png')):
+                pass
+
+        self.assertEqual(CompileLock._locks, {})
+
+    def test_concurrent_producers_compile_once(self):
+        info_data = {'Texture': [{'name': 'mask', 'size': {'x': 4, 'y': 4}, 'frames': 1, 'is_mask': True}]}
+        with open(os.path.join(self.test_dir, 'info.yml'), 'w') as file:
+            yaml.dump(info_data, file)
+
+        Image.new('RGBA', (4, 4), (255, 255, 255, 255)).save(os.path.join(self.test_dir, 'mask.png'))
+
+        barrier = threading.Barrier(4)
+        results = []
+
+        def produce():
+            barrier.wait()
+            results.append(TextureSystem.get_image_recolor(self.test_dir, 'mask', Color(255, 0, 0, 255)))
+
+        with mock.patch.object(TextureSystem, '_recolor_array', wraps=TextureSystem._recolor_array) as recolor:
+            threads = [threading.Thread(target=produce) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(recolor.call_count, 1)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(image.getpixel((0, 0)) == (255, 0, 0, 255) for image in results))
+        self.assertFalse(any(name.endswith(('.tmp', '.lock')) for name in os.listdir(self.test_dir)))
+
+
+if __name__ == '__main__':
+    unittest.main()
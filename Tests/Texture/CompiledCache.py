@@ -0,0 +1,168 @@
+import json
+import os
+import shutil
+import time
+import unittest
+from unittest import mock
+
+import yaml
+from DMBotTools import Color
+from PIL import Image
+
+from Code.systems.texture_system import CompiledCache, MemoryCache, TextureSystem
+
+
+class TestCompiledCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.abspath('test_compiled_cache')
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.default_index = CompiledCache._index_path
+        CompiledCache.configure(index_path=os.path.join(self.test_dir, 'index.json'), quota=CompiledCache.DEFAULT_QUOTA, policy='lru')
+        MemoryCache.clear()
+
+    def tearDown(self):
+        CompiledCache.configure(index_path=self.default_index, quota=CompiledCache.DEFAULT_QUOTA, policy='lru')
+        MemoryCache.clear()
+        shutil.rmtree(self.test_dir)
+
+    def _make_file(self, name, size):
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'wb') as file:
+            file.write(b'\0' * size)
+
+        CompiledCache.register(path)
+        return path
+
+    def test_lru_eviction_over_quota(self):
+        CompiledCache.configure(quota=300)
+        first = self._make_file('a.png', 100)
+        second = self._make_file('b.png', 100)
+        third = self._make_file('c.png', 100)
+        time.sleep(0.01)
+        CompiledCache.touch(first)
+
+        self._make_file('d.png', 100)
+
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+        self.assertTrue(os.path.exists(third))
+        self.assertEqual(CompiledCache.stats()['bytes'], 300)
+
+    def test_lfu_gc(self):
+        CompiledCache.configure(policy='lfu')
+        popular = self._make_file('popular.png', 100)
+        rare = self._make_file('rare.png', 100)
+        for _ in range(3):
+            CompiledCache.touch(popular)
+
+        result = CompiledCache.gc(quota=100)
+
+        self.assertEqual(result['removed'], 1)
+        self.assertTrue(os.path.exists(popular))
+        self.assertFalse(os.path.exists(rare))
+
+    def test_gc_drops_missing_and_persists_index(self):
+        kept = self._make_file('kept.png', 10)
+        lost = self._make_file('lost.png', 10)
+        os.remove(lost)
+
+        self.assertEqual(CompiledCache.gc()['missing'], 1)
+
+        CompiledCache.configure(index_path=os.path.join(self.test_dir, 'other.json'))
+        CompiledCache.configure(index_path=os.path.join(self.test_dir, 'index.json'))
+        stats = CompiledCache.stats()
+        self.assertEqual(stats['entries'], 1)
+        self.assertEqual(stats['bytes'], os.path.getsize(kept))
+
+    def test_failed_discard_is_retried_by_gc(self):
+        path = self._make_file('locked.png', 10)
+
+        with mock.patch('os.remove', side_effect=PermissionError("in use")):
+            self.assertFalse(CompiledCache.discard(path))
+
+        self.assertTrue(os.path.exists(path))
+        self.assertTrue(CompiledCache._entries[path]['discarded'])
+
+        result = CompiledCache.gc()
+        self.assertEqual(result['pending'], 0)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(CompiledCache.stats()['entries'], 0)
+        self.assertEqual(CompiledCache.stats()['bytes'], 0)
+
+    def test_evicted_animation_is_reloaded(self):
+        info_data = {'Texture': [{'name': 'walk', 'size': {'x': 4, 'y': 4}, 'frames': 2, 'is_mask': False}]}
+        with open(os.path.join(self.test_dir, 'info.yml'), 'w') as file:
+            yaml.dump(info_data, file)
+
+        Image.new('RGBA', (8, 4), (255, 0, 0, 255)).save(os.path.join(self.test_dir, 'walk.png'))
+        frames = TextureSystem.get_gif(self.test_dir, 'walk')
+        compiled = os.path.join(self.test_dir, 'walk.frames')
+
+        CompiledCache.configure(quota=CompiledCache.stats()['bytes'])
+        self._make_file('other.png', 10)
+        self.assertFalse(os.path.exists(compiled))
+
+        self.assertEqual(frames[1].getpixel((0, 0)), (255, 0, 0, 255))
+        again = TextureSystem.get_gif(self.test_dir, 'walk')
+        self.assertEqual(len(again), 2)
+        self.assertEqual(again[1].getpixel((0, 0)), (255, 0, 0, 255))
+        self.assertTrue(os.path.exists(compiled))
+
+    def test_save_keeps_entries_of_other_processes(self):
+        ours = self._make_file('ours.png', 10)
+        removed = self._make_file('removed.png', 10)
+        CompiledCache.save()
+
+        theirs = os.path.join(self.test_dir, 'theirs.png')
+        with open(theirs, 'wb') as file:
+            file.write(b'\0' * 20)
+
+        index_path = os.path.join(self.test_dir, 'index.json')
+        with open(index_path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+
+        data['files'][theirs] = {'size': 20, 'created': time.time(), 'last_access': time.time(), 'hits': 3}
+        with open(index_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file)
+
+        CompiledCache.discard(removed)
+        CompiledCache.touch(ours)
+        CompiledCache.save()
+
+        CompiledCache.configure(index_path=os.path.join(self.test_dir, 'other.json'))
+        CompiledCache.configure(index_path=index_path)
+        self.assertEqual(sorted(CompiledCache._load()), sorted([ours, theirs]))
+        self.assertEqual(CompiledCache.stats()['bytes'], 30)
+        self.assertEqual(CompiledCache.stats()['hits'], 4)
+
+    def test_touch_does_not_write_index(self):
+        path = self._make_file('hot.png', 10)
+        CompiledCache.save()
+
+        with mock.patch.object(CompiledCache, 'save') as save:
+            for _ in range(CompiledCache.SAVE_EVERY * 2):
+                CompiledCache.touch(path)
+
+        save.assert_not_called()
+
+        CompiledCache.gc()
+        CompiledCache.configure(index_path=os.path.join(self.test_dir, 'other.json'))
+        CompiledCache.configure(index_path=os.path.join(self.test_dir, 'index.json'))
+        self.assertEqual(CompiledCache.stats()['hits'], CompiledCache.SAVE_EVERY * 2)
+
+    def test_texture_system_registers_artifacts(self):
+        info_data = {'Texture': [{'name': 'mask', 'size': {'x': 4, 'y': 4}, 'frames': 1, 'is_mask': True}]}
+        with open(os.path.join(self.test_dir, 'info.yml'), 'w') as file:
+            yaml.dump(info_data, file)
+
+        Image.new('RGBA', (4, 4), (255, 0, 0, 255)).save(os.path.join(self.test_dir, 'mask.png'))
+
+        TextureSystem.get_image_recolor(self.test_dir, 'mask', Color(0, 255, 0, 255))
+        self.assertEqual(CompiledCache.stats()['entries'], 1)
+
+        TextureSystem.get_image_recolor(self.test_dir, 'mask', Color(0, 255, 0, 255))
+        self.assertEqual(CompiledCache.stats()['hits'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from PIL import Image
+
+from Code.systems.texture_system import Compositor, TextureSystem
+
+
+class TestCompositor(unittest.TestCase):
+    def test_matches_merge_images(self):
+        base = Image.new('RGBA', (6, 6), (255, 255, 255, 255))
+        overlay = Image.new('RGBA', (4, 4), (255, 0, 0, 128))
+        expected = TextureSystem.merge_images(base, overlay)
+
+        result, timeline = Compositor.composite_unique([[base], [overlay]], (6, 6), [(0, 0)])
+        self.assertEqual(timeline, [0])
+        self.assertEqual(result[0].tobytes(), expected.tobytes())
+
+    def test_layers_loop_and_share_frames(self):
+        base = Image.new('RGBA', (4, 4), (0, 0, 255, 255))
+        frames = [Image.new('RGBA', (2, 2), (i * 100, 0, 0, 255)) for i in range(2)]
+        indices = Compositor.loop_indices([1, 2], 4)
+
+        result, timeline = Compositor.composite_unique([[base], frames], (4, 4), indices)
+
+        self.assertEqual(len(result), 2)
+        self.assertEqual(timeline, [0, 1, 0, 1])
+        for i, canvas in enumerate(result):
+            self.assertEqual(canvas.getpixel((0, 0)), (i * 100, 0, 0, 255))
+            self.assertEqual(canvas.getpixel((3, 3)), (0, 0, 255, 255))
+
+    def test_transparent_layer_is_skipped(self):
+        base = Image.new('RGBA', (4, 4), (1, 2, 3, 255))
+        empty = Image.new('RGBA', (4, 4), (255, 255, 255, 0))
+        self.assertIsNone(Compositor.alpha_bbox(empty))
+
+        result, _ = Compositor.composite_unique([[base], [empty]], (4, 4), [(0, 0)])
+        self.assertEqual(result[0].tobytes(), base.tobytes())
+
+    def test_offset_layer_is_placed_by_bbox(self):
+        base = Image.new('RGBA', (8, 8), (0, 0, 255, 255))
+        hat = Image.new('RGBA', (4, 4), (0, 0, 0, 0))
+        hat.putpixel((1, 2), (255, 0, 0, 255))
+
+        result, _ = Compositor.composite_unique([[base], [hat]], (8, 8), [(0, 0)], offsets=[(0, 0), (3, 1)], keys=[None, 'hat'])
+
+        expected = base.copy()
+        expected.putpixel((4, 3), (255, 0, 0, 255))
+        self.assertEqual(result[0].tobytes(), expected.tobytes())
+        self.assertEqual(Compositor._bboxes[('hat', 0)], (1, 2, 2, 3))
+        Compositor.clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import shutil
+import time
+import unittest
+from unittest import mock
+
+import yaml
+
+from Code.systems.texture_system import ContentIndex, MetadataIndex
+
+
+class TestContentIndex(unittest.TestCase):
+    def setUp(self):
+        self.root = os.path.abspath('test_content_index')
+        self.index_path = os.path.join(self.root, 'Compiled', 'content_index.json')
+        self._write('Client/mobs', ['walk', 'idle'])
+        self._write('Servers/main/mobs', ['walk'])
+        self.defaults = (ContentIndex._root, ContentIndex._index_path)
+        ContentIndex.configure(root=self.root, index_path=self.index_path)
+        MetadataIndex.invalidate()
+
+    def tearDown(self):
+        ContentIndex.configure(*self.defaults)
+        MetadataIndex.invalidate()
+        shutil.rmtree(self.root)
+
+    def _write(self, relative, states):
+        directory = os.path.join(self.root, relative)
+        os.makedirs(directory, exist_ok=True)
+        textures = [{'name': state, 'size': {'x': 4, 'y': 4}, 'frames': 1, 'is_mask': False} for state in states]
+        with open(os.path.join(directory, 'info.yml'), 'w') as file:
+            yaml.dump({'Texture': textures}, file)
+
+    def test_lookup_across_packs(self):
+        self.assertEqual(ContentIndex.find('walk'), ['Client/mobs/walk', 'Servers/main/mobs/walk'])
+        self.assertEqual(ContentIndex.find('walk', pack='main'), ['Servers/main/mobs/walk'])
+
+        entry = ContentIndex.get('Servers/main/mobs/walk')
+        self.assertEqual(entry['path'], os.path.join(self.root, 'Servers', 'main', 'mobs'))
+        self.assertEqual(entry['sheet'], os.path.join(entry['path'], 'walk.png'))
+        self.assertEqual(entry['info']['size'], {'x': 4, 'y': 4})
+        self.assertIsNone(ContentIndex.get('Servers/main/mobs/idle'))
+
+    def test_persisted_index_is_reused_incrementally(self):
+        ContentIndex.refresh()
+        self.assertTrue(os.path.exists(self.index_path))
+
+        ContentIndex.configure(root=self.root, index_path=self.index_path)
+        with mock.patch.object(MetadataIndex, 'get_textures', wraps=MetadataIndex.get_textures) as parse:
+            self.assertEqual(ContentIndex.states('Client/'), ['Client/mobs/idle', 'Client/mobs/walk'])
+            self.assertEqual(parse.call_count, 0)
+
+            time.sleep(0.01)
+            self._write('Servers/main/mobs', ['walk', 'run'])
+            shutil.rmtree(os.path.join(self.root, 'Client'))
+            stats = ContentIndex.refresh()
+
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(stats, {'dirs': 1, 'parsed': 1, 'removed': 1})
+        self.assertEqual(ContentIndex.states(), ['Servers/main/mobs/run', 'Servers/main/mobs/walk'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import shutil
+import unittest
+
+import numpy as np
+import yaml
+from PIL import Image
+
+from Code.systems.texture_system import FrameStrip, MemoryCache, TextureSystem
+
+
+class TestFrameStrip(unittest.TestCase):
+    def setUp(self):
+        MemoryCache.clear()
+        self.test_dir = 'test_frame_strip'
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.path = os.path.join(self.test_dir, 'walk.frames')
+        rng = np.random.default_rng(1)
+        self.frames = [Image.fromarray(rng.integers(0, 256, size=(12, 20, 4), dtype=np.uint8)) for _ in range(5)]
+
+    def tearDown(self):
+        MemoryCache.clear()
+        shutil.rmtree(self.test_dir)
+
+    def test_round_trip_is_lossless(self):
+        FrameStrip.write(self.path, self.frames, [10, 20, 30, 40, 50])
+        with FrameStrip(self.path) as strip:
+            self.assertEqual(len(strip), 5)
+            self.assertEqual(strip.size, (20, 12))
+            self.assertEqual(strip.durations, [10, 20, 30, 40, 50])
+            for frame, expected in zip(strip, self.frames):
+                self.assertEqual(frame.tobytes(), expected.tobytes())
+
+            np.testing.assert_array_equal(strip.array(-1), np.asarray(self.frames[-1]))
+
+    def test_repeated_frames_are_stored_once(self):
+        frames = [self.frames[0], self.frames[1], self.frames[0].copy(), self.frames[1]]
+        FrameStrip.write(self.path, frames, 40)
+        with FrameStrip(self.path) as strip:
+            self.assertEqual(len(strip), 4)
+            self.assertEqual(strip.unique_count, 2)
+            self.assertEqual(strip.timeline, [0, 1, 0, 1])
+            self.assertEqual(strip.nbytes, 2 * 20 * 12 * 4)
+            self.assertEqual(strip[2].tobytes(), self.frames[0].tobytes())
+
+        self.assertEqual(os.path.getsize(self.path), FrameStrip._aligned(FrameStrip._HEADER.size + 4 + 4 * 4 * 2) + 2 * 20 * 12 * 4)
+
+    def test_frames_are_copy_on_write(self):
+        FrameStrip.write(self.path, self.frames, 40)
+        with FrameStrip(self.path) as strip:
+            frame = strip[0]
+            frame.paste((0, 0, 0, 0), (0, 0, 20, 12))
+            self.assertEqual(strip[0].tobytes(), self.frames[0].tobytes())
+            self.assertFalse(strip.array(0).flags.writeable)
+
+    def test_truncated_file_is_rejected(self):
+        FrameStrip.write(self.path, self.frames, 40)
+        with open(self.path, 'r+b') as file:
+            file.truncate(os.path.getsize(self.path) - 1)
+
+        with self.assertRaises(ValueError):
+            FrameStrip(self.path)
+
+    def test_closing_view_keeps_owner_open(self):
+        FrameStrip.write(self.path, self.frames, 40)
+        with FrameStrip(self.path) as strip:
+            view = strip.view()
+            view.close()
+            with self.assertRaises(ValueError):
+                view.array(0)
+
+            np.testing.assert_array_equal(strip.array(0), np.asarray(self.frames[0]))
+
+    def test_compiled_animation_uses_frame_strip(self):
+        info_data = {'Texture': [{'name': 'walk', 'size': {'x': 20, 'y': 12}, 'frames': 5, 'is_mask': False}]}
+        with open(os.path.join(self.test_dir, 'info.yml'), 'w') as file:
+            yaml.dump(info_data, file)
+
+        sheet = Image.new('RGBA', (100, 12))
+        for index, frame in enumerate(self.frames):
+            sheet.paste(frame, (index * 20, 0))
+
+        sheet.save(os.path.join(self.test_dir, 'walk.png'))
+
+        TextureSystem.get_gif(self.test_dir, 'walk')
+        MemoryCache.clear()
+        frames = TextureSystem.get_gif(self.test_dir, 'walk')
+
+        self.assertIsInstance(frames, FrameStrip)
+        self.assertEqual([frame.tobytes() for frame in frames], [frame.tobytes() for frame in self.frames])
+
+        gif_path = os.path.join(self.test_dir, 'walk.gif')
+        TextureSystem.export_gif(frames, gif_path)
+        with Image.open(gif_path) as gif:
+            self.assertEqual(gif.n_frames, 5)
+
+        frames.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import shutil
+import threading
+import time
+import unittest
+
+import yaml
+from DMBotTools import Color
+from PIL import Image
+
+from Code.systems.texture_system import CompiledCache, ContentIndex, HotReload, MemoryCache, PrefixCache, TextureSystem
+
+
+class TestHotReload(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.abspath('test_hot_reload')
+        self.texture_dir = os.path.join(self.test_dir, 'mobs')
+        os.makedirs(self.texture_dir, exist_ok=True)
+        self.defaults = (CompiledCache._index_path, ContentIndex._root, ContentIndex._index_path)
+        CompiledCache.configure(index_path=os.path.join(self.test_dir, 'index.json'))
+        ContentIndex.configure(root=self.test_dir, index_path=os.path.join(self.test_dir, 'content_index.json'))
+        MemoryCache.clear()
+        PrefixCache.clear()
+
+        textures = [{'name': name, 'size': {'x': 4, 'y': 4}, 'frames': 1, 'is_mask': True} for name in ('body', 'hat', 'eyes')]
+        with open(os.path.join(self.texture_dir, 'info.yml'), 'w') as file:
+            yaml.dump({'Texture': textures}, file)
+
+        for name in ('body', 'hat', 'eyes'):
+            Image.new('RGBA', (4, 4), (255, 255, 255, 255)).save(os.path.join(self.texture_dir, f'{name}.png'))
+
+    def tearDown(self):
+        HotReload.stop()
+        CompiledCache.configure(index_path=self.defaults[0])
+        ContentIndex.configure(root=self.defaults[1], index_path=self.defaults[2])
+        MemoryCache.clear()
+        PrefixCache.clear()
+        shutil.rmtree(self.test_dir)
+
+    def _layers(self, *states):
+        return [{'path': self.texture_dir, 'state': state, 'color': (255, 0, 0, 255)} for state in states]
+
+    def _edit(self, state):
+        time.sleep(0.01)
+        Image.new('RGBA', (4, 4), (128, 128, 128, 255)).save(os.path.join(self.texture_dir, f'{state}.png'))
+
+    def test_only_dependents_are_invalidated(self):
+        color = Color(0, 255, 0, 255)
+        hat = TextureSystem.compiled_path(self.texture_dir, 'hat', color)
+        eyes = TextureSystem.compiled_path(self.texture_dir, 'eyes', color)
+        TextureSystem.get_image_recolor(self.texture_dir, 'hat', color)
+        TextureSystem.get_image_recolor(self.texture_dir, 'eyes', color)
+        with_hat = TextureSystem.merged_path(self.test_dir, self._layers('body', 'hat', 'eyes'))
+        without_hat = TextureSystem.merged_path(self.test_dir, self._layers('body', 'eyes'))
+        TextureSystem.merge_layers(self.test_dir, self._layers('body', 'hat', 'eyes'))
+        TextureSystem.merge_layers(self.test_dir, self._layers('body', 'eyes'))
+        self.assertEqual(HotReload.poll(), [])
+
+        notified = []
+        HotReload.subscribe(lambda sources, paths: notified.append((sources, paths)))
+        try:
+            self._edit('hat')
+            changed = HotReload.poll()
+
+        finally:
+            HotReload._listeners.clear()
+
+        self.assertEqual(changed, [os.path.join(self.texture_dir, 'hat.png')])
+        self.assertFalse(os.path.exists(hat))
+        self.assertFalse(os.path.exists(with_hat))
+        self.assertTrue(os.path.exists(eyes))
+        self.assertTrue(os.path.exists(without_hat))
+        red_hat = TextureSystem.compiled_path(self.texture_dir, 'hat', Color(255, 0, 0, 255))
+        self.assertEqual(notified[0][1], sorted([hat, red_hat, with_hat]))
+        self.assertIsNone(MemoryCache.get(MemoryCache.make_key(self.texture_dir, 'hat', color, 'png')))
+        self.assertEqual(PrefixCache.stats()['entries'], 0)
+
+        recolored = TextureSystem.get_image_recolor(self.texture_dir, 'hat', color)
+        self.assertEqual(recolored.getpixel((0, 0)), (0, 128, 0, 255))
+
+    def test_listener_runs_on_its_event_loop(self):
+        TextureSystem.get_image_recolor(self.texture_dir, 'hat', Color(0, 255, 0, 255))
+        self._edit('hat')
+
+        async def watch():
+            loop = asyncio.get_running_loop()
+            notified = loop.create_future()
+            HotReload.subscribe(lambda sources, paths: notified.set_result(threading.current_thread()), loop)
+            await loop.run_in_executor(None, HotReload.poll)
+            return await asyncio.wait_for(notified, 5)
+
+        try:
+            self.assertIs(asyncio.run(watch()), threading.main_thread())
+
+        finally:
+            HotReload._listeners.clear()
+
+    def test_background_rebuild(self):
+        color = Color(0, 0, 255, 255)
+        path = TextureSystem.compiled_path(self.texture_dir, 'hat', color)
+        TextureSystem.get_image_recolor(self.texture_dir, 'hat', color)
+        self._edit('hat')
+
+        HotReload.poll(rebuild=True)
+        deadline = time.monotonic() + 5
+        while not os.path.exists(path) and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        TextureSystem._get_executor().submit(lambda: None).result()
+        with Image.open(path) as image:
+            self.assertEqual(image.getpixel((0, 0)), (0, 0, 128, 255))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import shutil
+import unittest
+from unittest import mock
+
+import yaml
+from PIL import Image
+
+from Code.systems.texture_system import texture_system
+from Code.systems.texture_system import MemoryCache, TextureSystem
+
+
+class TestMemoryCache(unittest.TestCase):
+    def setUp(self):
+        MemoryCache.clear()
+        self.test_dir = 'test_memory_cache'
+        os.makedirs(self.test_dir, exist_ok=True)
+
+        info_data = {'Texture': [{'name': 'walk', 'size': {'x': 16, 'y': 16}, 'frames': 4, 'is_mask': False}]}
+        with open(os.path.join(self.test_dir, 'info.yml'), 'w') as file:
+            yaml.dump(info_data, file)
+
+        Image.new('RGBA', (64, 16), (10, 20, 30, 255)).save(os.path.join(self.test_dir, 'walk.png'))
+
+    def tearDown(self):
+        MemoryCache.set_budget(MemoryCache.DEFAULT_BUDGET)
+        MemoryCache.clear()
+        shutil.rmtree(self.test_dir)
+
+    def test_lru_eviction_by_budget(self):
+        frame_bytes = 10 * 10 * 4
+        MemoryCache.set_budget(frame_bytes * 2)
+
+        MemoryCache.put('a', Image.new('RGBA', (10, 10)))
+        MemoryCache.put('b', Image.new('RGBA', (10, 10)))
+        self.assertIsNotNone(MemoryCache.get('a'))
+        MemoryCache.put('c', Image.new('RGBA', (10, 10)))
+
+        self.assertIsNone(MemoryCache.get('b'))
+        self.assertIsNotNone(MemoryCache.get('a'))
+        self.assertIsNotNone(MemoryCache.get('c'))
+        self.assertEqual(MemoryCache.stats()['bytes'], frame_bytes * 2)
+
+    def test_oversized_value_is_not_stored(self):
+        MemoryCache.set_budget(100)
+        MemoryCache.put('big', [Image.new('RGBA', (10, 10))])
+        self.assertIsNone(MemoryCache.get('big'))
+        self.assertEqual(MemoryCache.stats()['entries'], 0)
+
+    def test_counters(self):
+        MemoryCache.get('missing')
+        MemoryCache.put('key', Image.new('RGBA', (1, 1)))
+        MemoryCache.get('key')
+        stats = MemoryCache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_stale_version_is_dropped(self):
+        MemoryCache.put('key', Image.new('RGBA', (10, 10)), version=1)
+        self.assertIsNone(MemoryCache.get('key', version=2))
+        self.assertEqual(MemoryCache.stats()['entries'], 0)
+        self.assertEqual(MemoryCache.stats()['bytes'], 0)
+
+    def test_repeated_gif_does_not_touch_disk(self):
+        first = TextureSystem.get_gif(self.test_dir, 'walk')
+
+        with mock.patch.object(texture_system.Image, 'open', side_effect=AssertionError("disk access")):
+            second = TextureSystem.get_gif(self.test_dir, 'walk')
+
+        self.assertEqual(len(second), len(first))
+        self.assertIsNot(second[0], first[0])
+        self.assertEqual(second[0].tobytes(), first[0].tobytes())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import shutil
+import unittest
+from unittest import mock
+
+import yaml
+
+from Code.systems.texture_system import metadata_index
+from Code.systems.texture_system import MetadataIndex, TextureSystem
+
+
+class TestMetadataIndex(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = 'test_metadata_index'
+        os.makedirs(self.test_dir, exist_ok=True)
+        self._write_info(10)
+        MetadataIndex.invalidate()
+
+    def tearDown(self):
+        MetadataIndex.invalidate()
+        shutil.rmtree(self.test_dir)
+
+    def _write_info(self, size):
+        info_data = {
+            'Texture': [
+                {'name': 'body', 'size': {'x': size, 'y': size}, 'frames': 1, 'is_mask': False},
+                {'name': 'eyes', 'size': {'x': 8, 'y': 8}, 'frames': 4, 'is_mask': True}
+            ]
+        }
+        with open(os.path.join(self.test_dir, 'info.yml'), 'w') as file:
+            yaml.dump(info_data, file)
+
+    def test_parses_info_once(self):
+        with mock.patch.object(metadata_index.yaml, 'safe_load', wraps=yaml.safe_load) as safe_load:
+            for _ in range(5):
+                TextureSystem.get_state_info(self.test_dir, 'body')
+                TextureSystem.get_state_info(self.test_dir, 'eyes')
+                TextureSystem.get_textures(self.test_dir)
+
+        self.assertEqual(safe_load.call_count, 1)
+
+    def test_edited_info_is_picked_up(self):
+        self.assertEqual(TextureSystem.get_state_info(self.test_dir, 'body'), (10, 10, 1, False))
+
+        self._write_info(1000)
+        info_path = os.path.join(self.test_dir, 'info.yml')
+        stat = os.stat(info_path)
+        os.utime(info_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        self.assertEqual(TextureSystem.get_state_info(self.test_dir, 'body'), (1000, 1000, 1, False))
+
+    def test_get_textures_returns_copy(self):
+        textures = TextureSystem.get_textures(self.test_dir)
+        textures[0]['size']['x'] = 1
+        self.assertEqual(TextureSystem.get_state_info(self.test_dir, 'body')[0], 10)
+
+    def test_missing_state(self):
+        self.assertIsNone(MetadataIndex.get_sprite(self.test_dir, 'missing'))
+        with self.assertRaises(ValueError):
+            TextureSystem.get_state_info(self.test_dir, 'missing')
+
+    def test_find_texture_dirs(self):
+        nested = os.path.join(self.test_dir, 'mobs', 'cat')
+        os.makedirs(nested)
+        with open(os.path.join(nested, 'info.yml'), 'w') as file:
+            yaml.dump({'Texture': []}, file)
+
+        self.assertEqual(MetadataIndex.find_texture_dirs(self.test_dir), [self.test_dir])
+        self.assertEqual(MetadataIndex.find_texture_dirs(os.path.join(self.test_dir, 'mobs')), [nested])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import shutil
+import unittest
+
+import numpy as np
+import yaml
+from PIL import Image
+
+from Code.systems.texture_system import Compositor, MemoryCache, PrefixCache, TextureSystem
+
+
+class TestPrefixCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.abspath('test_prefix_cache')
+        os.makedirs(self.test_dir, exist_ok=True)
+        MemoryCache.clear()
+        PrefixCache.clear()
+
+        rng = np.random.default_rng(1)
+        textures = []
+        for name, (width, height), frames, is_mask in [
+            ('body', (12, 12), 1, False),
+            ('skin', (12, 12), 3, True),
+            ('shirt', (10, 8), 2, False),
+            ('hat', (6, 4), 1, True),
+        ]:
+            textures.append({'name': name, 'size': {'x': width, 'y': height}, 'frames': frames, 'is_mask': is_mask})
+            pixels = rng.integers(0, 256, size=(height, width * frames, 4), dtype=np.uint8)
+            pixels[..., 3] = np.where(rng.random((height, width * frames)) < 0.5, 0, pixels[..., 3])
+            Image.fromarray(pixels).save(os.path.join(self.test_dir, f'{name}.png'))
+
+        with open(os.path.join(self.test_dir, 'info.yml'), 'w') as file:
+            yaml.dump({'Texture': textures}, file)
+
+    def tearDown(self):
+        MemoryCache.clear()
+        PrefixCache.clear()
+        PrefixCache.set_budget(PrefixCache.DEFAULT_BUDGET)
+        shutil.rmtree(self.test_dir)
+
+    def _layers(self, hat_color):
+        return [
+            {'path': self.test_dir, 'state': 'body'},
+            {'path': self.test_dir, 'state': 'skin', 'color': (200, 150, 100, 255)},
+            {'path': self.test_dir, 'state': 'shirt', 'offset': [3, 5]},
+            {'path': self.test_dir, 'state': 'hat', 'color': hat_color, 'offset': [4, 0]},
+        ]
+
+    def _direct(self, layers, frame_count):
+        frames = [TextureSystem._layer_frames(layer) for layer in layers]
+        offsets = [tuple(layer.get('offset', (0, 0))) for layer in layers]
+        indices = Compositor.loop_indices([len(layer_frames) for layer_frames in frames], frame_count)
+        unique, timeline = Compositor.composite_unique(frames, (13, 13), indices, offsets)
+        return [unique[index].tobytes() for index in timeline]
+
+    def test_reused_prefix_matches_full_composite(self):
+        first = self._layers((255, 0, 0, 255))
+        second = self._layers((0, 0, 255, 255))
+
+        TextureSystem._composite_layers(first, [tuple(layer.get('offset', (0, 0))) for layer in first], (13, 13), 6)
+        unique, timeline = TextureSystem._composite_layers(second, [tuple(layer.get('offset', (0, 0))) for layer in second], (13, 13), 6)
+
+        stats = PrefixCache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['reused_layers'], 3)
+        self.assertEqual([unique[index].tobytes() for index in timeline], self._direct(second, 6))
+
+    def test_eviction_prunes_trie(self):
+        frame = Image.new('RGBA', (8, 8))
+        PrefixCache.set_budget(MemoryCache.sizeof([frame]) * 2)
+        PrefixCache.put(['a', 'b'], [frame], [0])
+        PrefixCache.put(['a', 'c'], [frame], [0])
+        PrefixCache.put(['d'], [frame], [0])
+
+        self.assertEqual(PrefixCache.longest(['a', 'b']), (0, None, None))
+        self.assertEqual(PrefixCache.longest(['a', 'c', 'e'])[0], 2)
+        self.assertNotIn('b', PrefixCache._root['children']['a']['children'])
+        self.assertEqual(PrefixCache.stats()['entries'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
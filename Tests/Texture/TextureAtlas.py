@@ -0,0 +1,82 @@
+import os
+import shutil
+import unittest
+
+import yaml
+from PIL import Image
+
+from Code.systems.texture_system import MemoryCache, TextureAtlas, TextureSystem
+
+
+class TestTextureAtlas(unittest.TestCase):
+    def setUp(self):
+        MemoryCache.clear()
+        self.test_dir = 'test_atlas'
+        self.pack_dir = os.path.join(self.test_dir, 'pack')
+        self.output_dir = os.path.join(self.test_dir, 'out')
+
+        for sub_dir, states in [
+            ('mobs', [('walk', 16, 16, 5), ('idle', 24, 8, 1)]),
+            (os.path.join('items', 'hat'), [('hat', 40, 40, 2)])
+        ]:
+            texture_dir = os.path.join(self.pack_dir, sub_dir)
+            os.makedirs(texture_dir, exist_ok=True)
+            info_data = {'Texture': [
+                {'name': name, 'size': {'x': width, 'y': height}, 'frames': frames, 'is_mask': False}
+                for name, width, height, frames in states
+            ]}
+            with open(os.path.join(texture_dir, 'info.yml'), 'w') as file:
+                yaml.dump(info_data, file)
+
+            for name, width, height, frames in states:
+                sheet = Image.new('RGBA', (width * frames, height))
+                for i in range(frames):
+                    sheet.paste(Image.new('RGBA', (width, height), (i * 40, len(name) * 20, width, 255)), (i * width, 0))
+
+                sheet.save(os.path.join(texture_dir, f'{name}.png'))
+
+    def tearDown(self):
+        MemoryCache.clear()
+        shutil.rmtree(self.test_dir)
+
+    def test_frames_round_trip(self):
+        TextureAtlas.build(self.pack_dir, self.output_dir, max_size=64)
+        atlas = TextureAtlas.load(self.output_dir)
+
+        self.assertEqual(set(atlas.states), {'mobs/walk', 'mobs/idle', 'items/hat/hat'})
+        for page_width, page_height in atlas.pages:
+            self.assertLessEqual(page_width, 64)
+            self.assertLessEqual(page_height, 64)
+
+        walk_frames = TextureSystem._slice_image(TextureSystem.get_image(os.path.join(self.pack_dir, 'mobs'), 'walk'), 16, 16, 5)
+        self.assertEqual(atlas.frame_count('mobs/walk'), 5)
+        for index, frame in enumerate(walk_frames):
+            self.assertEqual(atlas.get_frame('mobs/walk', index).tobytes(), frame.tobytes())
+
+    def test_uv_and_no_overlap(self):
+        atlas = TextureAtlas.build(self.pack_dir, self.output_dir, max_size=64)
+        rects = []
+        for state, info in atlas.states.items():
+            for index in range(len(info['frames'])):
+                page, (u0, v0, u1, v1) = atlas.get_uv(state, index)
+                self.assertTrue(0 <= u0 < u1 <= 1 and 0 <= v0 < v1 <= 1)
+                rects.append(atlas.get_rect(state, index))
+
+        for i, (page_a, xa, ya, wa, ha) in enumerate(rects):
+            for page_b, xb, yb, wb, hb in rects[i + 1:]:
+                if page_a == page_b:
+                    self.assertTrue(xa + wa <= xb or xb + wb <= xa or ya + ha <= yb or yb + hb <= ya)
+
+    def test_oversized_frame_keeps_current_page(self):
+        placements, pages = TextureAtlas._pack([(10, 10), (100, 5), (10, 4)], 64, 1)
+        self.assertEqual(placements, [(0, 0, 0), (1, 0, 0), (0, 11, 0)])
+        self.assertEqual(pages, [(21, 10), (100, 5)])
+
+    def test_single_texture_dir_uses_state_names(self):
+        atlas = TextureAtlas.build(os.path.join(self.pack_dir, 'mobs'), self.output_dir)
+        self.assertEqual(set(atlas.states), {'walk', 'idle'})
+        self.assertEqual(len(atlas.pages), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import shutil
+import unittest
+
+import yaml
+from DMBotTools import Color
+from PIL import Image
+
+from Code.systems.texture_system import MemoryCache, MetadataIndex, TextureMetrics, TextureSystem
+
+
+class TestTextureMetrics(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = os.path.abspath('test_texture_metrics')
+        os.makedirs(self.test_dir, exist_ok=True)
+        MemoryCache.clear()
+        MetadataIndex.invalidate()
+        TextureMetrics.reset()
+
+        info_data = {'Texture': [{'name': 'mask', 'size': {'x': 4, 'y': 4}, 'frames': 1, 'is_mask': True}]}
+        with open(os.path.join(self.test_dir, 'info.yml'), 'w') as file:
+            yaml.dump(info_data, file)
+
+        Image.new('RGBA', (4, 4), (255, 255, 255, 255)).save(os.path.join(self.test_dir, 'mask.png'))
+
+    def tearDown(self):
+        MemoryCache.clear()
+        TextureMetrics.reset()
+        TextureMetrics.enabled = True
+        shutil.rmtree(self.test_dir)
+
+    def test_recolor_miss_then_hits(self):
+        color = Color(255, 0, 0, 255)
+        TextureSystem.get_image_recolor(self.test_dir, 'mask', color)
+        TextureSystem.get_image_recolor(self.test_dir, 'mask', color)
+        MemoryCache.clear()
+        TextureSystem.get_image_recolor(self.test_dir, 'mask', color)
+
+        stats = TextureSystem.stats()
+        counters = stats['counters']
+        self.assertEqual(counters['compiled_memory_hits'], 1)
+        self.assertEqual(counters['compiled_disk_hits'], 1)
+        self.assertGreaterEqual(counters['compiled_misses'], 1)
+        self.assertGreater(counters['bytes_written'], 0)
+        self.assertGreater(counters['bytes_read'], 0)
+
+        for stage in ('decode', 'recolor', 'encode', 'lock_wait'):
+            self.assertIn(stage, stats['stages'])
+
+        recolor = stats['stages']['recolor']
+        self.assertEqual(recolor['count'], 1)
+        self.assertEqual(sum(recolor['histogram'].values()), 1)
+        self.assertIn('memory_cache', stats)
+        self.assertIn('compiled_cache', stats)
+
+    def test_disabled_records_nothing(self):
+        TextureMetrics.enabled = False
+        TextureSystem.get_image_recolor(self.test_dir, 'mask', Color(0, 255, 0, 255))
+        self.assertEqual(TextureMetrics.snapshot(), {'counters': {}, 'stages': {}})
+
+
+if __name__ == '__main__':
+    unittest.main()
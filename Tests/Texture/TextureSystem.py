@@ -1,21 +1,25 @@
-import hashlib
+import asyncio
 import os
-import pickle
 import shutil
+import threading
 import unittest
+from concurrent.futures import CancelledError
+from unittest import mock
 
+import numpy as np
 import yaml
 from DMBotTools import Color
 from PIL import Image
 
 from Code.root_path import ROOT_PATH
-from Code.systems.texture_system import TextureSystem
+from Code.systems.texture_system import FrameStrip, MemoryCache, TextureSystem
 
 
 class TestTextureSystem(unittest.TestCase):
     def setUp(self):
         self.test_dir = 'test_texture'
         os.makedirs(self.test_dir, exist_ok=True)
+        MemoryCache.clear()
 
         info_data = {
             'Texture': [
@@ -61,12 +65,58 @@ class TestTextureSystem(unittest.TestCase):
             image.save(os.path.join(self.test_dir, f'{state}.png'))
 
     def tearDown(self):
+        MemoryCache.clear()
         shutil.rmtree(self.test_dir)
 
     def test_get_hash_list(self):
         layers = [{'layer1': 'data1'}, {'layer2': 'data2'}]
-        expected_hash = hashlib.sha256(pickle.dumps(layers)).hexdigest()
-        self.assertEqual(TextureSystem._get_hash_list(layers), expected_hash)
+        self.assertEqual(TextureSystem._get_hash_list(layers), TextureSystem._get_hash_list([dict(layer) for layer in layers]))
+        self.assertNotEqual(TextureSystem._get_hash_list(layers), TextureSystem._get_hash_list(layers[::-1]))
+
+    def test_get_hash_list_is_canonical(self):
+        layers = [
+            {'path': self.test_dir, 'state': 'state1', 'color': (255, 0, 0, 255)},
+            {'path': self.test_dir, 'state': 'state3', 'color': (0, 255, 0, 255)}
+        ]
+        reordered = [
+            {'color': Color(255, 0, 0, 255), 'state': 'state1', 'path': os.path.abspath(self.test_dir)},
+            {'color': Color(0, 255, 0, 255), 'state': 'state3', 'path': self.test_dir}
+        ]
+        self.assertEqual(TextureSystem._get_hash_list(layers), TextureSystem._get_hash_list(reordered))
+
+        # Цвет не влияет на слой без маски
+        recolored = [dict(layers[0], color=(1, 2, 3, 4)), layers[1]]
+        self.assertEqual(TextureSystem._get_hash_list(layers), TextureSystem._get_hash_list(recolored))
+
+        recolored = [layers[0], dict(layers[1], color=(1, 2, 3, 4))]
+        self.assertNotEqual(TextureSystem._get_hash_list(layers), TextureSystem._get_hash_list(recolored))
+
+    def test_get_hash_list_tracks_sources(self):
+        layers = [{'path': self.test_dir, 'state': 'state1', 'color': (255, 0, 0, 255)}]
+        before = TextureSystem._get_hash_list(layers)
+
+        Image.new('RGBA', (100, 100), 'black').save(os.path.join(self.test_dir, 'state1.png'))
+        sheet_path = os.path.join(self.test_dir, 'state1.png')
+        stat = os.stat(sheet_path)
+        os.utime(sheet_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        self.assertNotEqual(TextureSystem._get_hash_list(layers), before)
+
+    def test_recolor_is_rebuilt_after_source_edit(self):
+        color = Color(255, 255, 255, 255)
+        before = TextureSystem.get_image_recolor(self.test_dir, 'state3', color)
+        self.assertEqual(before.getpixel((0, 0)), (0, 0, 0, 255))
+
+        sheet_path = os.path.join(self.test_dir, 'state3.png')
+        Image.new('RGBA', (200, 200), (255, 0, 0, 255)).save(sheet_path)
+        stat = os.stat(sheet_path)
+        os.utime(sheet_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        after = TextureSystem.get_image_recolor(self.test_dir, 'state3', color)
+        self.assertEqual(after.getpixel((0, 0)), (255, 255, 255, 255))
+
+        MemoryCache.clear()
+        self.assertEqual(TextureSystem.get_image_recolor(self.test_dir, 'state3', color).getpixel((0, 0)), (255, 255, 255, 255))
 
     def test_slice_image(self):
         image = Image.new('RGBA', (450, 150), 'white')
@@ -75,6 +125,20 @@ class TestTextureSystem(unittest.TestCase):
         for frame in frames:
             self.assertEqual(frame.size, (150, 150))
 
+    def test_slice_image_matches_crop(self):
+        rng = np.random.default_rng(3)
+        image = Image.fromarray(rng.integers(0, 256, size=(20, 25, 4), dtype=np.uint8))
+        frames = TextureSystem._slice_image(image, 10, 10, 5)
+        for i, frame in enumerate(frames):
+            box = ((i * 10) % 25, ((i * 10) // 25) * 10)
+            expected = image.crop((box[0], box[1], box[0] + 10, box[1] + 10))
+            self.assertEqual(frame.tobytes(), expected.tobytes())
+
+    def test_frame_views_share_sheet_memory(self):
+        pixels = np.zeros((10, 30, 4), dtype=np.uint8)
+        views = TextureSystem._frame_views(pixels, 10, 10, 3)
+        self.assertTrue(all(np.shares_memory(view, pixels) for view in views))
+
     def test_get_textures(self):
         textures = TextureSystem.get_textures(self.test_dir)
         expected_textures = [
@@ -141,6 +205,49 @@ class TestTextureSystem(unittest.TestCase):
         self.assertTrue(os.path.exists(expected_path))
         self.assertEqual(image.size, (100, 100))
 
+    def test_recolor_array_matches_pixel_formula(self):
+        rng = np.random.default_rng(0)
+        pixels = rng.integers(0, 256, size=(64, 64, 4), dtype=np.uint8)
+        pixels[::3, ::2, 3] = 0
+        color = Color(200, 17, 255, 255)
+
+        expected = [
+            (
+                int(pixel[0] * color.r / 255),
+                int(pixel[0] * color.g / 255),
+                int(pixel[0] * color.b / 255),
+                pixel[3]
+            ) if pixel[3] != 0 else pixel
+            for pixel in map(tuple, pixels.reshape(-1, 4).tolist())
+        ]
+        result = TextureSystem._recolor_array(pixels, color)
+        self.assertEqual(list(map(tuple, result.reshape(-1, 4).tolist())), expected)
+
+    def test_get_image_recolor_many_matches_single(self):
+        colors = [Color(255, 0, 0, 255), Color(10, 200, 30, 255), Color(255, 0, 0, 255)]
+        images = TextureSystem.get_image_recolor_many(self.test_dir, 'state3', colors)
+
+        self.assertEqual(len(images), 3)
+        self.assertIsNot(images[0], images[2])
+        for color, image in zip(colors, images):
+            self.assertTrue(os.path.exists(os.path.join(self.test_dir, f'state3_compiled_{color}.png')))
+            MemoryCache.clear()
+            expected = TextureSystem.get_image_recolor(self.test_dir, 'state3', color)
+            self.assertEqual(image.tobytes(), expected.tobytes())
+
+    def test_get_gif_recolor_many(self):
+        colors = [Color(255, 0, 0, 255), Color(0, 0, 255, 255)]
+        animations = TextureSystem.get_gif_recolor_many(self.test_dir, 'state4', colors)
+
+        self.assertEqual(len(animations), 2)
+        for color, frames in zip(colors, animations):
+            self.assertTrue(os.path.exists(os.path.join(self.test_dir, f'state4_compiled_{color}.frames')))
+            self.assertEqual(len(frames), 3)
+            self.assertEqual(frames[1].size, (250, 250))
+
+        self.assertEqual(animations[1][0].getpixel((0, 0)), (0, 0, 0, 255))
+        self.assertEqual(animations[0][2].getpixel((0, 0)), (170, 0, 0, 255))
+
     def test_get_image(self):
         path = self.test_dir
         state = 'state1'
@@ -155,7 +262,7 @@ class TestTextureSystem(unittest.TestCase):
         state = 'state2'
         color = Color(255, 0, 0, 255)
         gif_frames = TextureSystem.get_gif_recolor(path, state, color)
-        expected_path = os.path.join(path, f'{state}_compiled_255_0_0_255.gif')
+        expected_path = os.path.join(path, f'{state}_compiled_255_0_0_255.frames')
         self.assertTrue(os.path.exists(expected_path))
         self.assertGreater(len(gif_frames), 0)
         for frame in gif_frames:
@@ -165,12 +272,97 @@ class TestTextureSystem(unittest.TestCase):
         path = self.test_dir
         state = 'state2'
         gif_frames = TextureSystem.get_gif(path, state)
-        expected_path = os.path.join(path, f'{state}.gif')
+        expected_path = os.path.join(path, f'{state}.frames')
         self.assertTrue(os.path.exists(expected_path))
         self.assertGreater(len(gif_frames), 0)
         for frame in gif_frames:
             self.assertEqual(frame.size, (150, 150))
 
+    def test_closing_returned_gif_keeps_cache_usable(self):
+        first = TextureSystem.get_gif(self.test_dir, 'state2')
+        first.close()
+
+        second = TextureSystem.get_gif(self.test_dir, 'state2')
+        self.assertEqual(second[0].size, (150, 150))
+        self.assertEqual(MemoryCache.stats()['hits'], 1)
+
+    def test_recompile_replaces_cached_strip(self):
+        first = TextureSystem.get_gif(self.test_dir, 'state2')
+        owner = first._owner
+        entries = MemoryCache.stats()['entries']
+
+        sheet_path = os.path.join(self.test_dir, 'state2.png')
+        stat = os.stat(sheet_path)
+        os.utime(sheet_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        second = TextureSystem.get_gif(self.test_dir, 'state2')
+        self.assertIsNot(second._owner, owner)
+        self.assertEqual(second[0].size, (150, 150))
+        self.assertEqual(first[0].size, (150, 150))
+        self.assertEqual(MemoryCache.stats()['entries'], entries)
+
+    def test_get_scaled(self):
+        rng = np.random.default_rng(5)
+        Image.fromarray(rng.integers(0, 256, size=(100, 100, 4), dtype=np.uint8)).save(os.path.join(self.test_dir, 'state1.png'))
+        source = TextureSystem.get_image(self.test_dir, 'state1')
+
+        scaled = TextureSystem.get_scaled(self.test_dir, 'state1', 2)
+        self.assertEqual(scaled.tobytes(), source.resize((200, 200), Image.Resampling.NEAREST).tobytes())
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, 'state1_compiled_x2.png')))
+
+        fractional = TextureSystem.get_scaled(self.test_dir, 'state1', 0.5)
+        self.assertEqual(fractional.tobytes(), source.resize((50, 50), Image.Resampling.NEAREST).tobytes())
+
+        MemoryCache.clear()
+        self.assertEqual(TextureSystem.get_scaled(self.test_dir, 'state1', 2).tobytes(), scaled.tobytes())
+
+    def test_get_scaled_gif_keeps_timing(self):
+        color = Color(255, 0, 0, 255)
+        frames = TextureSystem.get_scaled(self.test_dir, 'state4', 1.5, color)
+        source = TextureSystem.get_gif_recolor(self.test_dir, 'state4', color)
+        self.assertEqual(len(frames), len(source))
+        self.assertEqual(frames.durations, list(source.durations))
+        self.assertEqual(frames[1].size, (375, 375))
+        self.assertTrue(os.path.exists(os.path.join(self.test_dir, f'state4_compiled_{color}_x1.5.frames')))
+
+    def test_merge_layers_scaled(self):
+        layers = [
+            {'path': self.test_dir, 'state': 'state2'},
+            {'path': self.test_dir, 'state': 'state1', 'offset': [10, 0]},
+        ]
+        merged = TextureSystem.merge_layers(ROOT_PATH, layers)
+        scaled = TextureSystem.merge_layers_scaled(ROOT_PATH, layers, 3)
+        self.assertEqual(len(scaled), len(merged))
+        for frame, source in zip(scaled, merged):
+            self.assertEqual(frame.tobytes(), source.resize((source.width * 3, source.height * 3), Image.Resampling.NEAREST).tobytes())
+
+    def test_close_scales_get_separate_files(self):
+        compiled = TextureSystem.compiled_path(self.test_dir, 'state1')
+        self.assertNotEqual(TextureSystem.scaled_path(compiled, 1.0000001), TextureSystem.scaled_path(compiled, 1.0000002))
+        self.assertTrue(TextureSystem.scaled_path(compiled, 2).endswith('_x2.png'))
+
+    def test_scale_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            TextureSystem.get_scaled(self.test_dir, 'state1', 0)
+
+    def test_frame_stack(self):
+        color = Color(255, 0, 0, 255)
+        mask = TextureSystem.get_frame_stack(self.test_dir, 'state4')
+        self.assertEqual(mask.array.shape, (3, 250, 250, 4))
+        self.assertTrue(mask.array.flags['C_CONTIGUOUS'])
+        self.assertEqual(mask.durations, [1000 // TextureSystem.DEFAULT_FPS] * 3)
+
+        recolored = TextureSystem.recolor_frames(mask, color)
+        expected = TextureSystem.get_gif_recolor(self.test_dir, 'state4', color)
+        for frame, image in zip(recolored, expected):
+            self.assertEqual(frame.tobytes(), image.tobytes())
+
+        self.assertTrue(np.shares_memory(np.asarray(recolored.frame_array(1)), recolored.array))
+        images = recolored.to_images()
+        images[0].putpixel((0, 0), (1, 2, 3, 4))
+        self.assertNotEqual(recolored[0].getpixel((0, 0)), (1, 2, 3, 4))
+        self.assertEqual(TextureSystem.get_frame_stack(self.test_dir, 'state1').array.shape, (1, 100, 100, 4))
+
     def test_merge_images(self):
         background = Image.new('RGBA', (300, 300), (255, 255, 255, 255))
         overlay = Image.new('RGBA', (100, 100), (255, 0, 0, 128))
@@ -199,13 +391,132 @@ class TestTextureSystem(unittest.TestCase):
             {'path': self.test_dir, 'state': 'state2', 'color': (255, 0, 0, 255)},
             {'path': self.test_dir, 'state': 'state4', 'color': (0, 255, 0, 255)}
         ]
-        result_gif = TextureSystem.merge_layers(ROOT_PATH, layers)
-        self.assertIsNotNone(result_gif)
-        self.assertTrue(isinstance(result_gif, list))
-        self.assertGreater(len(result_gif), 0)
-        for frame in result_gif:
+        cold = TextureSystem.merge_layers(ROOT_PATH, layers)
+        warm = TextureSystem.merge_layers(ROOT_PATH, layers)
+        MemoryCache.clear()
+        from_disk = TextureSystem.merge_layers(ROOT_PATH, layers)
+
+        for result_gif in (cold, warm, from_disk):
+            self.assertIsInstance(result_gif, FrameStrip)
+            self.assertEqual(result_gif.size, (250, 250))
+            self.assertEqual(len(result_gif), 3)
+            self.assertEqual(result_gif.unique_count, 3)
+            for frame in result_gif:
+                self.assertEqual(frame.size, (250, 250))
+
+        self.assertEqual([frame.tobytes() for frame in warm], [frame.tobytes() for frame in cold])
+
+    def test_merge_layers_offset_extends_canvas(self):
+        layers = [
+            {'path': self.test_dir, 'state': 'state1'},
+            {'path': self.test_dir, 'state': 'state3', 'color': (0, 255, 0, 255), 'offset': [20, 10]}
+        ]
+        result = TextureSystem.merge_layers(ROOT_PATH, layers)
+
+        self.assertEqual(result.size, (220, 210))
+        self.assertEqual(result.getpixel((5, 5)), (0, 255, 0, 255))
+        self.assertEqual(result.getpixel((25, 15)), (0, 0, 0, 255))  # Красный канал маски равен нулю
+        self.assertEqual(result.getpixel((110, 5)), (0, 0, 0, 0))
+        os.remove(TextureSystem.merged_path(ROOT_PATH, layers))
+
+    def test_merge_layers_keeps_static_base_in_every_frame(self):
+        layers = [
+            {'path': self.test_dir, 'state': 'state3', 'color': (0, 0, 255, 255)},
+            {'path': self.test_dir, 'state': 'state2', 'color': (255, 0, 0, 255)}
+        ]
+        result = TextureSystem.merge_layers(ROOT_PATH, layers)
+
+        self.assertEqual(len(result), 3)
+        for frame in result:
+            self.assertEqual(frame.size, (200, 200))
+            self.assertEqual(frame.getpixel((199, 199)), (0, 0, 0, 255))
+
+    def test_merge_layers_loops_on_lcm(self):
+        info_data = {'Texture': [
+            {'name': 'two', 'size': {'x': 4, 'y': 4}, 'frames': 2, 'is_mask': False},
+            {'name': 'three', 'size': {'x': 4, 'y': 4}, 'frames': 3, 'is_mask': False},
+        ]}
+        loop_dir = os.path.join(self.test_dir, 'loop')
+        os.makedirs(loop_dir)
+        with open(os.path.join(loop_dir, 'info.yml'), 'w') as file:
+            yaml.dump(info_data, file)
+
+        two = Image.new('RGBA', (8, 4), (0, 0, 0, 255))
+        two.paste((0, 0, 0, 0), (4, 0, 8, 4))
+        two.save(os.path.join(loop_dir, 'two.png'))
+        three = Image.new('RGBA', (12, 4), (0, 0, 0, 0))
+        three.paste((255, 0, 0, 255), (0, 0, 1, 1))
+        three.save(os.path.join(loop_dir, 'three.png'))
+
+        layers = [{'path': loop_dir, 'state': 'two'}, {'path': loop_dir, 'state': 'three'}]
+        result = TextureSystem.merge_layers(ROOT_PATH, layers)
+
+        self.assertEqual(len(result), 6)
+        self.assertEqual([frame.getpixel((0, 0)) for frame in result], [
+            (255, 0, 0, 255), (0, 0, 0, 0), (0, 0, 0, 255), (255, 0, 0, 255), (0, 0, 0, 255), (0, 0, 0, 0)
+        ])
+
+        MemoryCache.clear()
+        strip = TextureSystem.merge_layers(ROOT_PATH, layers)
+        # Второй и шестой кадры совпадают, как и третий с пятым
+        self.assertEqual(strip.unique_count, 4)
+        self.assertEqual(strip.timeline, [0, 1, 2, 3, 2, 1])
+        strip.close()
+        os.remove(TextureSystem.merged_path(ROOT_PATH, layers))
+
+    def test_merge_layers_many(self):
+        static = [
+            {'path': self.test_dir, 'state': 'state1', 'color': (255, 0, 0, 255)},
+            {'path': self.test_dir, 'state': 'state3', 'color': (0, 255, 0, 255)}
+        ]
+        animated = [
+            {'path': self.test_dir, 'state': 'state4', 'color': (0, 0, 255, 255)},
+            {'path': self.test_dir, 'state': 'state2', 'color': (255, 0, 0, 255)}
+        ]
+        specs = [static, animated, [dict(layer) for layer in static]]
+
+        with mock.patch.object(TextureSystem, 'merge_layers', wraps=TextureSystem.merge_layers) as merge_layers:
+            results = TextureSystem.merge_layers_many(ROOT_PATH, specs, workers=2)
+
+        self.assertEqual(merge_layers.call_count, 2)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0].tobytes(), TextureSystem.merge_layers(ROOT_PATH, static).tobytes())
+        self.assertIsNot(results[0], results[2])
+        self.assertEqual(results[0].tobytes(), results[2].tobytes())
+        self.assertEqual(len(results[1]), 3)
+        for frame in results[1]:
             self.assertEqual(frame.size, (250, 250))
 
+    def test_merge_layers_many_cancel(self):
+        cancel_event = threading.Event()
+        cancel_event.set()
+        layers = [{'path': self.test_dir, 'state': 'state1', 'color': (255, 0, 0, 255)}]
+        with self.assertRaises(CancelledError):
+            TextureSystem.merge_layers_many(ROOT_PATH, [layers], cancel_event=cancel_event)
+
+    def test_amerge_layers_deduplicates_inflight_requests(self):
+        layers = [
+            {'path': self.test_dir, 'state': 'state2', 'color': (255, 0, 0, 255)},
+            {'path': self.test_dir, 'state': 'state4', 'color': (0, 255, 0, 255)}
+        ]
+
+        async def run():
+            return await asyncio.gather(*[TextureSystem.amerge_layers(ROOT_PATH, [dict(layer) for layer in layers]) for _ in range(5)])
+
+        with mock.patch.object(TextureSystem, 'merge_layers', wraps=TextureSystem.merge_layers) as merge_layers:
+            results = asyncio.run(run())
+
+        self.assertEqual(merge_layers.call_count, 1)
+        self.assertEqual(len(results), 5)
+        self.assertIsNot(results[0], results[1])
+        for result in results:
+            self.assertEqual([frame.tobytes() for frame in result], [frame.tobytes() for frame in results[0]])
+
+    def test_aget_image_recolor(self):
+        color = Color(255, 0, 0, 255)
+        image = asyncio.run(TextureSystem.aget_image_recolor(self.test_dir, 'state1', color))
+        self.assertEqual(image.tobytes(), TextureSystem.get_image_recolor(self.test_dir, 'state1', color).tobytes())
+
 
 if __name__ == '__main__':
     unittest.main()